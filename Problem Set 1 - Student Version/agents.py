@@ -1,6 +1,9 @@
 from abc import ABC, abstractmethod
-from typing import Callable, Dict, Generic, List
+from typing import Callable, Dict, Generic, List, Optional
 from problem import HeuristicFunction, Problem, S, A, Solution
+from policy_store import MISSING, StoredPolicy
+from search import DStarLite
+from helpers.utils import fetch_recorded_calls
 
 # This is an abstract class for all goal based agents
 class GoalBasedAgent(ABC, Generic[S, A]):
@@ -21,49 +24,84 @@ class HumanAgent(GoalBasedAgent[S, A]):
     def act(self, problem: Problem[S, A], state: S) -> A:
         return self.user_input_fn(problem, state)
 
-# This agent applies an uninformed search algorithm to find the solution to goal for the given state
-class UninformedSearchAgent(GoalBasedAgent[S, A]):
-    def __init__(self, search_fn: Callable[[Problem[S, A], S], Solution]) -> None:
+# This is the base class of the agents that search for a whole solution and follow it.
+# The policy stores the action to do for each state of the solutions found so far,
+# so the agent does not search again after each observation.
+class PolicyAgent(GoalBasedAgent[S, A]):
+    def __init__(self, store: Optional[StoredPolicy] = None) -> None:
         super().__init__()
-        self.search_fn = search_fn
         # The policy will store the action to do for each state so as not to search again after each observation
         self.policy: Dict[S, A] = {}
-    
-    def act(self, problem: Problem[S, A], state: S) -> A:
+        # If given, the policy is also read from and written to a persistent store (see policy_store.py)
+        self.store = store
+
+    # Return the action of the policy for the given state, calling 'search' (which returns a solution from the state)
+    # if the state is neither in the policy nor in the store
+    # A failed search is never remembered: the searches with a time or node budget (and the incomplete ones such as
+    # beam search) return None when they give up, which does not mean that the state has no solution.
+    def policy_action(self, problem: Problem[S, A], state: S, search: Callable[[S], Solution]) -> A:
         # This state is not stored in the policy, we need to search for a solution 
+        if state not in self.policy and self.store is not None:
+            # Check if the state was stored by a previous run before searching
+            # (older runs may have stored None for a failed search, which is searched again)
+            action = self.store.get(state)
+            if action is not MISSING and action is not None:
+                self.policy[state] = action
         if state not in self.policy:
-            solution = self.search_fn(problem, state)
+            solution = search(state)
             # if no solution was found, we return None
             if solution is None:
-                self.policy[state] = None
                 return None
             # Otherwise, we go through the solution path and store the action to do in each state into the policy
             current = state
+            path = []
             for action in solution:
                 self.policy[current] = action
+                path.append((current, action))
                 current = problem.get_successor(current, action)
+            # The whole path is stored so a later run that starts from any state of the path does not search
+            if self.store is not None: self.store.put_many(path)
         return self.policy.get(state)
 
+# This agent applies an uninformed search algorithm to find the solution to goal for the given state
+class UninformedSearchAgent(PolicyAgent[S, A]):
+    def __init__(self, search_fn: Callable[[Problem[S, A], S], Solution], store: Optional[StoredPolicy] = None) -> None:
+        super().__init__(store)
+        self.search_fn = search_fn
+    
+    def act(self, problem: Problem[S, A], state: S) -> A:
+        return self.policy_action(problem, state, lambda state: self.search_fn(problem, state))
+
 # This agent applies an informed search algorithm to find the solution to goal for the given state
-class InformedSearchAgent(GoalBasedAgent[S, A]):
-    def __init__(self, search_fn: Callable[[Problem[S, A], S, HeuristicFunction], Solution], heuristic: HeuristicFunction) -> None:
-        super().__init__()
+class InformedSearchAgent(PolicyAgent[S, A]):
+    def __init__(self, search_fn: Callable[[Problem[S, A], S, HeuristicFunction], Solution], heuristic: HeuristicFunction,
+                 store: Optional[StoredPolicy] = None) -> None:
+        super().__init__(store)
         self.search_fn = search_fn
         self.heuristic = heuristic
-        # The policy will store the action to do for each state so as not to search again after each observation
-        self.policy: Dict[S, A] = {}
     
     def act(self, problem: Problem[S, A], state: S) -> A:
-        # This state is not stored in the policy, we need to search for a solution 
-        if state not in self.policy:
-            solution = self.search_fn(problem, state, self.heuristic)
-            # if no solution was found, we return None
-            if solution is None:
-                self.policy[state] = None
-                return None
-            # Otherwise, we go through the solution path and store the action to do in each state into the policy
-            current = state
-            for action in solution:
-                self.policy[current] = action
-                current = problem.get_successor(current, action)
-        return self.policy.get(state)
\ No newline at end of file
+        return self.policy_action(problem, state, lambda state: self.search_fn(problem, state, self.heuristic))
+
+# This agent replans with an incremental search (D* Lite) instead of searching from scratch for every new state.
+# The search is kept between the calls to 'act', so when the agent moves (even to a state that is not on its last plan)
+# or when the problem costs change (see GraphRoutingProblem.set_cost), only the affected part of the search is repaired.
+# The heuristic estimates the cost between two states (heuristic(problem, a, b) such as graphrouting_reverse_heuristic)
+# and the problem must have a single goal and the predecessors of its states (see DStarLite in search.py).
+class IncrementalSearchAgent(GoalBasedAgent[S, A]):
+    def __init__(self, heuristic) -> None:
+        super().__init__()
+        self.heuristic = heuristic
+        self.search: Optional[DStarLite] = None
+
+    def act(self, problem: Problem[S, A], state: S) -> A:
+        # The search calls get_actions and get_predecessors on every step and problems such as GraphRoutingProblem
+        # record these calls until they are fetched, so the records of the previous step are dropped
+        # (the caller can still fetch the records of the current step after act returns)
+        for method in (getattr(type(problem), "get_actions", None), getattr(type(problem), "get_predecessors", None)):
+            if hasattr(method, "calls"): fetch_recorded_calls(method)
+        if self.search is None or self.search.problem is not problem:
+            self.search = DStarLite(problem, state, self.heuristic)
+        else:
+            self.search.move_to(state)
+        return self.search.next_action()
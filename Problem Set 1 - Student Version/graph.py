@@ -1,6 +1,6 @@
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Tuple
 from dataclasses import dataclass
-import json
+import json, math
 
 from problem import Problem
 from mathutils import Point, euclidean_distance
@@ -26,6 +26,13 @@ class GraphRoutingProblem(Problem[GraphNode, GraphNode]):
         self.start = start
         self.goal = goal
         self.adjacency = adjacency
+        self._predecessors: Dict[GraphNode, List[Tuple[GraphNode, GraphNode]]] = None # the reverse adjacency (built on the first use)
+        # The edge costs can be changed while an agent moves through the graph (see set_cost):
+        #   cost_overrides[(state, action)] is the cost of the edge if it is not the euclidean distance (inf if the edge is blocked)
+        #   cost_changes is the log of every change as (state, action, old cost, new cost) so that an incremental search
+        #   (such as DStarLite) can repair its results by reading the changes it has not seen yet
+        self.cost_overrides: Dict[Tuple[GraphNode, GraphNode], float] = {}
+        self.cost_changes: List[Tuple[GraphNode, GraphNode, float, float]] = []
     
     def get_initial_state(self) -> GraphNode:
         return self.start
@@ -39,28 +46,74 @@ class GraphRoutingProblem(Problem[GraphNode, GraphNode]):
     def get_actions(self, state: GraphNode) -> Iterable[GraphNode]:
         return self.adjacency.get(state, [])
     
+    # The predecessors of a node are the nodes that have an edge to it, returned as (predecessor, action) pairs
+    # such that get_successor(predecessor, action) == state. They are used by the bidirectional searches.
+    # The reverse adjacency is built once from 'adjacency' on the first call.
+    # We use @record_calls to track the backward expansions (like get_actions for the forward ones)
+    # The records are only cleared when they are fetched, so play_graph fetches both after every step
+    @record_calls
+    def get_predecessors(self, state: GraphNode) -> Iterable[Tuple[GraphNode, GraphNode]]:
+        if self._predecessors is None:
+            predecessors: Dict[GraphNode, List[Tuple[GraphNode, GraphNode]]] = {}
+            for node, adjacent in self.adjacency.items():
+                for neighbor in adjacent:
+                    predecessors.setdefault(neighbor, []).append((node, neighbor))
+            self._predecessors = predecessors
+        return self._predecessors.get(state, [])
+
     # The next state and the action are the exact same thing for this problem
     def get_successor(self, state: GraphNode, action: GraphNode) -> GraphNode:
         return action
     
-    # The cost of an action is the distance between the current node and the next node 
+    # The cost of an action is the distance between the current node and the next node (unless it was changed by set_cost)
     def get_cost(self, state: GraphNode, action: GraphNode) -> float:
+        if self.cost_overrides:
+            cost = self.cost_overrides.get((state, action))
+            if cost is not None: return cost
         return euclidean_distance(state.position, action.position)
+
+    # Change the cost of the edge from 'state' to 'action' (inf blocks the edge and None restores the euclidean distance).
+    # If the edge does not exist, it is added to the graph (and the reverse adjacency is rebuilt on its next use).
+    # The euclidean heuristics stay admissible as long as the new costs are not below the euclidean distance.
+    def set_cost(self, state: GraphNode, action: GraphNode, cost: float = None) -> None:
+        adjacent = self.adjacency.setdefault(state, [])
+        if action in adjacent:
+            old_cost = self.get_cost(state, action)
+        else:
+            adjacent.append(action)
+            self._predecessors = None
+            old_cost = math.inf
+        if cost is None:
+            self.cost_overrides.pop((state, action), None)
+            cost = euclidean_distance(state.position, action.position)
+        else:
+            self.cost_overrides[(state, action)] = cost
+        if cost != old_cost:
+            self.cost_changes.append((state, action, old_cost, cost))
     
     # Read a graph routing problem from file
     @staticmethod
     def from_file(path: str) -> 'GraphRoutingProblem':
-        problem_def: Dict[str, Dict] = json.load(open(path, 'r'))
+        with open(path, 'r') as f:
+            problem_def: Dict[str, Dict] = json.load(f)
         graph_def: Dict[str, Dict] = problem_def.get("graph", {})
         node_dict = {name: GraphNode(name, Point(*item.get("position", [0,0]))) for name, item in graph_def.items()}
         adjacency: Dict[GraphNode, List[GraphNode]] = {}
         for name, item in graph_def.items():
             node = node_dict[name]
-            adjacent = [node_dict[adjacent] for adjacent in sorted(item.get("adjacent", [])) if adjacent in node_dict]
+            adjacent = []
+            for adjacent_name in sorted(item.get("adjacent", [])):
+                if adjacent_name not in node_dict:
+                    raise ValueError(f"Node '{name}' is adjacent to the undefined node '{adjacent_name}'")
+                adjacent.append(node_dict[adjacent_name])
             adjacency[node] = adjacent
         start = node_dict[problem_def.get("start", "")]
         goal = node_dict[problem_def.get("goal", "")]
         return GraphRoutingProblem(start, goal, adjacency)
 
 def graphrouting_heuristic(problem: GraphRoutingProblem, state: GraphNode) -> float:
-    return euclidean_distance(state.position, problem.goal.position)
\ No newline at end of file
+    return euclidean_distance(state.position, problem.goal.position)
+
+# The reverse heuristic estimates the cost from the start of the search to the state (used by BidirectionalAStarSearch)
+def graphrouting_reverse_heuristic(problem: GraphRoutingProblem, start: GraphNode, state: GraphNode) -> float:
+    return euclidean_distance(start.position, state.position)
@@ -0,0 +1,162 @@
+from array import array
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import heapq, math, os, threading
+
+from graph import GraphNode, GraphRoutingProblem
+from graph_csr import CSRGraph
+from helpers.cache import LRUCache
+
+# This file contains a batch API for many-to-many routing queries on a single graph.
+# Instead of building a new problem and running a uniform cost search from scratch for every (start, goal) query:
+#   - The graph is converted once to the CSR format (see graph_csr.py).
+#   - The queries are grouped by their start node, and every group is answered from a single shortest-path tree
+#     (Dijkstra from the start node) which is only grown until all the goals of the group are settled.
+#   - The trees are kept in an LRU cache so later queries from the same start reuse (and keep growing) them.
+#   - The groups run on a thread pool or a process pool and the results are yielded as soon as their group finishes.
+#     The search is pure Python, so a thread pool only overlaps the work with the consumer of the results while
+#     a process pool runs the groups in parallel (every worker process has its own copy of the graph and its own tree cache).
+Query = Tuple[Union[str, GraphNode], Union[str, GraphNode]]
+
+@dataclass
+class RouteResult:
+    index: int                      # the index of the query in the batch (the results are not yielded in order)
+    start: str
+    goal: str
+    cost: float                     # inf if there is no path
+    path: Optional[List[GraphNode]] # the path in the solution format of the search functions (or None if there is no path)
+
+# A shortest-path tree that can be grown on demand: it stores the Dijkstra state (distances, parents, settled nodes and the heap)
+# so that settling another target continues from where the last call stopped
+class ShortestPathTree:
+    def __init__(self, graph: CSRGraph, source: int) -> None:
+        n = graph.node_count
+        self.graph = graph
+        self.source = source
+        self.distance = array('d', [math.inf]) * n
+        self.parent = array('q', [-1]) * n
+        self.closed = bytearray(n)
+        self.distance[source] = 0
+        self.pq = [(0.0, source)]
+        self.lock = threading.Lock() # a tree can be shared between threads
+
+    # Grow the tree until the target is settled (or every reachable node is settled) and return its distance
+    def settle(self, target: int) -> float:
+        graph, distance, parent, closed, pq = self.graph, self.distance, self.parent, self.closed, self.pq
+        indptr, indices, weights = graph.indptr, graph.indices, graph.weights
+        while pq and not closed[target]:
+            base, node = heapq.heappop(pq)
+            if closed[node]: continue
+            closed[node] = 1
+            for edge in range(indptr[node], indptr[node + 1]):
+                neighbor = indices[edge]
+                cost = base + weights[edge]
+                if cost < distance[neighbor]:
+                    distance[neighbor] = cost
+                    parent[neighbor] = node
+                    heapq.heappush(pq, (cost, neighbor))
+        return distance[target] if closed[target] else math.inf
+
+    # The node ids of the path from the source to a settled target (including both)
+    def path(self, target: int) -> List[int]:
+        path = [target]
+        while path[-1] != self.source:
+            path.append(self.parent[path[-1]])
+        path.reverse()
+        return path
+
+class BatchRouter:
+    def __init__(self, graph: CSRGraph, cache_capacity: int = 64, workers: int = None, executor: str = "thread") -> None:
+        self.graph = graph
+        self.trees = LRUCache(cache_capacity) # source id -> ShortestPathTree
+        self.cache_capacity = cache_capacity
+        self.workers = workers or os.cpu_count() or 1
+        self.executor_type = executor # "thread" or "process"
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def from_problem(problem: GraphRoutingProblem, cache_capacity: int = 64, workers: int = None, executor: str = "thread") -> 'BatchRouter':
+        return BatchRouter(CSRGraph.from_problem(problem), cache_capacity, workers, executor)
+
+    @staticmethod
+    def from_file(path: str, cache_capacity: int = 64, workers: int = None, executor: str = "thread") -> 'BatchRouter':
+        return BatchRouter.from_problem(GraphRoutingProblem.from_file(path), cache_capacity, workers, executor)
+
+    # Return the node id of a node given as a name or a GraphNode
+    def node_id(self, node: Union[str, GraphNode]) -> int:
+        return self.graph.index[node if isinstance(node, str) else node.name]
+
+    # Return the cached tree of the given source (or create it)
+    def tree(self, source: int) -> ShortestPathTree:
+        with self._lock:
+            if source in self.trees:
+                return self.trees[source]
+            tree = ShortestPathTree(self.graph, source)
+            self.trees[source] = tree
+            return tree
+
+    # Answer a single query
+    def route(self, start: Union[str, GraphNode], goal: Union[str, GraphNode]) -> RouteResult:
+        source = self.node_id(start)
+        return self._route_group(source, [(0, self.node_id(goal))])[0]
+
+    # Answer all the queries that start from the same source using its shortest-path tree
+    def _route_group(self, source: int, goals: List[Tuple[int, int]]) -> List[RouteResult]:
+        tree = self.tree(source)
+        graph = self.graph
+        results = []
+        with tree.lock:
+            for index, target in goals:
+                cost = tree.settle(target)
+                path = None if math.isinf(cost) else [graph.node(node) for node in tree.path(target)[1:]]
+                results.append(RouteResult(index, graph.names[source], graph.names[target], cost, path))
+        return results
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.graph, self.cache_capacity))
+            else:
+                self._executor = ThreadPoolExecutor(self.workers)
+        return self._executor
+
+    # Answer a batch of (start, goal) queries and yield the results as soon as they are ready
+    # (every result holds the index of its query in the batch)
+    def route_batch(self, queries: Iterable[Query]) -> Iterator[RouteResult]:
+        groups: Dict[int, List[Tuple[int, int]]] = {}
+        for index, (start, goal) in enumerate(queries):
+            groups.setdefault(self.node_id(start), []).append((index, self.node_id(goal)))
+        if self.workers <= 1 or len(groups) <= 1: # no need for a pool
+            for source, goals in groups.items():
+                yield from self._route_group(source, goals)
+            return
+        executor = self._get_executor()
+        if self.executor_type == "process":
+            futures = [executor.submit(_route_group_in_worker, source, goals) for source, goals in groups.items()]
+        else:
+            futures = [executor.submit(self._route_group, source, goals) for source, goals in groups.items()]
+        for future in as_completed(futures):
+            yield from future.result()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> 'BatchRouter':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+# Every worker process of a process pool has its own router (with its own tree cache)
+_worker_router: BatchRouter = None
+
+def _init_worker(graph: CSRGraph, cache_capacity: int) -> None:
+    global _worker_router
+    _worker_router = BatchRouter(graph, cache_capacity, workers=1)
+
+def _route_group_in_worker(source: int, goals: List[Tuple[int, int]]) -> List[RouteResult]:
+    return _worker_router._route_group(source, goals)
@@ -0,0 +1,243 @@
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import heapq, math
+
+from problem import Problem
+from mathutils import Point
+from graph import GraphNode, GraphRoutingProblem
+from helpers.utils import track_call_count
+
+# This file contains a compact backend for the graph routing problem meant for graphs with millions of edges.
+# Instead of GraphNode objects and a dictionary of lists, the graph is stored in the CSR (compressed sparse row) format:
+#   - Every node has an integer id. names[i] is the name of node 'i' and (xs[i], ys[i]) is its position.
+#   - The edges that leave node 'i' are the edge ids in range(indptr[i], indptr[i+1]),
+#     indices[e] is the node that edge 'e' goes to and weights[e] is its cost.
+# All the per-node and per-edge data are flat arrays (from the built-in 'array' module since external libraries
+# such as NumPy are not allowed), so they take 8 bytes per value instead of a Python object per node or edge.
+# The edge costs are computed once when the graph is built (with the same formula as euclidean_distance),
+# so the search never allocates a Point nor hashes a GraphNode.
+
+class CSRGraph:
+    def __init__(self, names: Sequence[str], xs: array, ys: array, indptr: array, indices: array, weights: array = None) -> None:
+        self.names = names
+        self.xs = xs
+        self.ys = ys
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights if weights is not None else self._compute_weights()
+        self._index: Dict[str, int] = None
+
+    # The inverse of names (built on the first use since a memory-mapped graph decodes its names lazily)
+    @property
+    def index(self) -> Dict[str, int]:
+        if self._index is None:
+            self._index = {name: i for i, name in enumerate(self.names)}
+        return self._index
+
+    @property
+    def node_count(self) -> int:
+        return len(self.names)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    # Compute the cost of every edge in a single pass over the arrays
+    def _compute_weights(self) -> array:
+        xs, ys, indptr, indices = self.xs, self.ys, self.indptr, self.indices
+        weights = array('d', bytes(8 * len(indices)))
+        sqrt = math.sqrt
+        for node in range(len(self.names)):
+            x, y = xs[node], ys[node]
+            for edge in range(indptr[node], indptr[node + 1]):
+                neighbor = indices[edge]
+                dx, dy = x - xs[neighbor], y - ys[neighbor]
+                weights[edge] = sqrt(dx * dx + dy * dy)
+        return weights
+
+    # The ids of the nodes adjacent to the given node
+    def neighbors(self, node: int) -> Iterable[int]:
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    # Build the reverse graph (every edge u->v becomes v->u with the same weight) with a counting sort over the edges
+    def reverse(self) -> 'CSRGraph':
+        n, indptr, indices, weights = len(self.names), self.indptr, self.indices, self.weights
+        reverse_indptr = array('q', bytes(8 * (n + 1)))
+        for neighbor in indices:
+            reverse_indptr[neighbor + 1] += 1
+        for node in range(n):
+            reverse_indptr[node + 1] += reverse_indptr[node]
+        position = array('q', reverse_indptr[:n])
+        reverse_indices = array('q', bytes(8 * len(indices)))
+        reverse_weights = array('d', bytes(8 * len(indices)))
+        for node in range(n):
+            for edge in range(indptr[node], indptr[node + 1]):
+                neighbor = indices[edge]
+                slot = position[neighbor]
+                reverse_indices[slot] = node
+                reverse_weights[slot] = weights[edge]
+                position[neighbor] = slot + 1
+        return CSRGraph(self.names, self.xs, self.ys, reverse_indptr, reverse_indices, reverse_weights)
+
+    # Convert a node id back to a GraphNode
+    def node(self, node: int) -> GraphNode:
+        return GraphNode(self.names[node], Point(self.xs[node], self.ys[node]))
+
+    # Build a CSR graph from the "graph" object of a graph file
+    # (the adjacent nodes are sorted by name like in GraphRoutingProblem.from_file).
+    # It raises a ValueError if a node is adjacent to a node that is not defined in the graph.
+    @staticmethod
+    def from_definition(graph_def: Dict[str, Dict]) -> 'CSRGraph':
+        names = list(graph_def)
+        index = {name: i for i, name in enumerate(names)}
+        xs, ys = array('d'), array('d')
+        indptr, indices = array('q', [0]), array('q')
+        for name in names:
+            item = graph_def[name]
+            x, y = item.get("position", [0, 0])
+            xs.append(x)
+            ys.append(y)
+            for adjacent in sorted(item.get("adjacent", [])):
+                if adjacent not in index:
+                    raise ValueError(f"Node '{name}' is adjacent to the undefined node '{adjacent}'")
+                indices.append(index[adjacent])
+            indptr.append(len(indices))
+        return CSRGraph(names, xs, ys, indptr, indices)
+
+    # Build a CSR graph from a graph routing problem (the node ids follow the order of its adjacency dictionary)
+    @staticmethod
+    def from_problem(problem: GraphRoutingProblem) -> 'CSRGraph':
+        nodes = list(problem.adjacency)
+        seen = set(nodes)
+        for node in [problem.start, problem.goal] + [adjacent for adjacency in problem.adjacency.values() for adjacent in adjacency]:
+            if node not in seen:
+                seen.add(node)
+                nodes.append(node)
+        index = {node: i for i, node in enumerate(nodes)}
+        xs = array('d', (node.position.x for node in nodes))
+        ys = array('d', (node.position.y for node in nodes))
+        indptr, indices = array('q', [0]), array('q')
+        for node in nodes:
+            indices.extend(index[adjacent] for adjacent in problem.adjacency.get(node, []))
+            indptr.append(len(indices))
+        # The edges whose costs were changed by set_cost do not have the euclidean weight
+        weights = None
+        if problem.cost_overrides:
+            weights = array('d', (problem.get_cost(node, adjacent) for node in nodes for adjacent in problem.adjacency.get(node, [])))
+        return CSRGraph([node.name for node in nodes], xs, ys, indptr, indices, weights)
+
+# Find the shortest path from 'source' to 'target' with A* over the CSR arrays
+# (or Dijkstra if 'use_heuristic' is False). The heuristic is the euclidean distance to the target which is consistent.
+# It returns the cost and the node ids of the path (including the source and the target) or None if there is no path.
+def csr_shortest_path(graph: CSRGraph, source: int, target: int, use_heuristic: bool = True) -> Optional[Tuple[float, List[int]]]:
+    xs, ys, indptr, indices, weights = graph.xs, graph.ys, graph.indptr, graph.indices, graph.weights
+    n = graph.node_count
+    distance = array('d', [math.inf]) * n
+    parent = array('q', [-1]) * n
+    closed = bytearray(n)
+    tx, ty = xs[target], ys[target]
+    sqrt = math.sqrt
+
+    def h(node: int) -> float:
+        if not use_heuristic: return 0
+        dx, dy = xs[node] - tx, ys[node] - ty
+        return sqrt(dx * dx + dy * dy)
+
+    distance[source] = 0
+    pq = [(h(source), source)]
+    while pq:
+        _, node = heapq.heappop(pq)
+        if closed[node]: continue
+        closed[node] = 1
+        if node == target:
+            path = [node]
+            while parent[node] >= 0:
+                node = parent[node]
+                path.append(node)
+            path.reverse()
+            return distance[target], path
+        base = distance[node]
+        for edge in range(indptr[node], indptr[node + 1]):
+            neighbor = indices[edge]
+            if closed[neighbor]: continue
+            cost = base + weights[edge]
+            if cost < distance[neighbor]:
+                distance[neighbor] = cost
+                parent[neighbor] = node
+                heapq.heappush(pq, (cost + h(neighbor), neighbor))
+    return None
+
+# Compute the shortest distances from 'source' to every node with Dijkstra over the CSR arrays (inf if unreachable)
+def csr_distances(graph: CSRGraph, source: int) -> array:
+    indptr, indices, weights = graph.indptr, graph.indices, graph.weights
+    distance = array('d', [math.inf]) * graph.node_count
+    closed = bytearray(graph.node_count)
+    distance[source] = 0
+    pq = [(0.0, source)]
+    while pq:
+        base, node = heapq.heappop(pq)
+        if closed[node]: continue
+        closed[node] = 1
+        for edge in range(indptr[node], indptr[node + 1]):
+            neighbor = indices[edge]
+            cost = base + weights[edge]
+            if cost < distance[neighbor]:
+                distance[neighbor] = cost
+                heapq.heappush(pq, (cost, neighbor))
+    return distance
+
+# The graph routing problem on a CSR graph so that it can also be solved by the search functions in search.py.
+# The states are node ids and the actions are edge ids (so the successor and the cost are single array lookups).
+class CSRGraphRoutingProblem(Problem[int, int]):
+    def __init__(self, graph: CSRGraph, start: int, goal: int) -> None:
+        super().__init__()
+        self.graph = graph
+        self.start = start
+        self.goal = goal
+
+    def get_initial_state(self) -> int:
+        return self.start
+
+    def is_goal(self, state: int) -> bool:
+        return state == self.goal
+
+    # We use @track_call_count (instead of @record_calls like GraphRoutingProblem) to count the expansions
+    # without storing the arguments of every call since the graphs can be huge
+    @track_call_count
+    def get_actions(self, state: int) -> Iterable[int]:
+        return range(self.graph.indptr[state], self.graph.indptr[state + 1])
+
+    def get_successor(self, state: int, action: int) -> int:
+        return self.graph.indices[action]
+
+    def get_cost(self, state: int, action: int) -> float:
+        return self.graph.weights[action]
+
+    # Convert a solution (a list of edge ids) to the solution format of GraphRoutingProblem (a list of GraphNodes)
+    def to_graph_solution(self, solution: Optional[List[int]]) -> Optional[List[GraphNode]]:
+        if solution is None: return None
+        return [self.graph.node(self.graph.indices[edge]) for edge in solution]
+
+    # Find the shortest path with the specialized A* and return it as a list of GraphNodes (or None if there is no path)
+    def solve(self, use_heuristic: bool = True) -> Optional[List[GraphNode]]:
+        result = csr_shortest_path(self.graph, self.start, self.goal, use_heuristic)
+        if result is None: return None
+        return [self.graph.node(node) for node in result[1][1:]]
+
+    @staticmethod
+    def from_problem(problem: GraphRoutingProblem) -> 'CSRGraphRoutingProblem':
+        graph = CSRGraph.from_problem(problem)
+        return CSRGraphRoutingProblem(graph, graph.index[problem.start.name], graph.index[problem.goal.name])
+
+    # Read a graph routing problem from file with the streaming loader (see graph_loader.py).
+    # If 'use_cache' is True, the graph is loaded from (or saved to) the memory-mapped binary cache next to the file.
+    @staticmethod
+    def from_file(path: str, use_cache: bool = False) -> 'CSRGraphRoutingProblem':
+        from graph_loader import load_graph
+        return CSRGraphRoutingProblem(*load_graph(path, use_cache))
+
+# The euclidean distance from the state to the goal (the same heuristic as graphrouting_heuristic)
+def csr_heuristic(problem: CSRGraphRoutingProblem, state: int) -> float:
+    graph = problem.graph
+    dx, dy = graph.xs[state] - graph.xs[problem.goal], graph.ys[state] - graph.ys[problem.goal]
+    return math.sqrt(dx * dx + dy * dy)
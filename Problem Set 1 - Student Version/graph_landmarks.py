@@ -0,0 +1,166 @@
+from array import array
+from operator import sub
+from typing import List, Optional
+import argparse, math, os, struct, sys, tempfile, zlib
+
+from graph import GraphRoutingProblem
+from graph_csr import CSRGraph, csr_distances
+from graph_loader import stream_graph
+
+# This file contains the ALT (A*, Landmarks and Triangle inequality) heuristic for the graph routing problem.
+# The euclidean distance is a weak lower bound when the roads wind around, so we precompute (once per graph)
+# the exact shortest distances from and to a few nodes called landmarks. For any landmark L, the triangle inequality gives:
+#   d(v, t) >= d(L, t) - d(L, v)   and   d(v, t) >= d(v, L) - d(t, L)
+# so the largest of these differences over all the landmarks is an admissible (and consistent) heuristic.
+#   - The landmarks are selected by farthest-point selection: every new landmark is the node that is the farthest
+#     from the landmarks selected so far (which spreads them around the border of the graph where they work best).
+#   - The distances are stored in node-major order: from_landmarks[v*k + i] = d(L_i, v) and to_landmarks[v*k + i] = d(v, L_i),
+#     so the bound of a node only reads 2 contiguous slices which are combined with map(sub, ...) over the whole slice.
+#   - Unreachable distances are stored as UNREACHABLE (instead of inf) so the differences never become nan.
+#     A bound larger than UNREACHABLE / 2 means that the target cannot be reached.
+#   - The index can be saved next to the graph file ("graphs/graph1.json" -> "graphs/graph1.landmarks") and loaded quickly.
+#     It stores a checksum of the graph so that a stale index (for a modified graph) is rebuilt.
+
+UNREACHABLE = 1e18
+MAGIC = b"ALT1"
+HEADER = struct.Struct("<4sqqqI") # magic, node count, edge count, landmark count, graph checksum
+
+# Compute a checksum of the graph structure and weights
+def graph_checksum(graph: CSRGraph) -> int:
+    checksum = zlib.crc32("\n".join(graph.names).encode())
+    for data in (graph.indptr, graph.indices, graph.weights):
+        checksum = zlib.crc32(data.tobytes(), checksum)
+    return checksum
+
+# The path of the index file of the given graph file
+def index_path(graph_path: str) -> str:
+    return os.path.splitext(graph_path)[0] + ".landmarks"
+
+class LandmarkIndex:
+    def __init__(self, graph: CSRGraph, landmarks: array, from_landmarks: array, to_landmarks: array) -> None:
+        self.graph = graph
+        self.landmarks = landmarks            # the node ids of the landmarks
+        self.from_landmarks = from_landmarks  # from_landmarks[v*k + i] is the distance from landmark 'i' to node 'v'
+        self.to_landmarks = to_landmarks      # to_landmarks[v*k + i] is the distance from node 'v' to landmark 'i'
+        self._target = None                   # the target of the last query and its distance slices
+        self._target_slices = None
+
+    # Select 'count' landmarks by farthest-point selection and compute their distances
+    @staticmethod
+    def build(graph: CSRGraph, count: int = 8) -> 'LandmarkIndex':
+        n = graph.node_count
+        count = min(count, n)
+        reverse = graph.reverse()
+        # The first landmark is the node that is the farthest from node 0
+        nearest = array('d', (UNREACHABLE if math.isinf(d) else d for d in csr_distances(graph, 0))) if n else array('d')
+        landmarks = array('q')
+        forward: List[array] = []
+        backward: List[array] = []
+        for _ in range(count):
+            landmark = max(range(n), key=nearest.__getitem__)
+            landmarks.append(landmark)
+            distances_from = array('d', (UNREACHABLE if math.isinf(d) else d for d in csr_distances(graph, landmark)))
+            distances_to = array('d', (UNREACHABLE if math.isinf(d) else d for d in csr_distances(reverse, landmark)))
+            forward.append(distances_from)
+            backward.append(distances_to)
+            # The distance to the selected landmarks is the round trip distance to the nearest one
+            for node in range(n):
+                distance = distances_from[node] + distances_to[node]
+                if len(landmarks) == 1 or distance < nearest[node]:
+                    nearest[node] = distance
+            nearest[landmark] = -1 # never select the same landmark twice
+        # Interleave the distances in node-major order
+        k = len(landmarks)
+        from_landmarks = array('d', bytes(8 * n * k))
+        to_landmarks = array('d', bytes(8 * n * k))
+        for i in range(k):
+            from_landmarks[i::k] = forward[i]
+            to_landmarks[i::k] = backward[i]
+        return LandmarkIndex(graph, landmarks, from_landmarks, to_landmarks)
+
+    # A lower bound on the distance from 'source' to 'target' (node ids)
+    def lower_bound(self, source: int, target: int) -> float:
+        k = len(self.landmarks)
+        if k == 0: return 0
+        if self._target != target:
+            self._target = target
+            self._target_slices = (self.from_landmarks[target * k:(target + 1) * k], self.to_landmarks[target * k:(target + 1) * k])
+        from_target, to_target = self._target_slices
+        bound = max(max(map(sub, from_target, self.from_landmarks[source * k:(source + 1) * k])),
+                    max(map(sub, self.to_landmarks[source * k:(source + 1) * k], to_target)), 0)
+        return math.inf if bound > UNREACHABLE / 2 else bound
+
+    # The ALT heuristic with the HeuristicFunction signature. It works with GraphRoutingProblem (whose states are GraphNodes)
+    # and CSRGraphRoutingProblem (whose states are node ids) as long as the problem uses the graph of this index.
+    def heuristic(self, problem, state) -> float:
+        goal = problem.goal
+        if not isinstance(state, int): state = self.graph.index[state.name]
+        if not isinstance(goal, int): goal = self.graph.index[goal.name]
+        return self.lower_bound(state, goal)
+
+    # Save the index to a binary file (always little endian)
+    # The file is written next to the index then atomically renamed, so a reader never loads a partially written file
+    def save(self, path: str) -> None:
+        arrays = [self.landmarks, self.from_landmarks, self.to_landmarks]
+        if sys.byteorder == "big":
+            arrays = [array(data.typecode, data) for data in arrays]
+            for data in arrays: data.byteswap()
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(HEADER.pack(MAGIC, self.graph.node_count, self.graph.edge_count, len(self.landmarks), graph_checksum(self.graph)))
+                for data in arrays:
+                    data.tofile(f)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    # Load the index of the given graph from a binary file (or return None if the file is missing or was built for another graph)
+    @staticmethod
+    def load(path: str, graph: CSRGraph) -> Optional['LandmarkIndex']:
+        if not os.path.exists(path): return None
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+            if len(header) != HEADER.size: return None
+            magic, node_count, edge_count, k, checksum = HEADER.unpack(header)
+            if magic != MAGIC or node_count != graph.node_count or edge_count != graph.edge_count or checksum != graph_checksum(graph):
+                return None
+            landmarks, from_landmarks, to_landmarks = array('q'), array('d'), array('d')
+            try:
+                landmarks.fromfile(f, k)
+                from_landmarks.fromfile(f, node_count * k)
+                to_landmarks.fromfile(f, node_count * k)
+            except EOFError:
+                return None
+        if sys.byteorder == "big":
+            for data in (landmarks, from_landmarks, to_landmarks): data.byteswap()
+        return LandmarkIndex(graph, landmarks, from_landmarks, to_landmarks)
+
+    # Load the index stored next to the graph file or build it (and save it) if it is missing or stale
+    @staticmethod
+    def for_graph_file(graph_path: str, count: int = 8, graph: CSRGraph = None) -> 'LandmarkIndex':
+        if graph is None:
+            graph, _, _ = stream_graph(graph_path)
+        path = index_path(graph_path)
+        index = LandmarkIndex.load(path, graph)
+        if index is None or len(index.landmarks) != min(count, graph.node_count):
+            index = LandmarkIndex.build(graph, count)
+            index.save(path)
+        return index
+
+    # Build the index of a graph routing problem (without saving it)
+    @staticmethod
+    def for_problem(problem: GraphRoutingProblem, count: int = 8) -> 'LandmarkIndex':
+        return LandmarkIndex.build(CSRGraph.from_problem(problem), count)
+
+if __name__ == "__main__":
+    # Read the arguments from the command line
+    parser = argparse.ArgumentParser(description="Build the landmark index of a graph (saved next to the graph file)")
+    parser.add_argument("graph", help="path to the graph file")
+    parser.add_argument("--landmarks", "-k", type=int, default=8, help="the number of landmarks")
+
+    args = parser.parse_args()
+    index = LandmarkIndex.for_graph_file(args.graph, args.landmarks)
+    print(f"Landmarks: {', '.join(index.graph.names[landmark] for landmark in index.landmarks)}")
+    print(f"Saved to {index_path(args.graph)}")
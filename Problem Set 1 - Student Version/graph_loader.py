@@ -0,0 +1,254 @@
+from array import array
+from json import JSONDecodeError, JSONDecoder
+from typing import Any, Dict, List, Optional, Sequence, TextIO, Tuple
+import mmap, os, struct, sys, tempfile
+
+from graph_csr import CSRGraph
+
+# This file contains a low-memory loader for large graph files.
+# json.load builds the whole document as Python objects before we can convert it, which doubles the peak memory.
+# Instead, the loader reads the file in chunks and walks the top-level object by itself:
+#   - Every entry of the "graph" object (a single node with its position and adjacency) is decoded on its own
+#     with JSONDecoder.raw_decode, then converted right away to compact arrays and dropped.
+#   - The node names are interned and mapped to ids, and the edges are appended to flat arrays (the adjacent names
+#     are sorted like in GraphRoutingProblem.from_file so the edge order is the same).
+#   - At the end, the edges are sorted into the CSR format (see graph_csr.py) with a counting sort.
+# The node ids follow the order in which the nodes are defined (like CSRGraph.from_definition)
+# and an adjacent name that is not defined in the graph raises a ValueError.
+#
+# The loaded graph can also be cached in a binary file next to the JSON file ("graph1.json" -> "graph1.csr").
+# The cache is memory-mapped when loaded: the arrays are memoryviews on the mapped file, so loading it does not copy
+# (or even read) the arrays until they are used. The cache stores the size and modification time of the JSON file
+# so a cache of an older version of the file is rebuilt.
+# The cache is written to a temporary file which then replaces the old cache, so a process that loads the cache
+# while another one writes it (or after a writer crashed) never sees a partially written file.
+
+CHUNK_SIZE = 1 << 20
+MAGIC = b"CSR1"
+HEADER = struct.Struct("<4sqqqqqq") # magic, node count, edge count, start id, goal id, json size, json mtime (ns)
+HEADER_SIZE = 64                    # the header is padded so that the arrays are 8-byte aligned
+
+# Reads JSON values one by one from a text stream while keeping only a small part of the file in memory
+class _JSONStream:
+    def __init__(self, file: TextIO, chunk_size: int = CHUNK_SIZE) -> None:
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+        self.decoder = JSONDecoder()
+
+    # Read the next chunk (dropping the part of the buffer that was already consumed)
+    def _fill(self) -> bool:
+        if self.eof: return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    # Skip the whitespace and return the next character (without consuming it) or "" at the end of the file
+    def peek(self) -> str:
+        while True:
+            buffer, position = self.buffer, self.position
+            while position < len(buffer) and buffer[position] in " \t\n\r":
+                position += 1
+            self.position = position
+            if position < len(buffer): return buffer[position]
+            if not self._fill(): return ""
+
+    # Consume the expected character
+    def expect(self, character: str) -> None:
+        if self.peek() != character:
+            raise JSONDecodeError(f"Expecting '{character}'", self.buffer, self.position)
+        self.position += 1
+
+    # Decode the next JSON value (reading more chunks if the value is cut by the end of the buffer)
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof or not isinstance(value, (int, float)):
+                    self.position = end
+                    return value
+            except JSONDecodeError:
+                if self.eof: raise
+            self._fill()
+
+    # Iterate over the keys of an object, the caller must consume the value of each key before asking for the next one
+    def keys(self):
+        self.expect("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            separator = self.peek()
+            self.position += 1
+            if separator == "}": return
+            if separator != ",":
+                raise JSONDecodeError("Expecting ',' or '}'", self.buffer, self.position - 1)
+
+# Load a graph file as a CSR graph with the ids of the start and goal nodes
+def stream_graph(path: str, chunk_size: int = CHUNK_SIZE) -> Tuple[CSRGraph, int, int]:
+    ids: Dict[str, int] = {}       # the id of every name (in order of appearance)
+    names: List[str] = []
+    defined = bytearray()          # defined[i] is 1 if node 'i' was defined in the graph (not only referenced)
+    order = array('q')             # the ids of the defined nodes in the order of their definitions
+    xs, ys = array('d'), array('d')
+    sources, targets = array('q'), array('q') # the edges in the order of appearance
+    start = goal = None
+
+    def intern(name: str) -> int:
+        node = ids.get(name)
+        if node is None:
+            node = len(names)
+            name = sys.intern(name)
+            ids[name] = node
+            names.append(name)
+            defined.append(0)
+            xs.append(0)
+            ys.append(0)
+        return node
+
+    with open(path, 'r') as f:
+        stream = _JSONStream(f, chunk_size)
+        for key in stream.keys():
+            if key == "graph":
+                for name in stream.keys():
+                    item = stream.value()
+                    node = intern(name)
+                    if defined[node]: continue # if a node is defined twice, we keep its first definition
+                    defined[node] = 1
+                    order.append(node)
+                    xs[node], ys[node] = item.get("position", [0, 0])
+                    for adjacent in sorted(item.get("adjacent", [])):
+                        sources.append(node)
+                        targets.append(intern(adjacent))
+            elif key == "start":
+                start = stream.value()
+            elif key == "goal":
+                goal = stream.value()
+            else:
+                stream.value() # skip the other values (such as the figure)
+
+    # Renumber the defined nodes in the order of their definitions
+    n = len(order)
+    new_id = array('q', [-1]) * len(names)
+    for index, node in enumerate(order):
+        new_id[node] = index
+    for source, target in zip(sources, targets):
+        if new_id[target] < 0:
+            raise ValueError(f"Node '{names[source]}' is adjacent to the undefined node '{names[target]}'")
+    # Count the edges of every node then place them with a counting sort
+    indptr = array('q', bytes(8 * (n + 1)))
+    for source in sources:
+        indptr[new_id[source] + 1] += 1
+    for node in range(n):
+        indptr[node + 1] += indptr[node]
+    position = array('q', indptr[:n])
+    indices = array('q', bytes(8 * indptr[n]))
+    for source, target in zip(sources, targets):
+        source = new_id[source]
+        indices[position[source]] = new_id[target]
+        position[source] += 1
+    graph = CSRGraph([names[node] for node in order], array('d', (xs[node] for node in order)),
+                     array('d', (ys[node] for node in order)), indptr, indices)
+    index = graph.index
+    return graph, index[start], index[goal]
+
+# The path of the binary cache of the given graph file
+def cache_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".csr"
+
+def _little_endian(data) -> bytes:
+    if not isinstance(data, array): # a memoryview of a memory-mapped cache
+        data = array(data.format, data)
+    if sys.byteorder == "big":
+        data = array(data.typecode, data)
+        data.byteswap()
+    return data.tobytes()
+
+# The size in bytes of a cache file without the names (the header and the arrays)
+def _arrays_size(n: int, m: int) -> int:
+    return HEADER_SIZE + 8 * (n + n + (n + 1) + m + m + (n + 1)) # xs, ys, indptr, indices, weights, name offsets
+
+# Save a CSR graph to the binary cache format
+# The file is written next to the cache (so both are on the same file system) then atomically renamed to the cache path
+def save_cache(path: str, graph: CSRGraph, start: int, goal: int, json_path: str) -> None:
+    stat = os.stat(json_path)
+    name_data = [name.encode("utf-8") for name in graph.names]
+    name_offsets = array('q', [0])
+    for data in name_data:
+        name_offsets.append(name_offsets[-1] + len(data))
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(HEADER.pack(MAGIC, graph.node_count, graph.edge_count, start, goal, stat.st_size, stat.st_mtime_ns).ljust(HEADER_SIZE, b"\0"))
+            for data in (graph.xs, graph.ys, graph.indptr, graph.indices, graph.weights, name_offsets):
+                f.write(_little_endian(data))
+            f.write(b"".join(name_data))
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+# A read-only sequence of the node names stored in the cache (every name is decoded when it is accessed)
+class _MappedNames(Sequence[str]):
+    def __init__(self, offsets: Sequence[int], data: memoryview) -> None:
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0: index += len(self)
+        if not 0 <= index < len(self): raise IndexError(index)
+        return str(self.data[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+# Load a CSR graph from the binary cache by memory-mapping it.
+# It returns None if the cache is missing or does not match the current JSON file.
+def load_cache(path: str, json_path: str) -> Optional[Tuple[CSRGraph, int, int]]:
+    if not os.path.exists(path) or sys.byteorder == "big": return None
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE: return None
+        magic, n, m, start, goal, size, mtime = HEADER.unpack_from(header)
+        stat = os.stat(json_path)
+        if magic != MAGIC or size != stat.st_size or mtime != stat.st_mtime_ns: return None
+        # The file must be large enough for the arrays described by the header (a truncated file is rebuilt)
+        if n < 0 or m < 0 or os.fstat(f.fileno()).st_size < _arrays_size(n, m): return None
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) # the mapping stays valid after the file is closed
+    view = memoryview(mapped)
+    offset = HEADER_SIZE
+    def take(count: int, typecode: str) -> memoryview:
+        nonlocal offset
+        data = view[offset:offset + 8 * count].cast(typecode)
+        offset += 8 * count
+        return data
+    xs, ys = take(n, 'd'), take(n, 'd')
+    indptr, indices, weights = take(n + 1, 'q'), take(m, 'q'), take(m, 'd')
+    name_offsets = take(n + 1, 'q')
+    # The names must end exactly at the end of the file
+    if name_offsets[0] != 0 or offset + name_offsets[n] != len(mapped): return None
+    names = _MappedNames(name_offsets, view[offset:])
+    return CSRGraph(names, xs, ys, indptr, indices, weights), start, goal
+
+# Load a graph file with the streaming loader, using (and creating) the binary cache next to it if 'use_cache' is True
+def load_graph(path: str, use_cache: bool = True) -> Tuple[CSRGraph, int, int]:
+    if use_cache:
+        cached = load_cache(cache_path(path), path)
+        if cached is not None: return cached
+    graph, start, goal = stream_graph(path)
+    if use_cache:
+        save_cache(cache_path(path), graph, start, goal, path)
+    return graph, start, goal
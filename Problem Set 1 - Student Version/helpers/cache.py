@@ -0,0 +1,167 @@
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+from collections import OrderedDict
+import sys
+
+# This file contains bounded caches that can replace a plain dictionary when memoizing values (such as heuristics).
+# A plain dictionary grows without limit during long searches, so these caches evict entries once they are full:
+#   - LRUCache evicts the least recently used entry.
+#   - ClockCache approximates LRU with a reference bit per entry (the "second chance" algorithm), so a hit is cheaper
+#     since it does not have to reorder the entries.
+#   - SizeAwareCache is an LRU cache whose capacity is a total size (as measured by 'sizeof') instead of an entry count.
+# All of them count the hits, misses and evictions so that we can check whether caching pays off.
+# Only the lookups via 'in' and 'get' are counted as hits or misses, so the common pattern:
+#   if key in cache: return cache[key]
+# counts every lookup once.
+
+class BoundedCache:
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        found = self._contains(key)
+        if found: self.hits += 1
+        else: self.misses += 1
+        return found
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key in self:
+            return self[key]
+        return default
+
+    # Returns the counters as a dictionary
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _contains(self, key: Hashable) -> bool:
+        raise NotImplementedError()
+
+    def __getitem__(self, key: Hashable) -> Any:
+        raise NotImplementedError()
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        raise NotImplementedError()
+
+    def __len__(self) -> int:
+        raise NotImplementedError()
+
+class LRUCache(BoundedCache):
+    def __init__(self, capacity: int) -> None:
+        super().__init__(capacity)
+        self.entries: OrderedDict = OrderedDict()
+
+    def _contains(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def __getitem__(self, key: Hashable) -> Any:
+        self.entries.move_to_end(key) # Mark the entry as the most recently used
+        return self.entries[key]
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self.entries)
+
+class ClockCache(BoundedCache):
+    def __init__(self, capacity: int) -> None:
+        super().__init__(capacity)
+        self.entries: Dict[Hashable, List[Any]] = {} # key -> [value, referenced bit]
+        self.slots: List[Optional[Hashable]] = []    # the circular buffer of keys that the clock hand goes through
+        self.hand = 0
+
+    def _contains(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def __getitem__(self, key: Hashable) -> Any:
+        entry = self.entries[key]
+        entry[1] = True # Give the entry a second chance
+        return entry[0]
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry[0], entry[1] = value, True
+            return
+        if self.capacity <= 0: # like LRUCache, a cache without capacity evicts every new entry at once
+            self.evictions += 1
+            return
+        if len(self.slots) < self.capacity:
+            self.entries[key] = [value, False]
+            self.slots.append(key)
+            return
+        # Move the hand until we find an entry that was not referenced since the last pass, clearing the bits on the way
+        while True:
+            victim = self.entries[self.slots[self.hand]]
+            if not victim[1]: break
+            victim[1] = False
+            self.hand = (self.hand + 1) % self.capacity
+        del self.entries[self.slots[self.hand]]
+        self.evictions += 1
+        self.entries[key] = [value, False]
+        self.slots[self.hand] = key
+        self.hand = (self.hand + 1) % self.capacity
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self.entries)
+
+class SizeAwareCache(LRUCache):
+    def __init__(self, capacity: int, sizeof: Callable[[Any], int] = sys.getsizeof) -> None:
+        super().__init__(capacity)
+        self.sizeof = sizeof
+        self.sizes: Dict[Hashable, int] = {}
+        self.total_size = 0
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        size = self.sizeof(key) + self.sizeof(value)
+        self.total_size += size - self.sizes.get(key, 0)
+        self.sizes[key] = size
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        # Evict the least recently used entries until the total size fits (but always keep the new entry)
+        while self.total_size > self.capacity and len(self.entries) > 1:
+            evicted, _ = self.entries.popitem(last=False)
+            self.total_size -= self.sizes.pop(evicted)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["total_size"] = self.total_size
+        return stats
+
+DEFAULT_CAPACITY = 2**18      # the default capacity (in entries) of the "lru" and "clock" caches
+DEFAULT_SIZE_CAPACITY = 2**26 # the default capacity (in bytes) of the "size" caches
+
+# Create a cache given the name of its eviction policy ("lru", "clock" or "size")
+# The capacity is a number of entries except for the "size" policy where it is a number of bytes
+# (if it is None, the default capacity of the policy is used)
+def create_cache(policy: str = "lru", capacity: Optional[int] = None) -> BoundedCache:
+    if capacity is None:
+        capacity = DEFAULT_SIZE_CAPACITY if policy == "size" else DEFAULT_CAPACITY
+    if policy == "lru":
+        return LRUCache(capacity)
+    if policy == "clock":
+        return ClockCache(capacity)
+    if policy == "size":
+        return SizeAwareCache(capacity)
+    raise ValueError(f"Unknown cache policy '{policy}'")
@@ -1,19 +1,51 @@
-from problem import A, S, Problem
+from collections import deque
+from problem import A, S, HeuristicFunction, Problem
 from .utils import add_call_listener
 
 class InconsistentHeuristicException(Exception):
     pass
 
+# The message of an action where the decrease in the heuristic exceeds the action cost
+def _inconsistency_message(state: S, action: A, next_state: S, h: float, next_h: float, c: float) -> str:
+    message = f"State (heuristic = {h}):" + "\n" + str(state) + "\n"
+    message += f"Action: {str(action)} (cost = {c})" + "\n"
+    message += f"Next State (heuristic = {next_h}):" + "\n" + str(next_state) + "\n"
+    message += "Decrease in heuristic exceeds the actions cost\n"
+    message += f"h(state) - h(next state) = {h} - {next_h} = {h - next_h} > {c} (action cost)"
+    return message
+
 def test_heuristic_consistency(heuristic):
     def listener(next_state: S, problem: Problem[S, A], state: S, action: A):
         h = heuristic(problem, state)
         next_h = heuristic(problem, next_state)
         c = problem.get_cost(state, action)
         if h - next_h > c:
-            message = f"State (heuristic = {h}):" + "\n" + str(state) + "\n"
-            message += f"Action: {str(action)} (cost = {c})" + "\n"
-            message += f"Next State (heuristic = {next_h}):" + "\n" + str(next_state) + "\n"
-            message += "Decrease in heuristic exceeds the actions cost\n"
-            message += f"h(state) - h(next state) = {h} - {next_h} = {h - next_h} > {c} (action cost)"
-            raise InconsistentHeuristicException(message)
-    return add_call_listener(listener)
\ No newline at end of file
+            raise InconsistentHeuristicException(_inconsistency_message(state, action, next_state, h, next_h, c))
+    return add_call_listener(listener)
+
+# Check the heuristic on the states reachable from the initial state (in breadth first order, up to 'max_states' states):
+# it must be 0 on every goal and never decrease by more than the action cost.
+# It raises an InconsistentHeuristicException on the first violation and returns the number of checked states.
+def check_heuristic_consistency(problem: Problem[S, A], heuristic: HeuristicFunction, max_states: int = 100000) -> int:
+    initial_state = problem.get_initial_state()
+    seen = {initial_state}
+    frontier = deque([initial_state])
+    checked = 0
+    while frontier and checked < max_states:
+        state = frontier.popleft()
+        checked += 1
+        h = heuristic(problem, state)
+        if problem.is_goal(state):
+            if h != 0:
+                raise InconsistentHeuristicException(f"Goal State (heuristic = {h}):" + "\n" + str(state) + "\n" + "The heuristic of a goal must be 0")
+            continue
+        for action in problem.get_actions(state):
+            next_state = problem.get_successor(state, action)
+            next_h = heuristic(problem, next_state)
+            c = problem.get_cost(state, action)
+            if h - next_h > c:
+                raise InconsistentHeuristicException(_inconsistency_message(state, action, next_state, h, next_h, c))
+            if next_state not in seen:
+                seen.add(next_state)
+                frontier.append(next_state)
+    return checked
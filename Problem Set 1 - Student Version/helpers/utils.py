@@ -1,10 +1,12 @@
-from typing import Any, Callable, Dict, List
+from typing import Any, Callable, Dict, List, Optional
 from dataclasses import dataclass
 from collections import deque
 import importlib, os, sys
 from importlib import util as ilu
 import traceback
 
+from .cache import BoundedCache, create_cache
+
 solution_path = ""
 
 def set_solution_path(path: str):
@@ -77,27 +79,43 @@ def add_call_listener(listener):
         return decorated
     return decorator
 
+# Any class that extends CacheContainer gets a "cache" method which returns a bounded cache (see helpers/cache.py)
+# The caches are stored per namespace, so different kinds of data (e.g. heuristic values and per-problem analyses)
+# do not evict each other. The capacity and the eviction policy can be changed (before the first call to cache)
+# by overriding 'cache_capacity' and 'cache_policy' or by calling 'configure_cache'.
+# If 'cache_capacity' is None, the default capacity of the policy is used (see create_cache).
 class CacheContainer:
-    def cache(self) -> Dict[Any, Any]:
-        if hasattr(self, "_cache"):
-            return getattr(self, "_cache")
-        else:
-            cache = {}
-            setattr(self, "_cache", cache)
-            return cache
-
-# Unused
-def _cache_function(self) -> Dict[Any, Any]:
-    if hasattr(self, "_cache"):
-        return getattr(self, "_cache")
-    else:
-        cache = {}
-        setattr(self, "_cache", cache)
+    cache_capacity: Optional[int] = None
+    cache_policy: str = "lru"
+
+    def cache(self, namespace: str = "default") -> BoundedCache:
+        caches = _get_caches(self)
+        cache = caches.get(namespace)
+        if cache is None:
+            cache = create_cache(self.cache_policy, self.cache_capacity)
+            caches[namespace] = cache
         return cache
 
-def with_cache(cls):
-    cls.cache = _cache_function
-    return cls
+    def configure_cache(self, capacity: int = None, policy: str = None) -> None:
+        if capacity is not None: self.cache_capacity = capacity
+        if policy is not None: self.cache_policy = policy
+
+    # The caches are not pickled (e.g. when a problem is sent to another process), the copy starts with empty caches
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_caches", None)
+        return state
+
+    # Returns the hit/miss/eviction counters of every namespace
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {namespace: cache.stats() for namespace, cache in _get_caches(self).items()}
+
+def _get_caches(container) -> Dict[str, BoundedCache]:
+    if hasattr(container, "_caches"):
+        return getattr(container, "_caches")
+    caches = {}
+    setattr(container, "_caches", caches)
+    return caches
 
 class bcolors:
     BLACK = '\033[30m'
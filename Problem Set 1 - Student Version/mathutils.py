@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 from enum import IntEnum
-from typing import Iterator
+from typing import Iterator, List, Tuple
 import math
 
 # the class Point will hold a 2D coordinate on a discrete grid
@@ -32,6 +32,11 @@ class Point:
     def __iter__(self) -> Iterator[int]:
         return iter((self.x, self.y))
 
+    # The default pickling of a frozen dataclass with __slots__ fails (it restores the slots via setattr),
+    # so we rebuild the point from its coordinates instead (needed to send points between processes)
+    def __reduce__(self):
+        return (Point, (self.x, self.y))
+
 # This is a helper function to compute the manhattan distance between 2 points
 def manhattan_distance(p1: Point, p2: Point) -> int:
     return abs(p1.x - p2.x) + abs(p1.y - p2.y)
@@ -75,4 +80,108 @@ Direction._Vectors = [
     Point( 0, -1),
     Point(-1,  0),
     Point( 0,  1)
-]
\ No newline at end of file
+]
+
+# This class solves the assignment problem (also known as minimum cost bipartite matching)
+# using the Hungarian algorithm in O(n^2 m) where n is the number of rows and m is the number of columns.
+# It keeps the dual potentials of the rows and columns so that, if a single row changes,
+# the optimal assignment can be repaired with one augmenting path in O(n m) instead of solving from scratch.
+# Infinite costs are supported: if every assignment contains an infinite cost, the total cost is inf.
+# If there are more rows than columns, the matrix is padded with infinite columns (so the total cost is inf).
+class Assignment:
+    __slots__ = ("cost", "n", "m", "columns", "u", "v", "owner")
+    BIG = 1e9 # Infinite costs are replaced by this value which must be larger than any finite assignment
+
+    def __init__(self, cost: List[List[float]]) -> None:
+        self.n = len(cost)
+        self.columns = len(cost[0]) if cost else 0 # the number of columns before the padding
+        self.m = max(self.columns, self.n)
+        self.cost = [self._row(row) for row in cost]
+        # u and v are the potentials of the rows and columns (1-indexed, index 0 is a virtual column)
+        # owner[j] is the row assigned to column j (0 if no row is assigned)
+        self.u, self.v, self.owner = [0] * (self.n + 1), [0] * (self.m + 1), [0] * (self.m + 1)
+        for row in range(1, self.n + 1):
+            self._augment(row)
+
+    # Find the shortest augmenting path (in reduced costs) from the given (unassigned) row to a free column
+    # and flip the assignments along it
+    def _augment(self, row: int) -> None:
+        u, v, owner, matrix, m = self.u, self.v, self.owner, self.cost, self.m
+        way = [0] * (m + 1)
+        owner[0] = row
+        column = 0
+        minimum = [math.inf] * (m + 1)
+        used = [False] * (m + 1)
+        while owner[column] != 0:
+            used[column] = True
+            current, delta, next_column = owner[column], math.inf, 0
+            costs = matrix[current - 1]
+            for j in range(1, m + 1):
+                if used[j]: continue
+                reduced = costs[j - 1] - u[current] - v[j]
+                if reduced < minimum[j]:
+                    minimum[j], way[j] = reduced, column
+                if minimum[j] < delta:
+                    delta, next_column = minimum[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[owner[j]] += delta
+                    v[j] -= delta
+                else:
+                    minimum[j] -= delta
+            column = next_column
+        while column != 0:
+            previous = way[column]
+            owner[column] = owner[previous]
+            column = previous
+
+    # Replace the infinite costs of a row and pad it to 'm' columns
+    def _row(self, costs: List[float]) -> List[float]:
+        return [Assignment.BIG if math.isinf(c) else c for c in costs] + [Assignment.BIG] * (self.m - self.columns)
+
+    # Create a copy that can be updated without modifying this assignment
+    def copy(self) -> 'Assignment':
+        other = Assignment.__new__(Assignment)
+        other.cost, other.n, other.m, other.columns = list(self.cost), self.n, self.m, self.columns
+        other.u, other.v, other.owner = list(self.u), list(self.v), list(self.owner)
+        return other
+
+    # Replace the costs of the given row (0-indexed) and repair the assignment.
+    # The other rows keep feasible potentials, so we only need to make the new row feasible then augment it.
+    # This is only exact if every column is assigned (n == m, which includes the padded matrices),
+    # otherwise we solve from scratch.
+    def update_row(self, row: int, costs: List[float]) -> None:
+        self.cost[row] = self._row(costs)
+        if self.n != self.m:
+            self.__init__([[math.inf if c >= Assignment.BIG else c for c in row] for row in self.cost])
+            return
+        row += 1
+        for j in range(1, self.m + 1):
+            if self.owner[j] == row:
+                self.owner[j] = 0
+        self.u[row] = min(c - v for c, v in zip(self.cost[row - 1], self.v[1:]))
+        self._augment(row)
+
+    # Get the list where assignment[row] is the column assigned to that row (-1 if it is assigned to a padded column)
+    def assignment(self) -> List[int]:
+        assignment = [0] * self.n
+        for j in range(1, self.m + 1):
+            if self.owner[j] != 0:
+                assignment[self.owner[j] - 1] = j - 1 if j <= self.columns else -1
+        return assignment
+
+    # Get the total cost of the assignment
+    def total(self) -> float:
+        total = 0
+        for j in range(1, self.m + 1):
+            if self.owner[j] != 0:
+                c = self.cost[self.owner[j] - 1][j - 1]
+                if c >= Assignment.BIG: return math.inf
+                total += c
+        return total
+
+# This is a helper function to solve the assignment problem with the Hungarian algorithm (see Assignment)
+# It returns the minimum total cost and a list where assignment[row] is the column assigned to that row.
+def min_cost_assignment(cost: List[List[float]]) -> Tuple[float, List[int]]:
+    assignment = Assignment(cost)
+    return assignment.total(), assignment.assignment()
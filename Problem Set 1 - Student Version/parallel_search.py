@@ -0,0 +1,257 @@
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Any, List, Optional, Tuple
+import heapq, math, multiprocessing, os, pickle, queue, time, traceback
+
+from problem import HeuristicFunction, Problem, S, A, Solution
+
+# This file contains a hash distributed A* (HDA*) which runs a single A* search over several processes.
+# Every state is owned by exactly one worker (chosen by the hash of its packed form, see Problem.pack_state), so:
+#   - Every worker keeps its own open list, best known path costs and parent pointers for the states it owns
+#     and no state is ever expanded by two workers at the same time.
+#   - When a worker generates a successor owned by another worker, it sends it directly to the inbox of that worker
+#     (in batches of up to 'batch_size' nodes) and the owner computes its heuristic, detects duplicates and inserts it
+#     in its own open list. The workers never wait for each other: a worker only blocks when it has nothing to expand.
+# The coordinator (the calling process) never relays nodes. It only:
+#   - Keeps the cost of the best solution found so far (the incumbent) and broadcasts it when a worker finds a better goal.
+#     Since the heuristic is admissible, no node with f >= incumbent can lead to a cheaper solution, so the workers
+#     only expand nodes with f < incumbent (a goal found early does not stop the search but bounds it).
+#   - Detects the termination with status waves: it asks every worker for the number of nodes it sent and received and
+#     whether it is idle (its open list is empty or only contains nodes with f >= incumbent). The search is over when
+#     two consecutive waves find every worker idle with the same counters and as many nodes received as sent:
+#     no worker did anything between its two answers and no node is in flight, so no worker can become busy again.
+#     The incumbent is then optimal.
+#   - Follows the parent pointers of the goal (every pointer is stored by the owner of its state) to build the solution.
+# Every wait of the coordinator has a timeout after which it checks that the workers are still alive, and a worker that
+# raises an exception sends it back to the coordinator where it is raised again (with the traceback of the worker as a note).
+#
+# The problem and the heuristic must be picklable (the heuristic should be a module-level function such as strong_heuristic).
+# Every worker works on its own unpickled copy of the problem (with empty caches).
+# The states are never sent between processes: the messages contain their packed form (such as the player cell and
+# the crate mask of a sokoban state) which the receiver unpacks with its own copy of the problem, so the objects shared
+# between the states (such as the sokoban layout) are not pickled with every node. The packed form is also the key of
+# the state in the tables of the workers (it identifies the state exactly so different states are never merged).
+# The owner of a state is hash(packed) % workers. For packed forms made of ints (sokoban and parking states),
+# the hash is the same in every process. For others (such as GraphNode whose hash depends on the string hash seed),
+# the workers must share the hash seed which is the case with the "fork" start method (the default on linux)
+# or when PYTHONHASHSEED is set.
+
+LIVENESS_INTERVAL = 1.0 # how long (in seconds) the coordinator waits for a message before checking that the workers are alive
+WAVE_INTERVAL = 0.01    # the pause (in seconds) between two status waves while some workers are busy
+
+@dataclass
+class WorkerStats:
+    worker: int
+    expanded: int = 0   # the number of expanded nodes
+    generated: int = 0  # the number of generated successors
+    received: int = 0   # the number of nodes received from the other workers
+    inserted: int = 0   # the number of generated or received nodes that were new or reached with a cheaper path
+
+@dataclass
+class ParallelSearchResult:
+    solution: Solution
+    cost: float
+    rounds: int         # the number of status waves sent by the coordinator
+    stats: List[WorkerStats] = field(default_factory=list)
+
+    @property
+    def expanded(self) -> int:
+        return sum(stats.expanded for stats in self.stats)
+
+    # The ratio between the largest number of expansions done by a worker and the average (1 means a perfect balance)
+    @property
+    def load_balance(self) -> float:
+        if not self.stats or self.expanded == 0: return 1.0
+        return max(stats.expanded for stats in self.stats) * len(self.stats) / self.expanded
+
+# A node message is a tuple (packed state, g, packed parent, action) where the packed parent is None for the initial state
+Message = Tuple[Any, float, Any, Any]
+
+def _worker(index: int, workers: int, problem_data: bytes, heuristic: HeuristicFunction, batch_size: int, inboxes, outbox) -> None:
+    try:
+        _run_worker(index, workers, problem_data, heuristic, batch_size, inboxes, outbox)
+    except BaseException as error:
+        # Send the exception to the coordinator (or only its traceback if it cannot be pickled)
+        try:
+            pickle.dumps(error)
+        except Exception:
+            error = None
+        outbox.put(("error", index, error, traceback.format_exc()))
+
+def _run_worker(index: int, workers: int, problem_data: bytes, heuristic: HeuristicFunction, batch_size: int, inboxes, outbox) -> None:
+    problem: Problem = pickle.loads(problem_data)
+    inbox, parent_pid = inboxes[index], os.getppid()
+    stats = WorkerStats(index)
+    counter = count() # to keep order for equal costs
+    frontier = []     # the open list of (f, order, g, packed state, state)
+    best_g = {}       # the best known path cost of every owned state (by packed state)
+    parents = {}      # parents[packed] = (packed parent, action) for the best known path to every owned state
+    outgoing: List[List[Message]] = [[] for _ in range(workers)] # the generated nodes waiting to be sent to their owners
+    incumbent = math.inf
+    sent = received = 0
+
+    # Insert the node if it is reached with a cheaper path and may lead to a better solution
+    # The state is only unpacked (when it was received from another worker) if it passes the first check
+    def insert(packed, g: float, parent, action, state=None) -> None:
+        if g >= best_g.get(packed, math.inf): return
+        if state is None: state = problem.unpack_state(packed)
+        h = heuristic(problem, state)
+        if g + h >= incumbent: return
+        best_g[packed] = g
+        parents[packed] = (parent, action)
+        heapq.heappush(frontier, (g + h, next(counter), g, packed, state))
+        stats.inserted += 1
+
+    def idle() -> bool:
+        return not frontier or frontier[0][0] >= incumbent
+
+    # Send the waiting nodes to their owners
+    def flush() -> None:
+        nonlocal sent
+        for destination, messages in enumerate(outgoing):
+            if messages:
+                inboxes[destination].put(("nodes", messages))
+                sent += len(messages)
+                outgoing[destination] = []
+
+    while True:
+        # Handle the waiting messages (and wait for one while there is nothing to expand)
+        while True:
+            if idle():
+                try:
+                    command = inbox.get(timeout=LIVENESS_INTERVAL)
+                except queue.Empty:
+                    if os.getppid() != parent_pid: return # the coordinator is gone
+                    continue
+            else:
+                try:
+                    command = inbox.get_nowait()
+                except queue.Empty:
+                    break
+            kind = command[0]
+            if kind == "nodes":
+                received += len(command[1])
+                stats.received += len(command[1])
+                for message in command[1]: insert(*message)
+            elif kind == "incumbent":
+                incumbent = min(incumbent, command[1])
+            elif kind == "status":
+                outbox.put(("status", index, command[1], sent, received, idle(), stats))
+            elif kind == "parent":
+                outbox.put(("parent", parents.get(command[1])))
+            else: # "stop"
+                return
+        # Expand up to 'batch_size' nodes whose f is below the incumbent
+        expanded = 0
+        while frontier and expanded < batch_size and frontier[0][0] < incumbent:
+            _, _, g, packed, state = heapq.heappop(frontier)
+            if g > best_g[packed]: # an outdated entry of a state that was reached again with a cheaper path
+                continue
+            if problem.is_goal(state):
+                incumbent = g
+                outbox.put(("goal", g, packed))
+                continue
+            expanded += 1
+            for action in problem.get_actions(state):
+                successor = problem.get_successor(state, action)
+                successor_packed = problem.pack_state(successor)
+                destination = hash(successor_packed) % workers
+                cost = g + problem.get_cost(state, action)
+                if destination == index:
+                    insert(successor_packed, cost, packed, action, successor)
+                else:
+                    outgoing[destination].append((successor_packed, cost, packed, action))
+                stats.generated += 1
+            if any(len(messages) >= batch_size for messages in outgoing): flush()
+        stats.expanded += expanded
+        flush()
+
+# Run HDA* with the given number of worker processes (the number of cores by default) and return the solution with the statistics
+def hash_distributed_astar(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction,
+                           workers: Optional[int] = None, batch_size: int = 256) -> ParallelSearchResult:
+    workers = workers or os.cpu_count() or 1
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    problem_data = pickle.dumps(problem)
+    inboxes = [context.Queue() for _ in range(workers)]
+    outbox = context.Queue()
+    processes = [context.Process(target=_worker, args=(index, workers, problem_data, heuristic, batch_size, inboxes, outbox), daemon=True)
+                 for index in range(workers)]
+    for process in processes: process.start()
+
+    def owner(packed) -> int:
+        return hash(packed) % workers
+
+    # Wait for the next message of the workers while checking that they are alive and raise the errors they send
+    def receive():
+        while True:
+            try:
+                message = outbox.get(timeout=LIVENESS_INTERVAL)
+            except queue.Empty:
+                for index, process in enumerate(processes):
+                    if not process.is_alive():
+                        raise RuntimeError(f"HDA* worker {index} exited unexpectedly with exit code {process.exitcode}")
+                continue
+            if message[0] == "error":
+                _, index, error, worker_traceback = message
+                if error is None:
+                    raise RuntimeError(f"HDA* worker {index} failed:\n{worker_traceback}")
+                error.add_note(f"Raised in HDA* worker {index}:\n{worker_traceback}")
+                raise error
+            return message
+
+    try:
+        packed = problem.pack_state(initial_state)
+        inboxes[owner(packed)].put(("nodes", [(packed, 0, None, None)]))
+        incumbent, goal_key = math.inf, None
+        stats: List[WorkerStats] = [WorkerStats(index) for index in range(workers)]
+        rounds, previous = 0, None
+        while True:
+            rounds += 1
+            for inbox in inboxes: inbox.put(("status", rounds))
+            replies = {}
+            while len(replies) < workers:
+                message = receive()
+                if message[0] == "goal":
+                    _, g, state_key = message
+                    if g < incumbent:
+                        incumbent, goal_key = g, state_key
+                        for inbox in inboxes: inbox.put(("incumbent", incumbent))
+                elif message[0] == "status" and message[2] == rounds:
+                    _, index, _, sent, received, idle, worker_stats = message
+                    replies[index] = (sent, received, idle)
+                    stats[index] = worker_stats
+            counters = [replies[index] for index in range(workers)]
+            all_idle = all(idle for _, _, idle in counters)
+            # The coordinator sent the initial node so it is added to the sent nodes
+            balanced = 1 + sum(sent for sent, _, _ in counters) == sum(received for _, received, _ in counters)
+            if all_idle and balanced and counters == previous:
+                break
+            previous = counters if all_idle else None
+            if not all_idle: time.sleep(WAVE_INTERVAL)
+
+        if goal_key is None:
+            return ParallelSearchResult(None, math.inf, rounds, stats)
+        # Follow the parent pointers back to the initial state (every pointer is stored by the owner of its state)
+        path, state_key = [], goal_key
+        while True:
+            inboxes[owner(state_key)].put(("parent", state_key))
+            message = receive()
+            while message[0] != "parent": message = receive()
+            parent_key, action = message[1]
+            if parent_key is None: break
+            path.append(action)
+            state_key = parent_key
+        path.reverse()
+        return ParallelSearchResult(path, incumbent, rounds, stats)
+    finally:
+        for inbox in inboxes: inbox.put(("stop",))
+        for process in processes: process.join(timeout=1)
+        for process in processes:
+            if process.is_alive(): process.terminate()
+
+# The same search with the signature of the other search functions (so it can be used by InformedSearchAgent)
+def HashDistributedAStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction) -> Solution:
+    if problem.is_goal(initial_state): # check if already at goal no actions needed
+        return []
+    return hash_distributed_astar(problem, initial_state, heuristic).solution
@@ -1,10 +1,54 @@
-from typing import Any, Dict, Set, Tuple, List
+from typing import Any, Dict, Iterator, Set, Tuple, List
 from problem import Problem
 from mathutils import Direction, Point
 from helpers.utils import NotImplemented
+import random
 
 #TODO: (Optional) Instead of Any, you can define a type for the parking state
-ParkingState = Any
+# The grid cells are numbered in row-major order: the cell of position (x, y) is y * width + x.
+# The parking state stores:
+#   - cells: a tuple of cell indices where cells[i] is the cell of car 'i'.
+#   - occupied: a bitmask of the cells that contain a car, so checking if a cell is free is a single bit test.
+#   - zobrist: the XOR of a random 64-bit key for every (car, cell) pair.
+# The mask and the key are updated in O(1) by get_successor and the key is returned directly by the hash function,
+# so the state does not have to hash every car position on every dictionary lookup.
+# It also holds the table of the points of the cells (shared by all the states of the problem)
+# so that it behaves like the tuple of car positions (iteration, indexing, len and 'in').
+class ParkingState:
+    __slots__ = ("cells", "occupied", "zobrist", "points")
+
+    def __init__(self, cells: Tuple[int, ...], occupied: int, zobrist: int, points: Tuple[Point, ...]) -> None:
+        self.cells = cells
+        self.occupied = occupied
+        self.zobrist = zobrist
+        self.points = points
+
+    def __hash__(self) -> int:
+        return self.zobrist
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ParkingState): return False # NotImplemented is shadowed by the helper imported above
+        return self.zobrist == other.zobrist and self.cells == other.cells
+
+    # The positions of the cars as points
+    @property
+    def cars(self) -> Tuple[Point, ...]:
+        return tuple(self.points[cell] for cell in self.cells)
+
+    def __iter__(self) -> Iterator[Point]:
+        return (self.points[cell] for cell in self.cells)
+
+    def __getitem__(self, index: int) -> Point:
+        return self.points[self.cells[index]]
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def __contains__(self, position: Point) -> bool:
+        return position in self.cars
+
+    def __str__(self) -> str:
+        return str(tuple(str(car) for car in self))
 
 # An action of the parking problem is a tuple containing an index 'i' and a direction 'd' where car 'i' should move in the direction 'd'.
 ParkingAction = Tuple[int, Direction]
@@ -17,28 +61,33 @@ class ParkingProblem(Problem[ParkingState, ParkingAction]):
                             # if a position does not contain a parking slot, it will not be in this dictionary.
     width: int              # The width of the parking lot.
     height: int             # The height of the parking lot.
+    # The compact tables built once by from_text (see ParkingState for the cell numbering)
+    points: Tuple[Point, ...]                           # points[cell] is the position of the cell
+    passage_mask: int                                   # a bitmask of the passage cells
+    neighbors: Tuple[Tuple[int, ...], ...]              # neighbors[cell][d] is the cell in direction 'd' or -1 if it is a wall
+    moves: Tuple[Tuple[Tuple[Direction, int], ...], ...] # moves[cell] lists the (direction, cell) pairs that are not walls (in the order of Direction)
+    car_cells: Tuple[int, ...]                          # the initial cell of every car
+    goal_cells: Tuple[int, ...]                         # the slot cell of every car (or -1 if it has no slot)
+    zobrist: Tuple[Tuple[int, ...], ...]                # zobrist[cell][i] is the random key of car 'i' at the given cell.
 
     # This function should return the initial state
     def get_initial_state(self) -> ParkingState:
         #TODO: ADD YOUR CODE HERE
-        return self.cars # returning positions of cars 
+        return ParkingState(self.car_cells, self.occupancy(self.car_cells), self.zobrist_key(self.car_cells), self.points) # returning positions of cars 
     
     # This function should return True if the given state is a goal. Otherwise, it should return False.
     def is_goal(self, state: ParkingState) -> bool:
         #TODO: ADD YOUR CODE HERE
-        for i, pos in enumerate(state): # looping on positions of cars at current state 
-            if pos not in self.slots or self.slots[pos] != i: # if curr position does not match goal for any car -> return false
-                return False
-        return True
+        return state.cells == self.goal_cells # every car must be on the cell of its own slot
     
     # This function returns a list of all the possible actions that can be applied to the given state
     def get_actions(self, state: ParkingState) -> List[ParkingAction]:
         #TODO: ADD YOUR CODE HERE
         actions = []
-        for i, pos in enumerate(state): # looping for each car 
-            for d in Direction: # looping for each possible direction
-                new_pos = pos + d.to_vector() # new pos
-                if new_pos in self.passages and new_pos not in state: # add action if new pos is a passage (not a wall) and it is not occupied
+        moves, occupied = self.moves, state.occupied
+        for i, cell in enumerate(state.cells): # looping for each car 
+            for d, new_cell in moves[cell]: # looping for each direction that does not lead to a wall
+                if not occupied >> new_cell & 1: # add action if the new cell is not occupied
                     actions.append((i, d))
         return actions
     
@@ -46,14 +95,20 @@ class ParkingProblem(Problem[ParkingState, ParkingAction]):
     def get_successor(self, state: ParkingState, action: ParkingAction) -> ParkingState:
         #TODO: ADD YOUR CODE HERE
         i, d = action
-        move = Direction._Vectors[d.value]
-        new_pos = state[i] + move # new pos after action
-        new_state = list(state)
-        if new_pos in self.passages: # if new position is not a wall
-            new_state[i] = new_pos
-            return tuple(new_state)
-        else:
+        cells = state.cells
+        cell = cells[i]
+        new_cell = self.neighbors[cell][d] # new cell after action
+        if new_cell < 0: # if the new position is a wall, the car does not move
             return state
+        new_cells = cells[:i] + (new_cell,) + cells[i+1:]
+        occupied = state.occupied
+        if occupied >> new_cell & 1 or occupied.bit_count() != len(cells):
+            # the car collides with another car (or some cars already share a cell), so the mask is rebuilt from scratch
+            occupied = self.occupancy(new_cells)
+        else:
+            occupied ^= (1 << cell) | (1 << new_cell)
+        # the zobrist key of the new state removes the key of car 'i' at its old cell and adds its key at the new cell
+        return ParkingState(new_cells, occupied, state.zobrist ^ self.zobrist[cell][i] ^ self.zobrist[new_cell][i], self.points)
     
     # This function returns the cost of applying the given action to the given state
     def get_cost(self, state: ParkingState, action: ParkingAction) -> float:
@@ -61,6 +116,31 @@ class ParkingProblem(Problem[ParkingState, ParkingAction]):
         i, _ = action # i is index of letter A -> 0 and cost is 26 complement so cost is 26 - 0 = 26
         return 26 - i
     
+    # Compute the occupancy bitmask of the given car cells
+    def occupancy(self, cells: Tuple[int, ...]) -> int:
+        occupied = 0
+        for cell in cells:
+            occupied |= 1 << cell
+        return occupied
+
+    # Compute the zobrist key of the given car cells from scratch
+    def zobrist_key(self, cells: Tuple[int, ...]) -> int:
+        key = 0
+        for i, cell in enumerate(cells):
+            key ^= self.zobrist[cell][i]
+        return key
+
+    # A state is packed as the tuple of car cells (the mask and the key are computed again when it is unpacked)
+    def pack_state(self, state: ParkingState) -> Tuple[int, ...]:
+        return state.cells
+
+    def unpack_state(self, data: Tuple[int, ...]) -> ParkingState:
+        return ParkingState(data, self.occupancy(data), self.zobrist_key(data), self.points)
+
+    # Convert a point to its cell index
+    def cell_of(self, position: Point) -> int:
+        return position.y * self.width + position.x
+
      # Read a parking problem from text containing a grid of tiles
     @staticmethod
     def from_text(text: str) -> 'ParkingProblem':
@@ -84,6 +164,27 @@ class ParkingProblem(Problem[ParkingState, ParkingAction]):
         problem.slots = {position:index for index, position in slots.items()}
         problem.width = width
         problem.height = height
+        # Build the compact tables once: the points of the cells, the passages bitmask and the neighbors of every cell
+        problem.points = tuple(Point(x, y) for y in range(height) for x in range(width))
+        problem.passage_mask = problem.occupancy(tuple(problem.cell_of(position) for position in passages))
+        vectors = [d.to_vector() for d in Direction]
+        problem.neighbors = tuple(
+            tuple(problem.cell_of(position + vector) if position + vector in passages else -1 for vector in vectors)
+            for position in problem.points
+        )
+        problem.moves = tuple(
+            tuple((d, cell) for d, cell in zip(Direction, neighbors) if cell >= 0)
+            for neighbors in problem.neighbors
+        )
+        problem.car_cells = tuple(problem.cell_of(position) for position in problem.cars)
+        problem.goal_cells = tuple(problem.cell_of(slots[i]) if i in slots else -1 for i in range(len(cars)))
+        generator = random.Random(0) # A fixed seed makes the keys reproducible across runs and processes
+        # The keys are drawn for the passages in row-major order then every wall cell gets an empty tuple
+        keys = {
+            problem.cell_of(position): tuple(generator.getrandbits(64) for _ in problem.cars)
+            for position in sorted(passages, key=lambda position: (position.y, position.x))
+        }
+        problem.zobrist = tuple(keys.get(cell, ()) for cell in range(width * height))
         return problem
 
     # Read a parking problem from file containing a grid of tiles
@@ -0,0 +1,61 @@
+from array import array
+from collections import deque
+from typing import Tuple
+import argparse, math
+
+from parking import ParkingProblem, ParkingState
+
+# This file contains an admissible and consistent heuristic for the parking problem.
+# Every car has to reach its own slot, and moving car 'i' one step costs 26 - i, so the cost of any solution
+# is at least the sum over the cars of (26 - i) times the shortest distance from car 'i' to its slot.
+# The distances ignore the other cars, so they are computed once per problem with a BFS from every slot over the passages.
+# The heuristic is consistent since an action moves a single car 'i' by one step, which changes its distance
+# (and thus the heuristic) by at most 1 * (26 - i) which is the cost of the action.
+
+# Compute the distance from every cell to the slot of every car (once per problem).
+# distances[i][cell] is the number of steps from the cell to the slot of car 'i' (or -1 if it cannot be reached).
+# The maps are stored in the "analysis" namespace of the problem cache (like the deadlocked cells of sokoban).
+def slot_distances(problem: ParkingProblem) -> Tuple[array, ...]:
+    cache = problem.cache("analysis")
+    distances = cache.get(slot_distances)
+    if distances is None:
+        distances = tuple(_bfs(problem, goal) for goal in problem.goal_cells)
+        cache[slot_distances] = distances
+    return distances
+
+# A breadth first search from the given cell over the passages (the moves are reversible so it gives the distances to the cell)
+def _bfs(problem: ParkingProblem, source: int) -> array:
+    distance = array('q', [-1]) * (problem.width * problem.height)
+    if source < 0: return distance # the car has no slot so no cell can reach it
+    distance[source] = 0
+    frontier = deque([source])
+    while frontier:
+        cell = frontier.popleft()
+        for _, neighbor in problem.moves[cell]:
+            if distance[neighbor] < 0:
+                distance[neighbor] = distance[cell] + 1
+                frontier.append(neighbor)
+    return distance
+
+def parking_heuristic(problem: ParkingProblem, state: ParkingState) -> float:
+    distances = slot_distances(problem)
+    total = 0
+    for i, cell in enumerate(state.cells):
+        distance = distances[i][cell]
+        if distance < 0: return math.inf # this car can never reach its slot
+        total += (26 - i) * distance
+    return total
+
+if __name__ == "__main__":
+    from helpers.heuristic_checks import check_heuristic_consistency
+
+    # Read the arguments from the command line
+    parser = argparse.ArgumentParser(description="Check that the parking heuristic is consistent on the states of a parking lot")
+    parser.add_argument("park", help="path to the parking lot file")
+    parser.add_argument("--max-states", type=int, default=100000, help="the maximum number of states to check")
+
+    args = parser.parse_args()
+    problem = ParkingProblem.from_file(args.park)
+    print(f"Initial heuristic: {parking_heuristic(problem, problem.get_initial_state())}")
+    checked = check_heuristic_consistency(problem, parking_heuristic, args.max_states)
+    print(f"The heuristic is consistent on {checked} states")
@@ -0,0 +1,292 @@
+from array import array
+from collections import deque
+from itertools import combinations
+from typing import Iterable, List, Optional, Sequence, Tuple
+import argparse, heapq, math, mmap, os, struct, sys, tempfile, zlib
+
+from mathutils import Direction
+from parking import ParkingProblem, ParkingState
+from sokoban import SokobanLayout, SokobanProblem, SokobanState
+
+# This file contains pattern databases (PDBs) for sokoban and parking.
+# A pattern database is the exact cost to the goal of every state of an abstraction of the problem
+# (a simpler problem where some pieces are removed), so it is an admissible and consistent heuristic of the original problem.
+# It is expensive to build but it only depends on the map, so it is built once per map, saved to disk and reused:
+#   - Parking: the abstraction only keeps a subset of the cars (the pattern) and removes the others.
+#     The costs are computed by a retrograde search from the goal (the pattern cars on their slots). The moves are reversible
+#     with the same cost, so the cost from a state to the goal is the cost from the goal to that state.
+#     Since every action moves a single car, the databases of disjoint patterns count disjoint costs and can be added.
+#   - Sokoban: the abstraction keeps the player and 'size' crates (any of them since the crates are identical)
+#     and the goal is to have these crates on any goals. The retrograde search starts from all the goal states
+#     and walks or pulls backwards. The value of a state is the largest value over all its subsets of 'size' crates.
+#     The player moves are shared by all the crates, so the sokoban databases can only be combined by max.
+# The costs are stored in a flat array of unsigned 32-bit ints (UNREACHABLE if the goal cannot be reached) where
+# the index of an abstract state is a mixed radix number with one digit per piece.
+# The files are loaded with mmap (the costs are a memoryview on the mapped file), so the solver processes
+# that use the same file share its pages instead of having their own copies.
+
+UNREACHABLE = 0xFFFFFFFF
+MAGIC = b"PDB1"
+HEADER = struct.Struct("<4s8sqqqI") # magic, kind, pattern length, radix, entry count, map checksum
+HEADER_SIZE = 48                     # the header is padded so that the pattern and the costs are 8-byte aligned
+
+class PatternDatabase:
+    kind: bytes = b""
+    additive: bool = False
+
+    def __init__(self, pattern: Tuple[int, ...], radix: int, costs: Sequence[int], checksum: int) -> None:
+        self.pattern = pattern   # the car indices (parking) or a single item which is the number of crates (sokoban)
+        self.radix = radix       # the number of values of every digit of the index
+        self.costs = costs       # an array('I') when built or a memoryview when loaded
+        self.checksum = checksum # the checksum of the map that the database was built for
+
+    def cost(self, index: int) -> float:
+        cost = self.costs[index]
+        return math.inf if cost == UNREACHABLE else cost
+
+    # Save the database to a binary file (always little endian)
+    # The file is written next to the database then atomically renamed, so the solvers never map a partially written file
+    def save(self, path: str) -> None:
+        costs = self.costs if isinstance(self.costs, array) else array('I', self.costs)
+        pattern = array('q', self.pattern)
+        if sys.byteorder == "big":
+            costs, pattern = array('I', costs), array('q', pattern)
+            costs.byteswap()
+            pattern.byteswap()
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(HEADER.pack(MAGIC, self.kind, len(self.pattern), self.radix, len(costs), self.checksum).ljust(HEADER_SIZE, b"\0"))
+                f.write(pattern.tobytes())
+                f.write(costs.tobytes())
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    # Memory-map a database file and return (pattern, radix, costs) or None if the file is missing, of another kind or stale
+    @classmethod
+    def _map(cls, path: str, checksum: int) -> Optional[Tuple[Tuple[int, ...], int, memoryview]]:
+        if not os.path.exists(path) or sys.byteorder == "big": return None
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+            if len(header) < HEADER_SIZE: return None
+            magic, kind, length, radix, count, stored_checksum = HEADER.unpack_from(header)
+            if magic != MAGIC or kind != cls.kind.ljust(8, b"\0") or stored_checksum != checksum: return None
+            if os.fstat(f.fileno()).st_size != HEADER_SIZE + 8 * length + 4 * count: return None
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) # the mapping stays valid after the file is closed
+        view = memoryview(mapped)
+        pattern = tuple(view[HEADER_SIZE:HEADER_SIZE + 8 * length].cast('q'))
+        costs = view[HEADER_SIZE + 8 * length:].cast('I')
+        return pattern, radix, costs
+
+# The database of a subset of the cars of a parking lot
+class ParkingPatternDatabase(PatternDatabase):
+    kind = b"parking"
+    additive = True
+
+    def __init__(self, problem: ParkingProblem, pattern: Tuple[int, ...], costs: Sequence[int]) -> None:
+        self.ranks, passages = _passage_ranks(problem)
+        super().__init__(pattern, len(passages), costs, parking_checksum(problem))
+
+    # The index of the positions of the pattern cars (given as cells) where every car is a digit
+    def index(self, cells: Iterable[int]) -> int:
+        index, ranks, radix = 0, self.ranks, self.radix
+        for cell in reversed(tuple(cells)):
+            index = index * radix + ranks[cell]
+        return index
+
+    def lookup(self, problem: ParkingProblem, state: ParkingState) -> float:
+        cells = state.cells
+        return self.cost(self.index(cells[car] for car in self.pattern))
+
+    # Compute the cost from every placement of the pattern cars to their slots with a retrograde Dijkstra from the goal
+    # (Dijkstra instead of a BFS since the cost of a move depends on the car)
+    @staticmethod
+    def build(problem: ParkingProblem, pattern: Iterable[int]) -> 'ParkingPatternDatabase':
+        pattern = tuple(pattern)
+        ranks, passages = _passage_ranks(problem)
+        n, k = len(passages), len(pattern)
+        costs = array('I', [UNREACHABLE]) * (n ** k)
+        database = ParkingPatternDatabase(problem, pattern, costs)
+        goal = tuple(problem.goal_cells[car] for car in pattern)
+        if any(cell < 0 for cell in goal): return database # a car without a slot can never be parked
+        costs[database.index(goal)] = 0
+        frontier = [(0, goal)]
+        while frontier:
+            cost, cells = heapq.heappop(frontier)
+            if cost > costs[database.index(cells)]: continue # an outdated entry
+            for j, car in enumerate(pattern):
+                move_cost = cost + 26 - car
+                for _, new_cell in problem.moves[cells[j]]:
+                    if new_cell in cells: continue # the pattern cars cannot overlap
+                    new_cells = cells[:j] + (new_cell,) + cells[j+1:]
+                    index = database.index(new_cells)
+                    if move_cost < costs[index]:
+                        costs[index] = move_cost
+                        heapq.heappush(frontier, (move_cost, new_cells))
+        return database
+
+    @staticmethod
+    def load(path: str, problem: ParkingProblem) -> Optional['ParkingPatternDatabase']:
+        mapped = ParkingPatternDatabase._map(path, parking_checksum(problem))
+        if mapped is None: return None
+        pattern, _, costs = mapped
+        return ParkingPatternDatabase(problem, pattern, costs)
+
+# The database of the player with any 'size' crates of a sokoban layout
+class SokobanPatternDatabase(PatternDatabase):
+    kind = b"sokoban"
+    additive = False
+
+    def __init__(self, layout: SokobanLayout, size: int, costs: Sequence[int]) -> None:
+        super().__init__((size,), len(layout.cells), costs, sokoban_checksum(layout))
+        self.size = size
+
+    # The index of the player cell followed by the crate cells (sorted) where every piece is a digit
+    def index(self, player: int, crates: Tuple[int, ...]) -> int:
+        index, radix = 0, self.radix
+        for cell in reversed(crates):
+            index = index * radix + cell
+        return index * radix + player
+
+    def lookup(self, problem: SokobanProblem, state: SokobanState) -> float:
+        layout = state.layout
+        if hasattr(state, "crate_mask"): # CompactSokobanState
+            player, mask = state.player_cell, state.crate_mask
+        else:
+            player, mask = layout.cell_index[state.player], layout.to_mask(state.crates)
+        crates = []
+        while mask:
+            lowest = mask & -mask
+            crates.append(lowest.bit_length() - 1)
+            mask ^= lowest
+        return max((self.cost(self.index(player, subset)) for subset in combinations(crates, self.size)), default=0)
+
+    # Compute the number of moves from every abstract state to the goal with a retrograde BFS.
+    # It starts from every goal state (the crates on any goals and the player on any other cell) and applies the moves backwards:
+    #   - a walk from 'previous' to 'player' is undone by walking back to 'previous'
+    #   - a push (the player walks from 'previous' to 'player' and pushes the crate at 'player' to the next cell)
+    #     is undone by a pull which moves the crate back to 'player' and the player back to 'previous'
+    @staticmethod
+    def build(layout: SokobanLayout, size: int) -> 'SokobanPatternDatabase':
+        n = len(layout.cells)
+        size = min(size, len(layout.goal_cells))
+        costs = array('I', [UNREACHABLE]) * (n ** (size + 1))
+        database = SokobanPatternDatabase(layout, size, costs)
+        frontier = deque()
+        for crates in combinations(layout.goal_cells, size):
+            for player in range(n):
+                if player in crates: continue
+                costs[database.index(player, crates)] = 0
+                frontier.append((player, crates))
+        neighbors = layout.neighbors
+        while frontier:
+            player, crates = frontier.popleft()
+            cost = costs[database.index(player, crates)] + 1
+            for direction in Direction:
+                # the player came from the cell behind it (in the opposite direction of its move)
+                previous = neighbors[player][direction.rotate(2)]
+                if previous < 0 or previous in crates: continue
+                predecessors = [(previous, crates)] # undo a walk
+                pushed = neighbors[player][direction]
+                if pushed >= 0 and pushed in crates: # undo a push of the crate that is now in front of the player
+                    predecessors.append((previous, tuple(sorted(player if crate == pushed else crate for crate in crates))))
+                for predecessor in predecessors:
+                    index = database.index(*predecessor)
+                    if costs[index] == UNREACHABLE:
+                        costs[index] = cost
+                        frontier.append(predecessor)
+        return database
+
+    @staticmethod
+    def load(path: str, layout: SokobanLayout) -> Optional['SokobanPatternDatabase']:
+        mapped = SokobanPatternDatabase._map(path, sokoban_checksum(layout))
+        if mapped is None: return None
+        (size,), _, costs = mapped
+        return SokobanPatternDatabase(layout, size, costs)
+
+# The heuristic of a group of pattern databases: the maximum or the sum ("add") of their values.
+# The sum is only admissible if the databases count disjoint costs, so it requires additive databases with disjoint patterns.
+class PatternDatabaseHeuristic:
+    def __init__(self, databases: List[PatternDatabase], combine: str = "max") -> None:
+        if combine not in ("max", "add"):
+            raise ValueError(f"Unknown combination '{combine}'")
+        if combine == "add":
+            if not all(database.additive for database in databases):
+                raise ValueError("Only parking pattern databases can be added")
+            pieces = [piece for database in databases for piece in database.pattern]
+            if len(pieces) != len(set(pieces)):
+                raise ValueError("Added pattern databases must have disjoint patterns")
+        self.databases = databases
+        self.combine = combine
+
+    def __call__(self, problem, state) -> float:
+        values = (database.lookup(problem, state) for database in self.databases)
+        return sum(values) if self.combine == "add" else max(values, default=0)
+
+# The dense rank of every passage cell of a parking lot (-1 for walls) and the list of the passage cells
+def _passage_ranks(problem: ParkingProblem) -> Tuple[array, List[int]]:
+    passages = [cell for cell in range(problem.width * problem.height) if problem.passage_mask >> cell & 1]
+    ranks = array('q', [-1]) * (problem.width * problem.height)
+    for rank, cell in enumerate(passages):
+        ranks[cell] = rank
+    return ranks, passages
+
+# A checksum of everything that the databases of a parking lot depend on (the passages and the slots)
+def parking_checksum(problem: ParkingProblem) -> int:
+    return zlib.crc32(repr((problem.width, problem.height, problem.passage_mask, problem.goal_cells)).encode())
+
+# A checksum of everything that the databases of a sokoban layout depend on (the walkable cells and the goals)
+def sokoban_checksum(layout: SokobanLayout) -> int:
+    return zlib.crc32(repr((layout.width, layout.height, layout.cells, layout.goal_cells)).encode())
+
+# The path of a database file next to the map file ("parks/park5.txt" -> "parks/park5.cars-0-1.pdb")
+def database_path(map_path: str, name: str) -> str:
+    return f"{os.path.splitext(map_path)[0]}.{name}.pdb"
+
+# Split the cars of a parking lot into groups of 'group_size' cars (a partition, so the databases can be added)
+def car_groups(problem: ParkingProblem, group_size: int = 2) -> List[Tuple[int, ...]]:
+    cars = range(len(problem.cars))
+    return [tuple(cars[start:start + group_size]) for start in range(0, len(cars), group_size)]
+
+# Load the additive databases of a parking lot (stored next to its file) or build (and save) the missing or stale ones
+def parking_heuristic_for_file(path: str, group_size: int = 2, problem: ParkingProblem = None) -> PatternDatabaseHeuristic:
+    problem = problem or ParkingProblem.from_file(path)
+    databases = []
+    for pattern in car_groups(problem, group_size):
+        database_file = database_path(path, "cars-" + "-".join(map(str, pattern)))
+        database = ParkingPatternDatabase.load(database_file, problem)
+        if database is None or database.pattern != pattern:
+            database = ParkingPatternDatabase.build(problem, pattern)
+            database.save(database_file)
+        databases.append(database)
+    return PatternDatabaseHeuristic(databases, "add")
+
+# Load the database of a sokoban level (stored next to its file) or build (and save) it if it is missing or stale
+def sokoban_heuristic_for_file(path: str, size: int = 2, problem: SokobanProblem = None) -> PatternDatabaseHeuristic:
+    layout = (problem or SokobanProblem.from_file(path)).layout
+    size = min(size, len(layout.goal_cells))
+    database_file = database_path(path, f"crates-{size}")
+    database = SokobanPatternDatabase.load(database_file, layout)
+    if database is None or database.size != size:
+        database = SokobanPatternDatabase.build(layout, size)
+        database.save(database_file)
+    return PatternDatabaseHeuristic([database], "max")
+
+if __name__ == "__main__":
+    # Read the arguments from the command line
+    parser = argparse.ArgumentParser(description="Build the pattern databases of a map (saved next to the map file)")
+    parser.add_argument("type", choices=["sokoban", "parking"], help="the type of the map")
+    parser.add_argument("map", help="path to the map file")
+    parser.add_argument("--size", "-k", type=int, default=2, help="the number of crates (sokoban) or cars per database (parking)")
+
+    args = parser.parse_args()
+    if args.type == "parking":
+        problem = ParkingProblem.from_file(args.map)
+        heuristic = parking_heuristic_for_file(args.map, args.size, problem)
+    else:
+        problem = SokobanProblem.from_file(args.map)
+        heuristic = sokoban_heuristic_for_file(args.map, args.size, problem)
+    print(f"Built {len(heuristic.databases)} database(s) with {sum(len(database.costs) for database in heuristic.databases)} entries")
+    print(f"Initial heuristic: {heuristic(problem, problem.get_initial_state())}")
@@ -1,6 +1,6 @@
 import time
-from graph import GraphRoutingProblem, GraphNode, graphrouting_heuristic
-from agents import HumanAgent, UninformedSearchAgent, InformedSearchAgent
+from graph import GraphRoutingProblem, GraphNode, graphrouting_heuristic, graphrouting_reverse_heuristic
+from agents import HumanAgent, UninformedSearchAgent, InformedSearchAgent, IncrementalSearchAgent
 from helpers.utils import fetch_recorded_calls
 import argparse, os, json
 
@@ -32,12 +32,34 @@ def create_agent(args: argparse.Namespace):
     if agent_type == "dfs":
         from search import DepthFirstSearch
         return UninformedSearchAgent(DepthFirstSearch)
+    if agent_type == "iddfs":
+        from search import IterativeDeepeningDFS
+        return UninformedSearchAgent(IterativeDeepeningDFS)
     if agent_type == "ucs":
         from search import UniformCostSearch
         return UninformedSearchAgent(UniformCostSearch)
+    if agent_type == "bucs":
+        from search import BidirectionalUniformCostSearch
+        return UninformedSearchAgent(BidirectionalUniformCostSearch)
     if agent_type == "astar":
         from search import AStarSearch
         return InformedSearchAgent(AStarSearch, graphrouting_heuristic)
+    if agent_type == "idastar":
+        from search import IterativeDeepeningAStar
+        return InformedSearchAgent(IterativeDeepeningAStar, graphrouting_heuristic)
+    if agent_type == "bastar":
+        from search import BidirectionalAStarSearch
+        from functools import partial
+        return InformedSearchAgent(partial(BidirectionalAStarSearch, reverse_heuristic=graphrouting_reverse_heuristic), graphrouting_heuristic)
+    if agent_type == "alt":
+        from search import AStarSearch
+        from graph_landmarks import LandmarkIndex
+        # The landmark index is loaded from the graph folder (or built and saved there on the first run)
+        index = LandmarkIndex.for_graph_file(args.graph, args.landmarks)
+        return InformedSearchAgent(AStarSearch, index.heuristic)
+    if agent_type == "dstar":
+        # D* Lite keeps its search between the steps and only repairs it if the edge costs change (see GraphRoutingProblem.set_cost)
+        return IncrementalSearchAgent(graphrouting_reverse_heuristic)
     if agent_type == "gbfs":
         from search import BestFirstSearch
         return InformedSearchAgent(BestFirstSearch, graphrouting_heuristic)
@@ -49,11 +71,13 @@ def main(args: argparse.Namespace):
     graph_path = args.graph
     problem = GraphRoutingProblem.from_file(graph_path) # create the problem
     # Check if there is a figure for the graph that we can display on the console
-    figure_path = json.load(open(graph_path, 'r')).get("figure")
+    with open(graph_path, 'r') as f:
+        figure_path = json.load(f).get("figure")
     figure = None
     if figure_path:
         figure_path = os.path.join(os.path.dirname(graph_path), figure_path)
-        figure = open(figure_path, 'r').read()
+        with open(figure_path, 'r') as f:
+            figure = f.read()
     # Get the initial state
     state = problem.get_initial_state()
     print("Initial State:")
@@ -64,12 +88,16 @@ def main(args: argparse.Namespace):
     step = 0 # This will store the current step
     path_cost = 0 # This will store the total path cost
     traversed_nodes = [] # This will store all the traversed nodes in order of traversal
+    backward_nodes = [] # This will store the nodes expanded backward from the goal (by the bidirectional searches)
     unsolvable = False # This will store whether the problem is unsolvable or not
     while not problem.is_goal(state):
-        fetch_recorded_calls(GraphRoutingProblem.is_goal) # Clear the recorded calls
+        # Clear the recorded calls
+        fetch_recorded_calls(GraphRoutingProblem.get_actions)
+        fetch_recorded_calls(GraphRoutingProblem.get_predecessors)
         action = agent.act(problem, state) # Request an action from the agent
-        # Retrieve the traversed nodes
-        traversed_nodes += [call["args"][1].name for call in list(fetch_recorded_calls(GraphRoutingProblem.is_goal))]
+        # Retrieve the traversed nodes (every expansion calls get_actions, or get_predecessors if it is a backward expansion)
+        traversed_nodes += [call["args"][1].name for call in fetch_recorded_calls(GraphRoutingProblem.get_actions)]
+        backward_nodes += [call["args"][1].name for call in fetch_recorded_calls(GraphRoutingProblem.get_predecessors)]
         # If no solution was found, break
         if action is None:
             print("Agent cannot find a solution, exiting...")
@@ -92,6 +120,7 @@ def main(args: argparse.Namespace):
     # This was a search agent, display the traversed nodes
     if not isinstance(agent, HumanAgent):
         print(f"Traversal Order: {'->'.join(traversed_nodes)}")
+        if backward_nodes: print(f"Backward Traversal Order: {'->'.join(backward_nodes)}")
     # Finally print the elapsed time for the whole process
     print(f"Elapsed time: {time.time() - start} seconds")
 
@@ -100,8 +129,10 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play Graph as Human or AI")
     parser.add_argument("graph", help="path to the graph to play")
     parser.add_argument("--agent", "-a", default="human",
-                        choices=['human', 'bfs', 'dfs', 'ucs', 'astar', 'gbfs'],
+                        choices=['human', 'bfs', 'dfs', 'iddfs', 'ucs', 'bucs', 'astar', 'idastar', 'bastar', 'alt', 'dstar', 'gbfs'],
                         help="the agent that will play the game")
+    parser.add_argument("--landmarks", "-k", type=int, default=8,
+                        help="the number of landmarks of the ALT heuristic (alt)")
 
     args = parser.parse_args()
     try:
@@ -1,9 +1,8 @@
 from typing import List
-from sokoban import SokobanProblem, Direction, SokobanState, SokobanTile
-from agents import HumanAgent, UninformedSearchAgent, InformedSearchAgent
+from sokoban import SokobanProblem, CompactSokobanProblem, Direction, SokobanState, SokobanTile
+from agents import HumanAgent, PolicyAgent, UninformedSearchAgent, InformedSearchAgent
 from helpers.utils import fetch_tracked_call_count
 from helpers.heuristic_checks import test_heuristic_consistency
-from functools import lru_cache
 import argparse, time
 
 def colored_sokoban(level: str):
@@ -27,9 +26,55 @@ def get_heuristic(name: str):
     if name == "strong":
         from sokoban_heuristic import strong_heuristic
         return strong_heuristic
+    if name == "matching":
+        from sokoban_heuristic import matching_heuristic
+        return matching_heuristic
+    if name == "incremental":
+        from sokoban_heuristic import IncrementalStrongHeuristic
+        return IncrementalStrongHeuristic()
     print(f"Requested Heuristic '{name}' is invalid")
     exit(-1)
 
+# Return the problem class selected by the user
+def get_problem_type(args: argparse.Namespace):
+    return CompactSokobanProblem if args.compact else SokobanProblem
+
+# If the user requested a push-level search, wrap the search function so that it searches over crate pushes
+def get_search_fn(args: argparse.Namespace, search_fn):
+    if args.pushes:
+        from sokoban_pushes import push_level_search
+        return push_level_search(search_fn)
+    return search_fn
+
+# Check the heuristic consistency on every transition of the problem class that the search expands
+# (with --pushes, the search expands the push-level problem and never calls the step-level get_successor)
+def add_consistency_checks(args: argparse.Namespace, heuristic):
+    if args.pushes:
+        from sokoban_pushes import SokobanPushProblem
+        problem_type = SokobanPushProblem
+    else:
+        problem_type = get_problem_type(args)
+    problem_type.get_successor = test_heuristic_consistency(heuristic)(problem_type.get_successor)
+
+# We cache the heuristic calls to speed up the search process if the heuristic is not fast
+# The values are stored in the problem cache (in a namespace per heuristic), so they follow the capacity and policy
+# given by --cache-capacity and --cache-policy and they are reported by --cache-stats
+# Incremental heuristics are not wrapped since the cache would hide their incremental interface from the search,
+# and neither are the zero heuristic (nothing to save) and the strong heuristic (it already caches its values in the problem)
+def get_cached_heuristic(name: str):
+    heuristic = get_heuristic(name)
+    if hasattr(heuristic, "evaluate_child") or name in ("zero", "strong"):
+        return heuristic
+    namespace = f"heuristic:{name}"
+    def cached_heuristic(problem: SokobanProblem, state: SokobanState) -> float:
+        cache = problem.cache(namespace)
+        h = cache.get(state)
+        if h is None:
+            h = heuristic(problem, state)
+            cache[state] = h
+        return h
+    return cached_heuristic
+
 # Create an agent based on the user selections
 def create_agent(args: argparse.Namespace):
     agent_type: str = args.agent
@@ -52,29 +97,58 @@ def create_agent(args: argparse.Namespace):
         return HumanAgent(sokoban_user_action)
     if agent_type == "bfs":
         from search import BreadthFirstSearch
-        return UninformedSearchAgent(BreadthFirstSearch)
+        return UninformedSearchAgent(get_search_fn(args, BreadthFirstSearch))
     if agent_type == "dfs":
         from search import DepthFirstSearch
-        return UninformedSearchAgent(DepthFirstSearch)
+        return UninformedSearchAgent(get_search_fn(args, DepthFirstSearch))
+    if agent_type == "iddfs":
+        from search import IterativeDeepeningDFS
+        return UninformedSearchAgent(get_search_fn(args, IterativeDeepeningDFS))
     if agent_type == "ucs":
         from search import UniformCostSearch
-        return UninformedSearchAgent(UniformCostSearch)
+        return UninformedSearchAgent(get_search_fn(args, UniformCostSearch))
     if agent_type == "astar":
         from search import AStarSearch
-        # We cache the heuristic calls to speed up the search process if the heuristic is not fast
-        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic))
+        heuristic = get_cached_heuristic(args.heuristic)
+        # If desired by the user, we track every transition and check for the heuristic consistency for each transition
+        if args.checks:
+            add_consistency_checks(args, heuristic)
+        return InformedSearchAgent(get_search_fn(args, AStarSearch), heuristic)
+    if agent_type == "idastar":
+        from search import IterativeDeepeningAStar
+        heuristic = get_cached_heuristic(args.heuristic)
         # If desired by the user, we track every transition and check for the heuristic consistency for each transition
         if args.checks:
-            SokobanProblem.get_successor = test_heuristic_consistency(heuristic)(SokobanProblem.get_successor)
-        return InformedSearchAgent(AStarSearch, heuristic)
+            add_consistency_checks(args, heuristic)
+        return InformedSearchAgent(get_search_fn(args, IterativeDeepeningAStar), heuristic)
+    if agent_type == "hdastar":
+        from parallel_search import HashDistributedAStarSearch
+        # The heuristic is sent to the worker processes, so it is not wrapped (every worker caches in its own problem)
+        return InformedSearchAgent(get_search_fn(args, HashDistributedAStarSearch), get_heuristic(args.heuristic))
+    if agent_type == "arastar":
+        from search import AnytimeAStarSearch
+        from functools import partial
+        heuristic = get_cached_heuristic(args.heuristic)
+        # The agent acts on the best solution found within the time and node budgets
+        search_fn = partial(AnytimeAStarSearch, time_limit=args.time_limit, node_limit=args.node_limit)
+        return InformedSearchAgent(get_search_fn(args, search_fn), heuristic)
     if agent_type == "gbfs":
         from search import BestFirstSearch
-        # We cache the heuristic calls to speed up the search process if the heuristic is not fast
-        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic))
+        heuristic = get_cached_heuristic(args.heuristic)
         # If desired by the user, we track every transition and check for the heuristic consistency for each transition
         if args.checks:
-            SokobanProblem.get_successor = test_heuristic_consistency(heuristic)(SokobanProblem.get_successor)
-        return InformedSearchAgent(BestFirstSearch, heuristic)
+            add_consistency_checks(args, heuristic)
+        return InformedSearchAgent(get_search_fn(args, BestFirstSearch), heuristic)
+    if agent_type == "beam":
+        from search import BeamSearch
+        from functools import partial
+        heuristic = get_cached_heuristic(args.heuristic)
+        return InformedSearchAgent(get_search_fn(args, partial(BeamSearch, width=args.beam_width, max_visited=args.max_visited)), heuristic)
+    if agent_type == "bbfs":
+        from search import BoundedBestFirstSearch
+        from functools import partial
+        heuristic = get_cached_heuristic(args.heuristic)
+        return InformedSearchAgent(get_search_fn(args, partial(BoundedBestFirstSearch, max_frontier=args.max_frontier, max_visited=args.max_visited)), heuristic)
     print(f"Requested Agent '{agent_type}' is invalid")
     exit(-1)
 
@@ -82,11 +156,24 @@ def main(args: argparse.Namespace):
     state_printer = lambda state: print(state)
     if args.ansicolors: state_printer = lambda state: print(colored_sokoban(str(state)))
     start = time.time() # Track run time
-    problem = SokobanProblem.from_file(args.level) # create the problem
+    problem = get_problem_type(args).from_file(args.level) # create the problem
+    problem.checked = args.agent == "human" # Only validate the actions chosen by a human, search agents only return valid actions
+    problem.configure_cache(args.cache_capacity, args.cache_policy)
     state = problem.get_initial_state() # Get the initial state
     print("Initial State:")
     state_printer(state)
     agent = create_agent(args)
+    # If desired by the user, the search agents read and write their policies from a persistent store
+    store = None
+    if args.policy_store and isinstance(agent, PolicyAgent):
+        from policy_store import PolicyStore, policy_key
+        store = PolicyStore(args.policy_store, args.policy_store_size)
+        with open(args.level, 'r') as f:
+            level = f.read()
+        # Every parameter that can change the solution is part of the key
+        algorithm = f"{args.agent} pushes={args.pushes} time_limit={args.time_limit} node_limit={args.node_limit} " \
+                    f"beam_width={args.beam_width} max_frontier={args.max_frontier} max_visited={args.max_visited}"
+        agent.store = store.policy(policy_key(level, algorithm, args.heuristic if isinstance(agent, InformedSearchAgent) else ""))
     step = 0 # This will store the current step
     total_explored_nodes = 0 # This will store the number of traversed nodes during search
     unsolvable = False # This will store whether the problem is unsolvable or not
@@ -117,6 +204,11 @@ def main(args: argparse.Namespace):
     # This was a search agent, display the number of traversed nodes
     if not isinstance(agent, HumanAgent):
         print(f"Search explored {total_explored_nodes} nodes")
+    # If desired by the user, print how well the problem caches (e.g. the heuristic values) performed
+    if args.cache_stats:
+        for namespace, stats in problem.cache_stats().items():
+            print(f"Cache '{namespace}': {stats}")
+    if store is not None: store.close()
     # Finally print the elapsed time for the whole process
     print(f"Elapsed time: {time.time() - start} seconds")
 
@@ -126,11 +218,36 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play Sokoban as Human or AI")
     parser.add_argument("level", help="path to the sokoban level to play")
     parser.add_argument("--agent", "-a", default="human",
-                        choices=['human', 'bfs', 'dfs', 'ucs', 'astar', 'gbfs'],
+                        choices=['human', 'bfs', 'dfs', 'iddfs', 'ucs', 'astar', 'idastar', 'hdastar', 'arastar', 'gbfs', 'beam', 'bbfs'],
                         help="the agent that will play the game")
     parser.add_argument("--heuristic", '-hf', default="zero",
-                        choices=["zero", "weak", "strong"],
+                        choices=["zero", "weak", "strong", "matching", "incremental"],
                         help="choose the heuristic to use with A* or Greedy Best First Search")
+    parser.add_argument("--time-limit", type=float, default=None,
+                        help="the time budget (in seconds) of the anytime search (arastar)")
+    parser.add_argument("--node-limit", type=int, default=None,
+                        help="the maximum number of nodes expanded by the anytime search (arastar)")
+    parser.add_argument("--beam-width", type=int, default=128,
+                        help="the initial beam width of the beam search (beam)")
+    parser.add_argument("--max-frontier", type=int, default=2**16,
+                        help="the initial maximum frontier size of the bounded best first search (bbfs)")
+    parser.add_argument("--max-visited", type=int, default=2**20,
+                        help="the initial maximum number of visited states remembered by a run of beam or bbfs")
+    parser.add_argument("--compact", action='store_true', default=False,
+                        help="Use the compact (bitmask-based) state representation")
+    parser.add_argument("--pushes", action='store_true', default=False,
+                        help="Search over crate pushes instead of player steps (the solution is still played step by step)")
+    parser.add_argument("--cache-policy", default="lru", choices=["lru", "clock", "size"],
+                        help="the eviction policy of the problem caches")
+    parser.add_argument("--cache-capacity", type=int, default=None,
+                        help="the capacity of every problem cache (in entries, or in bytes for the 'size' policy) "
+                             "which defaults to 2**18 entries (or 2**26 bytes)")
+    parser.add_argument("--cache-stats", action='store_true', default=False,
+                        help="Print the hit/miss/eviction counters of the problem caches at the end")
+    parser.add_argument("--policy-store", default=None,
+                        help="path to a policy store (sqlite file) where the solutions are saved and reused by later runs")
+    parser.add_argument("--policy-store-size", type=int, default=2**20,
+                        help="the maximum number of states in the policy store (the oldest ones are evicted)")
     parser.add_argument("--checks", "-c", action='store_true', default=False,
                         help="Enable consistency checks for the heuristic")
     parser.add_argument("--ansicolors", "-ac", action="store_true",
@@ -0,0 +1,97 @@
+from typing import Any, Iterable, Tuple
+import hashlib, pickle, sqlite3
+
+# This file contains a persistent store for the policies of the search agents (the action to do in every state of a solution),
+# so running the same search on the same level again (even from a state in the middle of a stored solution) does not search at all.
+#   - The store is a sqlite database. It runs in WAL (write-ahead log) mode, so many processes can read it
+#     while another one writes to it, and every process opens its own connection.
+#   - The policies are grouped by a key which is the hash of the level content, the algorithm and the heuristic
+#     (see policy_key), so a policy is never reused for another level or another search configuration.
+#   - A state is stored by its zobrist key (like the transposition tables) if it has one, otherwise by its pickle.
+#     The zobrist keys are computed from fixed seeds, so they are the same in every process and every run.
+#   - The store keeps at most 'max_entries' entries: the entries that are older than the last 'max_entries' insertions
+#     are evicted (the ids only grow, so they are the entries whose id is at most the largest id minus 'max_entries').
+
+# The value returned by 'get' when the state is not stored (so that None can be stored like any other value)
+MISSING = object()
+
+# Compute the key of a policy from the content of the level, the name of the algorithm (with its parameters) and the name of the heuristic
+def policy_key(level: str, algorithm: str, heuristic: str = "") -> str:
+    return hashlib.sha256("\0".join((level, algorithm, heuristic)).encode()).hexdigest()
+
+# Convert a state to the bytes stored in the database
+def state_key(state: Any) -> bytes:
+    zobrist = getattr(state, "zobrist", None)
+    if zobrist is not None:
+        return zobrist.to_bytes(8, "little")
+    return pickle.dumps(state)
+
+class PolicyStore:
+    def __init__(self, path: str, max_entries: int = 2**20, timeout: float = 30) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        # 'timeout' is how long a writer waits for another writer to finish before giving up
+        self.connection = sqlite3.connect(path, timeout=timeout)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute("""CREATE TABLE IF NOT EXISTS policies (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                policy TEXT NOT NULL,
+                state BLOB NOT NULL,
+                action BLOB NOT NULL,
+                UNIQUE (policy, state))""")
+
+    # Return the stored action of the given state or MISSING if it is not stored
+    def get(self, policy: str, state: Any) -> Any:
+        row = self.connection.execute("SELECT action FROM policies WHERE policy = ? AND state = ?", (policy, state_key(state))).fetchone()
+        return MISSING if row is None else pickle.loads(row[0])
+
+    # Store the actions of many states in a single transaction (the new entries replace the old ones)
+    def put_many(self, policy: str, items: Iterable[Tuple[Any, Any]]) -> None:
+        rows = [(policy, state_key(state), pickle.dumps(action)) for state, action in items]
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO policies (policy, state, action) VALUES (?, ?, ?)", rows)
+            self._evict()
+
+    # Delete the entries that are older than the last 'max_entries' insertions.
+    # Counting the entries would scan the whole table after every write, while this is a range delete on the primary key.
+    # Replaced and cleared entries leave gaps in the ids, so the store may hold fewer than 'max_entries' entries.
+    def _evict(self) -> None:
+        self.connection.execute("DELETE FROM policies WHERE id <= (SELECT MAX(id) FROM policies) - ?", (self.max_entries,))
+
+    # Delete the entries of the given policy (or all the entries)
+    def clear(self, policy: str = None) -> None:
+        with self.connection:
+            if policy is None:
+                self.connection.execute("DELETE FROM policies")
+            else:
+                self.connection.execute("DELETE FROM policies WHERE policy = ?", (policy,))
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM policies").fetchone()[0]
+
+    # Return a view of a single policy (which is what the agents use)
+    def policy(self, policy: str) -> 'StoredPolicy':
+        return StoredPolicy(self, policy)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> 'PolicyStore':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+# The entries of a single policy in a store
+class StoredPolicy:
+    def __init__(self, store: PolicyStore, policy: str) -> None:
+        self.store = store
+        self.policy = policy
+
+    def get(self, state: Any) -> Any:
+        return self.store.get(self.policy, state)
+
+    def put_many(self, items: Iterable[Tuple[Any, Any]]) -> None:
+        self.store.put_many(self.policy, items)
@@ -0,0 +1,204 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from itertools import count
+from typing import List, Optional
+import argparse, math, multiprocessing, os, time
+
+from problem import HeuristicFunction, Problem, Solution
+
+# This file contains a portfolio solver: it runs several (algorithm, heuristic, weight) configurations in parallel
+# (one process per core) and returns the first solution that satisfies the requested optimality guarantee.
+# On hard problems, we cannot tell in advance which configuration finishes first, so running them all at once
+# finishes as soon as the fastest one does.
+#   - Every worker loads the problem from its file by itself, so no problem has to be sent between processes.
+#   - Every configuration has a suboptimality bound (the cost of its solutions is at most 'bound' times the optimal cost,
+#     assuming that the heuristic is admissible). Only the configurations within the requested bound are started.
+#   - A ProcessPoolExecutor cannot stop a task that is already running, so the cancellation is cooperative:
+#     all the workers share an event and every search checks it (every 'CHECK_INTERVAL' goal tests) and stops once it is set.
+
+CHECK_INTERVAL = 1024
+
+@dataclass(frozen=True)
+class PortfolioConfig:
+    algorithm: str          # One of "bfs", "dfs", "ucs", "astar", "wastar" (weighted A*) and "gbfs"
+    heuristic: str = "zero" # The name of the heuristic (see get_heuristic)
+    weight: float = 1       # The heuristic weight (only used by "wastar")
+
+    # The cost of the returned solutions is at most 'bound' times the optimal cost
+    @property
+    def bound(self) -> float:
+        if self.algorithm in ("ucs", "astar"): return 1
+        if self.algorithm == "wastar": return max(self.weight, 1)
+        return math.inf
+
+    def __str__(self) -> str:
+        if self.algorithm == "wastar": return f"{self.algorithm}({self.heuristic}, w={self.weight})"
+        if self.algorithm in ("astar", "gbfs"): return f"{self.algorithm}({self.heuristic})"
+        return self.algorithm
+
+@dataclass
+class PortfolioResult:
+    config: PortfolioConfig
+    solution: Solution  # None if the configuration proved that there is no solution
+    elapsed: float      # The time spent by the worker (in seconds)
+
+# The default portfolios for each problem type (the configurations that come first get a core first)
+DEFAULT_PORTFOLIOS = {
+    "sokoban": [
+        PortfolioConfig("astar", "strong"),
+        PortfolioConfig("wastar", "strong", 1.5),
+        PortfolioConfig("wastar", "strong", 3),
+        PortfolioConfig("gbfs", "strong"),
+        PortfolioConfig("astar", "weak"),
+        PortfolioConfig("ucs"),
+    ],
+    "parking": [
+        PortfolioConfig("astar", "distance"),
+        PortfolioConfig("ucs"),
+        PortfolioConfig("bfs"),
+        PortfolioConfig("dfs"),
+    ],
+    "graph": [
+        PortfolioConfig("astar", "euclidean"),
+        PortfolioConfig("ucs"),
+        PortfolioConfig("wastar", "euclidean", 2),
+        PortfolioConfig("gbfs", "euclidean"),
+    ],
+}
+
+# Load a problem of the given type ("sokoban", "parking" or "graph") from a file
+def load_problem(problem_type: str, path: str) -> Problem:
+    if problem_type == "sokoban":
+        from sokoban import SokobanProblem
+        return SokobanProblem.from_file(path)
+    if problem_type == "parking":
+        from parking import ParkingProblem
+        return ParkingProblem.from_file(path)
+    if problem_type == "graph":
+        from graph import GraphRoutingProblem
+        return GraphRoutingProblem.from_file(path)
+    raise ValueError(f"Unknown problem type '{problem_type}'")
+
+def _zero_heuristic(problem: Problem, state) -> float:
+    return 0
+
+# Return the heuristic with the given name for the given problem type
+def get_heuristic(problem_type: str, name: str) -> HeuristicFunction:
+    if name == "zero":
+        return _zero_heuristic
+    if problem_type == "sokoban" and name == "weak":
+        from sokoban_heuristic import weak_heuristic
+        return weak_heuristic
+    if problem_type == "sokoban" and name == "strong":
+        from sokoban_heuristic import strong_heuristic
+        return strong_heuristic
+    if problem_type == "parking" and name == "distance":
+        from parking_heuristic import parking_heuristic
+        return parking_heuristic
+    if problem_type == "graph" and name == "euclidean":
+        from graph import graphrouting_heuristic
+        return graphrouting_heuristic
+    raise ValueError(f"Unknown heuristic '{name}' for problem type '{problem_type}'")
+
+class SearchCancelled(Exception):
+    pass
+
+# The stop event is given to every worker process when it starts
+_stop_event = None
+
+def _init_worker(stop_event) -> None:
+    global _stop_event
+    _stop_event = stop_event
+
+# Make the search stop once the stop event is set by checking it on every 'CHECK_INTERVAL' goal tests
+# (every search algorithm calls is_goal regularly, so we do not need to modify them)
+def _make_cancellable(problem: Problem, stop_event) -> None:
+    is_goal = problem.is_goal
+    calls = count()
+    def cancellable_is_goal(state) -> bool:
+        if next(calls) % CHECK_INTERVAL == 0 and stop_event.is_set():
+            raise SearchCancelled()
+        return is_goal(state)
+    problem.is_goal = cancellable_is_goal
+
+# Run a single configuration (this function runs in a worker process)
+def run_config(problem_type: str, path: str, config: PortfolioConfig) -> PortfolioResult:
+    import search
+    start = time.time()
+    problem = load_problem(problem_type, path)
+    if _stop_event is not None:
+        _make_cancellable(problem, _stop_event)
+    initial_state = problem.get_initial_state()
+    if config.algorithm == "bfs":
+        solution = search.BreadthFirstSearch(problem, initial_state)
+    elif config.algorithm == "dfs":
+        solution = search.DepthFirstSearch(problem, initial_state)
+    elif config.algorithm == "ucs":
+        solution = search.UniformCostSearch(problem, initial_state)
+    elif config.algorithm == "astar":
+        solution = search.AStarSearch(problem, initial_state, get_heuristic(problem_type, config.heuristic))
+    elif config.algorithm == "wastar":
+        solution = search.WeightedAStarSearch(problem, initial_state, get_heuristic(problem_type, config.heuristic), config.weight)
+    elif config.algorithm == "gbfs":
+        solution = search.BestFirstSearch(problem, initial_state, get_heuristic(problem_type, config.heuristic))
+    else:
+        raise ValueError(f"Unknown algorithm '{config.algorithm}'")
+    return PortfolioResult(config, solution, time.time() - start)
+
+# Run the configurations in parallel and return the result of the first one to finish among those whose
+# suboptimality bound is at most 'max_suboptimality' (1 means that only optimal solutions are accepted).
+# All the search algorithms are complete, so the first result is returned even if it has no solution (the problem is unsolvable).
+# If 'workers' is None, every core is used.
+def solve(problem_type: str, path: str, configs: List[PortfolioConfig] = None,
+          max_suboptimality: float = 1, workers: int = None) -> Optional[PortfolioResult]:
+    if configs is None: configs = DEFAULT_PORTFOLIOS[problem_type]
+    eligible = [config for config in configs if config.bound <= max_suboptimality]
+    if not eligible:
+        raise ValueError(f"No configuration has a suboptimality bound of at most {max_suboptimality}")
+    workers = min(workers or os.cpu_count() or 1, len(eligible))
+    context = multiprocessing.get_context()
+    stop_event = context.Event()
+    error = None
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(stop_event,)) as executor:
+        futures = [executor.submit(run_config, problem_type, path, config) for config in eligible]
+        try:
+            for future in as_completed(futures):
+                try:
+                    return future.result()
+                except SearchCancelled:
+                    continue
+                except Exception as exception: # a failing configuration should not stop the others
+                    error = exception
+        finally:
+            # Cancel the configurations that did not start yet and ask the running ones to stop
+            stop_event.set()
+            for future in futures:
+                future.cancel()
+    if error is not None:
+        raise error
+    return None
+
+if __name__ == "__main__":
+    # Read the arguments from the command line
+    parser = argparse.ArgumentParser(description="Solve a problem with a portfolio of search algorithms running in parallel")
+    parser.add_argument("type", choices=list(DEFAULT_PORTFOLIOS), help="the type of the problem")
+    parser.add_argument("path", help="path to the problem file")
+    parser.add_argument("--bound", "-b", type=float, default=1,
+                        help="the accepted suboptimality bound (1 = optimal only, inf = any solution)")
+    parser.add_argument("--workers", "-w", type=int, default=None,
+                        help="the number of worker processes (default: the number of cores)")
+
+    args = parser.parse_args()
+    start = time.time()
+    result = solve(args.type, args.path, max_suboptimality=args.bound, workers=args.workers)
+    if result is None or result.solution is None:
+        print("No solution found")
+    else:
+        problem = load_problem(args.type, args.path)
+        state, cost = problem.get_initial_state(), 0
+        for action in result.solution:
+            cost += problem.get_cost(state, action)
+            state = problem.get_successor(state, action)
+        print(f"Solved by {result.config} in {result.elapsed:.3f} seconds")
+        print(f"Solution length: {len(result.solution)}, cost: {cost}")
+    print(f"Elapsed time: {time.time() - start} seconds")
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Callable, Generic, Iterable, List, TypeVar, Union
-from helpers.utils import CacheContainer, with_cache
+from typing import Any, Callable, Generic, Iterable, List, TypeVar, Union
+from helpers.utils import CacheContainer
 
 # S and A are used for generic typing where S represents the state type and A represents the action type
 S = TypeVar("S")
@@ -8,7 +8,7 @@ A = TypeVar("A")
 
 # Problem is a generic abstract class for search problems
 # It also implements 'CacheContainer' which allows you to call the "cache" method
-# which returns a dictionary in which you can store any data you want to cache
+# which returns a bounded cache (see helpers/cache.py) in which you can store any data you want to cache
 class Problem(ABC, Generic[S, A], CacheContainer):
     # This function returns the initial state
     @abstractmethod
@@ -34,6 +34,16 @@ class Problem(ABC, Generic[S, A], CacheContainer):
     def get_cost(self, state: S, action: A) -> float:
         return 1.0
 
+    # This function returns a small picklable and hashable value that identifies the given state
+    # It is used to send states between processes without the objects they share (such as the sokoban layout)
+    # By default, the state itself is used
+    def pack_state(self, state: S) -> Any:
+        return state
+
+    # This function rebuilds the state from the value returned by pack_state
+    def unpack_state(self, data: Any) -> S:
+        return data
+
 # These are type aliases for:
 # A solution which is a list of actions (or None if no solution is found)
 Solution = Union[List[A], None]
@@ -1,11 +1,43 @@
 from problem import HeuristicFunction, Problem, S, A, Solution
 from collections import deque
 from helpers.utils import NotImplemented
+from transposition import TranspositionTable
+from helpers.cache import LRUCache
 
 #TODO: Import any modules you want to use
 import heapq
+from dataclasses import dataclass
 from itertools import count
-import math
+from typing import Iterator
+import math, time
+
+# A search node stores a pointer to its parent and the action that generated it instead of the whole action path
+# so generating a successor is O(1) instead of copying a list as long as the current depth.
+# The path is only built once (by walking the parent pointers) when a goal is found.
+# We use __slots__ to keep every node as small as possible since the frontier can hold millions of them.
+class Node:
+    __slots__ = ("state", "parent", "action", "g", "depth", "heuristic_info")
+
+    def __init__(self, state, parent: "Node" = None, action = None, g: float = 0, depth: int = 0) -> None:
+        self.state = state
+        self.parent = parent
+        self.action = action
+        self.g = g          # the path cost from the initial state to this node
+        self.depth = depth  # the number of actions from the initial state to this node
+        self.heuristic_info = None # the cached evaluation of an incremental heuristic (see IncrementalStrongHeuristic)
+
+    # Create the child node that results from applying the given action to this node
+    def child(self, state, action, cost: float = 0) -> "Node":
+        return Node(state, self, action, self.g + cost, self.depth + 1)
+
+    # Walk the parent pointers back to the root to build the list of actions that leads to this node
+    def path(self) -> list:
+        path = [None] * self.depth
+        node = self
+        while node.parent is not None:
+            path[node.depth - 1] = node.action
+            node = node.parent
+        return path
 
 # All search functions take a problem and a state
 # If it is an informed search function, it will also receive a heuristic function
@@ -20,19 +52,23 @@ def BreadthFirstSearch(problem: Problem[S, A], initial_state: S) -> Solution:
     if problem.is_goal(initial_state): # check if already at goal no actions needed
         return []
     
-    q = deque([(initial_state, [])]) # queue for BFS
-    visited = set([initial_state]) # keeping track of visited nodes to avoid cycles
+    q = deque([Node(initial_state)]) # queue for BFS
+    visited = TranspositionTable.for_state(initial_state) # keeping track of visited nodes to avoid cycles
+    key = visited.key
+    visited.add(initial_state)
 
     while q:
-        state, path = q.popleft()
+        node = q.popleft()
+        state = node.state
         for action in problem.get_actions(state): # getting every action possible at current state
             successor = problem.get_successor(state, action) # getting new state from that action 
-            if successor not in visited:  # if not visited
-                visited.add(successor) # mark as visited
-                new_path = path + [action] # add action to path
+            successor_key = key(successor)
+            if successor_key not in visited:  # if not visited
+                visited[successor_key] = True # mark as visited
+                child = node.child(successor, action) # the child node points back to its parent instead of copying the path
                 if problem.is_goal(successor): # if at goal return path (at enqueue)
-                    return new_path
-                q.append((successor, new_path)) # else add to queue and continue searching 
+                    return child.path()
+                q.append(child) # else add to queue and continue searching 
     return None # no path found return None 
 
 def DepthFirstSearch(problem: Problem[S, A], initial_state: S) -> Solution:
@@ -40,19 +76,22 @@ def DepthFirstSearch(problem: Problem[S, A], initial_state: S) -> Solution:
     if problem.is_goal(initial_state): # check if already at goal no actions needed
         return []
     
-    stack = [(initial_state, [])] # stack for DFS
-    visited = set([initial_state]) # keeping track of visited nodes to avoid cycles
+    stack = [Node(initial_state)] # stack for DFS
+    visited = TranspositionTable.for_state(initial_state) # keeping track of visited nodes to avoid cycles
+    key = visited.key
+    visited.add(initial_state)
 
     while stack:
-        state, path = stack.pop() # getting last state and path
+        node = stack.pop() # getting last node
+        state = node.state
         if problem.is_goal(state): # if at goal return path (at pop)
-                    return path
+                    return node.path()
         for action in problem.get_actions(state): # getting every action possible at current state
             successor = problem.get_successor(state, action) # getting new state from that action 
-            if successor not in visited:  # if not visited
-                visited.add(successor) # mark as visited
-                new_path = path + [action] # add action to path
-                stack.append((successor, new_path)) # else add to stack and continue searching 
+            successor_key = key(successor)
+            if successor_key not in visited:  # if not visited
+                visited[successor_key] = True # mark as visited
+                stack.append(node.child(successor, action)) # else add to stack and continue searching 
     return None # no path found return None
     
 
@@ -62,75 +101,675 @@ def UniformCostSearch(problem: Problem[S, A], initial_state: S) -> Solution:
         return []
     
     counter = count() # to keep order for equal costs
-    pq = [(0,next(counter) , initial_state, [])] # priority queue for UCS
-    visited = {} # keeping track of visited nodes and their cost
+    pq = [(0, next(counter), Node(initial_state))] # priority queue for UCS
+    visited = TranspositionTable.for_state(initial_state) # keeping track of visited nodes and their cost
+    key = visited.key
 
     while pq:
-        cost,_, state, path = heapq.heappop(pq)
-        if state in visited and visited[state] <= cost: # if already visited and cost is higher ignore
+        cost, _, node = heapq.heappop(pq)
+        state = node.state
+        state_key = key(state)
+        if state_key in visited and visited[state_key] <= cost: # if already visited and cost is higher ignore
             continue
-        visited[state] = cost # else update/add cost to this state 
+        visited[state_key] = cost # else update/add cost to this state 
 
         if problem.is_goal(state): # if at goal return path (at dequeue)
-            return path
+            return node.path()
         
         for action in problem.get_actions(state): # getting every action possible at current state
             successor = problem.get_successor(state, action) # getting new state from that action 
-            new_path = path + [action] # add action to path
-            new_cost = cost + problem.get_cost(state, action) # add cost to path
-            heapq.heappush(pq, (new_cost, next(counter), successor, new_path)) # add to priority queue and continue searching 
+            child = node.child(successor, action, problem.get_cost(state, action)) # child.g is the cost of the path to the successor
+            heapq.heappush(pq, (child.g, next(counter), child)) # add to priority queue and continue searching 
     return None # no path found return None
 
-def AStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction) -> Solution:
+# If 'weight' is larger than 1, the heuristic is inflated (weighted A*) which usually finds a solution much faster,
+# but its cost is only guaranteed to be at most 'weight' times the optimal cost (for an admissible heuristic)
+def AStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, weight: float = 1) -> Solution:
     #TODO: ADD YOUR CODE HERE
     if problem.is_goal(initial_state): # check if already at goal no actions needed
         return []
     
+    # An incremental heuristic can compute h(child) from the cached evaluation of the parent
+    incremental = hasattr(heuristic, "evaluate_child")
     counter = count() # to keep order for equal costs
-    pq = [(0,next(counter),0 , initial_state, [])] # priority queue for A*
-    visited = {} # keeping track of visited nodes and their cost
+    root = Node(initial_state)
+    if incremental:
+        root.heuristic_info = heuristic.evaluate(problem, initial_state)[1]
+    pq = [(0, next(counter), root)] # priority queue for A*
+    visited = TranspositionTable.for_state(initial_state) # keeping track of visited nodes and their cost
+    key = visited.key
 
     while pq:
-        cost_h,_,cost, state, path = heapq.heappop(pq)
+        cost_h, _, node = heapq.heappop(pq)
+        state = node.state
         if math.isinf(cost_h):
             continue
 
-        if state in visited and visited[state] <= cost_h: # if already visited and cost is higher ignore
+        state_key = key(state)
+        if state_key in visited and visited[state_key] <= cost_h: # if already visited and cost is higher ignore
             continue
-        visited[state] = cost_h # else update/add cost to this state 
+        visited[state_key] = cost_h # else update/add cost to this state 
 
         if problem.is_goal(state): # if at goal return path (at dequeue)
-            return path
+            return node.path()
         
         for action in problem.get_actions(state): # getting every action possible at current state
             successor = problem.get_successor(state, action) # getting new state from that action 
-            new_path = path + [action] # add action to path
-            new_cost = cost + problem.get_cost(state, action) # add cost to path
-            cost_and_h = new_cost + heuristic(problem,successor) # calculate f(n) = g(n) + h(n)
-            heapq.heappush(pq, (cost_and_h, next(counter),new_cost, successor, new_path)) # add to priority queue and continue searching 
+            child = node.child(successor, action, problem.get_cost(state, action)) # child.g is the cost of the path to the successor
+            if incremental:
+                h, child.heuristic_info = heuristic.evaluate_child(problem, state, node.heuristic_info, successor)
+            else:
+                h = heuristic(problem, successor)
+            cost_and_h = child.g + weight * h # calculate f(n) = g(n) + w * h(n)
+            heapq.heappush(pq, (cost_and_h, next(counter), child)) # add to priority queue and continue searching 
     return None # no path found return None
 
+def WeightedAStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, weight: float = 2) -> Solution:
+    return AStarSearch(problem, initial_state, heuristic, weight)
+
 def BestFirstSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction) -> Solution:
     #TODO: ADD YOUR CODE HERE
     if problem.is_goal(initial_state): # check if already at goal no actions needed
         return []
     
     counter = count() # to keep order for equal costs
-    pq = [(0,next(counter), initial_state, [])] # priority queue for A*
-    visited = {} # keeping track of visited nodes and their cost
+    pq = [(0, next(counter), Node(initial_state))] # priority queue for A*
+    visited = TranspositionTable.for_state(initial_state) # keeping track of visited nodes and their cost
+    key = visited.key
 
     while pq:
-        cost_h,_, state, path = heapq.heappop(pq)
+        cost_h, _, node = heapq.heappop(pq)
+        state = node.state
 
-        if state in visited and visited[state] <= cost_h: # if already visited and cost is higher ignore
+        state_key = key(state)
+        if state_key in visited and visited[state_key] <= cost_h: # if already visited and cost is higher ignore
             continue
-        visited[state] = cost_h # else update/add cost to this state 
+        visited[state_key] = cost_h # else update/add cost to this state 
 
         if problem.is_goal(state): # if at goal return path (at dequeue)
-            return path
+            return node.path()
         
         for action in problem.get_actions(state): # getting every action possible at current state
             successor = problem.get_successor(state, action) # getting new state from that action 
-            new_path = path + [action] # add action to path
-            heapq.heappush(pq, (heuristic(problem, successor), next(counter), successor, new_path))  # add to priority queue and continue searching 
-    return None # no path found return None
\ No newline at end of file
+            heapq.heappush(pq, (heuristic(problem, successor), next(counter), node.child(successor, action)))  # add to priority queue and continue searching 
+    return None # no path found return None
+
+# Iterative deepening searches only keep the current path (and the untried actions of every node on it) in memory,
+# so their memory is O(depth) instead of O(number of generated nodes). They run a sequence of depth first searches
+# where every search ignores the nodes whose value 'f' exceeds a bound, and the next bound is the smallest pruned value.
+# Since memory does not remember previous iterations, states are expanded again in every iteration, so:
+#   - The states on the current path are skipped to avoid cycles.
+#   - An optional transposition table (an LRU cache of 'table_size' entries, see TranspositionTable for the keys) is kept
+#     across the iterations. It stores the smallest 'f' with which every state was entered and the iteration where it
+#     happened ('h' only depends on the state, so this is also the smallest 'g'). A state entered again is skipped if:
+#       - it was entered with a smaller 'f' in any iteration. The path with the smaller 'f' is within every later bound
+#         (the bounds only grow), so the state is also entered with it in the current iteration (before or after).
+#       - or it was entered with the same 'f' in the current iteration, so its subtree was already searched.
+#     Without the table (or with a table that is cleared every iteration), IDA* re-expands every transposition
+#     of the state space once per path that reaches it, which can be exponentially more than A*. With it, an iteration
+#     expands every state at most once per distinct 'g', so it costs about as much as an A* search with the same bound,
+#     and all the iterations together cost about (number of distinct bounds) times that.
+#     Every entry holds a key and a pair, so the default 2**18 entries take about 50 MB (plus the states that are used as keys).
+#     Set 'table_size' to 0 to disable it.
+# 'expand' takes a node and returns an iterable of (child, f) pairs.
+def _BoundedDepthFirstSearch(problem: Problem[S, A], root: Node, bound: float, expand, table, iteration: int):
+    key = TranspositionTable.for_state(root.state).key
+    next_bound = math.inf # the smallest value of 'f' that exceeded the bound
+    on_path = {key(root.state)}
+    stack = [(root, iter(expand(root)))] # every entry holds a node on the current path and its untried children
+    while stack:
+        node, children = stack[-1]
+        for child, f in children:
+            if f > bound: # prune the child but remember its value for the next iteration
+                next_bound = min(next_bound, f)
+                continue
+            child_key = key(child.state)
+            if child_key in on_path: # skip cycles
+                continue
+            if table is not None:
+                if child_key in table:
+                    best_f, best_iteration = table[child_key]
+                    if best_f < f or (best_f == f and best_iteration == iteration):
+                        continue
+                table[child_key] = (f, iteration)
+            if problem.is_goal(child.state): # if at goal return path (every node within the bound is a candidate)
+                return child.path(), bound
+            on_path.add(child_key)
+            stack.append((child, iter(expand(child))))
+            break
+        else: # all the children were tried, so we backtrack
+            stack.pop()
+            on_path.discard(key(node.state))
+    return None, next_bound
+
+# Iterative deepening depth first search: the bound is the depth of the nodes, so it finds the shallowest solution
+# (like BFS) while using the memory of DFS
+def IterativeDeepeningDFS(problem: Problem[S, A], initial_state: S, table_size: int = 2**18) -> Solution:
+    if problem.is_goal(initial_state): # check if already at goal no actions needed
+        return []
+
+    def expand(node: Node):
+        state = node.state
+        for action in problem.get_actions(state):
+            child = node.child(problem.get_successor(state, action), action)
+            yield child, child.depth
+
+    table = LRUCache(table_size) if table_size > 0 else None
+    bound, iteration = 0, 0
+    while not math.isinf(bound): # if no node was pruned in the last iteration, the whole state space was searched
+        solution, bound = _BoundedDepthFirstSearch(problem, Node(initial_state), bound, expand, table, iteration)
+        if solution is not None:
+            return solution
+        iteration += 1
+    return None # no path found return None
+
+# Iterative deepening A* (IDA*): the bound is f(n) = g(n) + h(n), so it returns an optimal solution for an admissible heuristic
+def IterativeDeepeningAStar(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, table_size: int = 2**18) -> Solution:
+    if problem.is_goal(initial_state): # check if already at goal no actions needed
+        return []
+
+    # An incremental heuristic can compute h(child) from the cached evaluation of the parent
+    incremental = hasattr(heuristic, "evaluate_child")
+    root = Node(initial_state)
+    if incremental:
+        bound, root.heuristic_info = heuristic.evaluate(problem, initial_state)
+    else:
+        bound = heuristic(problem, initial_state)
+
+    def expand(node: Node):
+        state = node.state
+        for action in problem.get_actions(state):
+            successor = problem.get_successor(state, action)
+            child = node.child(successor, action, problem.get_cost(state, action))
+            if incremental:
+                h, child.heuristic_info = heuristic.evaluate_child(problem, state, node.heuristic_info, successor)
+            else:
+                h = heuristic(problem, successor)
+            yield child, child.g + h
+
+    table = LRUCache(table_size) if table_size > 0 else None
+    iteration = 0
+    while not math.isinf(bound): # an infinite bound means that every remaining node is a dead end
+        solution, bound = _BoundedDepthFirstSearch(problem, root, bound, expand, table, iteration)
+        if solution is not None:
+            return solution
+        iteration += 1
+    return None # no path found return None
+
+# Bidirectional searches run two searches at once: a forward one from the initial state and a backward one from the goal.
+# They only work on problems with a single known goal state ('problem.goal') which can also enumerate the predecessors
+# of a state ('problem.get_predecessors' returns (predecessor, action) pairs), such as GraphRoutingProblem.
+# Both searches expand around half the radius of a single-ended search, which is far fewer nodes on large graphs.
+#
+# To keep both searches consistent, A* uses the balanced potentials:
+#   p(n) = (h(n) - reverse_h(n)) / 2 for the forward search and -p(n) for the backward search
+# where h estimates the cost to the goal and reverse_h estimates the cost from the initial state.
+# With these potentials, both searches are Dijkstra searches on the same graph with reduced edge costs, so we can
+# stop as soon as the smallest keys of both frontiers add up to at least the cost of the best path found so far.
+# If no reverse heuristic is given, reverse_h is 0 (the potentials stay consistent but are half as informed).
+# The uniform cost version is the same search with p(n) = 0.
+def BidirectionalAStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, reverse_heuristic = None) -> Solution:
+    if problem.is_goal(initial_state): # check if already at goal no actions needed
+        return []
+    goal = problem.goal
+
+    def potential(state: S) -> float:
+        h = heuristic(problem, state)
+        reverse_h = reverse_heuristic(problem, initial_state, state) if reverse_heuristic is not None else 0
+        return (h - reverse_h) / 2
+
+    counter = count() # to keep order for equal keys
+    # For every direction, we store the best known cost of every state and the (state, action) that led to it:
+    #   forward_parent[state] = (previous state, action from the previous state to this state)
+    #   backward_parent[state] = (next state, action from this state to the next state)
+    forward_cost, backward_cost = {initial_state: 0}, {goal: 0}
+    forward_parent, backward_parent = {initial_state: None}, {goal: None}
+    forward_closed, backward_closed = set(), set()
+    forward_pq = [(potential(initial_state), next(counter), initial_state)]
+    backward_pq = [(-potential(goal), next(counter), goal)]
+    best, meeting = math.inf, None # the cost of the best path found so far and the state where both searches met
+
+    while forward_pq and backward_pq:
+        # Stop when no path through the unexpanded states can be cheaper than the best one
+        if forward_pq[0][0] + backward_pq[0][0] >= best:
+            break
+        # Expand the direction with the smaller frontier to balance the work between both searches
+        forward = len(forward_pq) <= len(backward_pq)
+        pq, closed = (forward_pq, forward_closed) if forward else (backward_pq, backward_closed)
+        costs, other_costs = (forward_cost, backward_cost) if forward else (backward_cost, forward_cost)
+        parents = forward_parent if forward else backward_parent
+        _, _, state = heapq.heappop(pq)
+        if state in closed: # an outdated entry of a state that was already expanded
+            continue
+        closed.add(state)
+
+        if forward:
+            neighbors = ((problem.get_successor(state, action), action, problem.get_cost(state, action)) for action in problem.get_actions(state))
+        else:
+            neighbors = ((predecessor, action, problem.get_cost(predecessor, action)) for predecessor, action in problem.get_predecessors(state))
+        for neighbor, action, cost in neighbors:
+            new_cost = costs[state] + cost
+            if new_cost < costs.get(neighbor, math.inf):
+                costs[neighbor] = new_cost
+                parents[neighbor] = (state, action)
+                key = new_cost + (potential(neighbor) if forward else -potential(neighbor))
+                heapq.heappush(pq, (key, next(counter), neighbor))
+                # If the other search already reached this state, we found a path from the initial state to the goal
+                if neighbor in other_costs and new_cost + other_costs[neighbor] < best:
+                    best, meeting = new_cost + other_costs[neighbor], neighbor
+
+    if meeting is None:
+        return None # no path found return None
+    # Join the forward path to the meeting state with the backward path from the meeting state to the goal
+    path, state = [], meeting
+    while forward_parent[state] is not None:
+        state, action = forward_parent[state]
+        path.append(action)
+    path.reverse()
+    state = meeting
+    while backward_parent[state] is not None:
+        state, action = backward_parent[state]
+        path.append(action)
+    return path
+
+def BidirectionalUniformCostSearch(problem: Problem[S, A], initial_state: S) -> Solution:
+    return BidirectionalAStarSearch(problem, initial_state, lambda *_: 0)
+
+# Beam search and bounded best first search trade completeness for a predictable memory use on huge problems:
+#   - BeamSearch expands the search layer by layer and only keeps the 'width' best children (by heuristic) of every layer.
+#   - BoundedBestFirstSearch is a greedy best first search whose frontier holds at most 'max_frontier' nodes:
+#     when it grows larger, the worst half of the frontier is dropped.
+# Both remember the visited states in an exact transposition table, so every state is expanded at most once per run
+# (evicting states instead could let an evicted state enter the beam again and the search could cycle forever on
+# an unsolvable problem). The table is bounded by 'max_visited' states: a run that fills it stops and fails.
+# So the memory of a run is at most 'max_visited' states plus the frontier.
+# If a run fails after dropping nodes or filling the table, the search restarts with a doubled width (or frontier)
+# and a doubled 'max_visited' (up to 'restarts' times, so the last run uses at most 2^restarts times the initial budgets).
+# If it fails without dropping any node, the whole reachable state space was searched so there is no solution.
+# The solutions are not optimal.
+def _BeamSearchOnce(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, width: int, max_visited: int):
+    visited = TranspositionTable.for_state(initial_state)
+    key = visited.key
+    visited[key(initial_state)] = True
+    counter = count() # to keep order for equal heuristics
+    layer = [Node(initial_state)]
+    truncated = False
+    while layer:
+        candidates = []
+        for node in layer:
+            state = node.state
+            for action in problem.get_actions(state): # getting every action possible at current state
+                successor = problem.get_successor(state, action)
+                successor_key = key(successor)
+                if successor_key in visited: continue
+                if len(visited) >= max_visited: return None, True # the table is full
+                visited[successor_key] = True
+                child = node.child(successor, action, problem.get_cost(state, action))
+                if problem.is_goal(successor): # if at goal return path (at generation)
+                    return child.path(), truncated
+                h = heuristic(problem, successor)
+                if math.isinf(h): continue # a dead end
+                candidates.append((h, next(counter), child))
+        if len(candidates) > width: # keep the best 'width' children only
+            truncated = True
+            candidates = heapq.nsmallest(width, candidates)
+        layer = [child for _, _, child in candidates]
+    return None, truncated
+
+def BeamSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction,
+               width: int = 128, restarts: int = 5, max_visited: int = 2**20) -> Solution:
+    if problem.is_goal(initial_state): # check if already at goal no actions needed
+        return []
+    for _ in range(restarts + 1):
+        solution, truncated = _BeamSearchOnce(problem, initial_state, heuristic, width, max_visited)
+        if solution is not None or not truncated:
+            return solution
+        # widen the beam and try again
+        width *= 2
+        max_visited *= 2
+    return None
+
+def _BoundedBestFirstSearchOnce(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, max_frontier: int, max_visited: int):
+    visited = TranspositionTable.for_state(initial_state)
+    key = visited.key
+    visited[key(initial_state)] = True
+    counter = count() # to keep order for equal heuristics
+    pq = [(heuristic(problem, initial_state), next(counter), Node(initial_state))]
+    dropped = False
+    while pq:
+        _, _, node = heapq.heappop(pq)
+        state = node.state
+        if problem.is_goal(state): # if at goal return path (at dequeue)
+            return node.path(), dropped
+        for action in problem.get_actions(state): # getting every action possible at current state
+            successor = problem.get_successor(state, action)
+            successor_key = key(successor)
+            if successor_key in visited: continue
+            if len(visited) >= max_visited: return None, True # the table is full
+            visited[successor_key] = True
+            h = heuristic(problem, successor)
+            if math.isinf(h): continue # a dead end
+            heapq.heappush(pq, (h, next(counter), node.child(successor, action, problem.get_cost(state, action))))
+        if len(pq) > max_frontier: # drop the worst half of the frontier (a sorted list is also a valid heap)
+            dropped = True
+            pq = heapq.nsmallest(max_frontier // 2, pq)
+    return None, dropped
+
+def BoundedBestFirstSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction,
+                           max_frontier: int = 2**16, restarts: int = 5, max_visited: int = 2**20) -> Solution:
+    for _ in range(restarts + 1):
+        solution, dropped = _BoundedBestFirstSearchOnce(problem, initial_state, heuristic, max_frontier, max_visited)
+        if solution is not None or not dropped:
+            return solution
+        # allow a larger frontier and try again
+        max_frontier *= 2
+        max_visited *= 2
+    return None
+
+# A solution published by an anytime search: its cost is proven to be at most 'bound' times the optimal cost
+@dataclass
+class AnytimeSolution:
+    solution: Solution
+    cost: float
+    bound: float
+
+# Anytime repairing A* (ARA*) publishes a sequence of solutions with decreasing costs and suboptimality bounds:
+#   - It starts as weighted A* (f = g + w * h) with a large weight 'initial_weight', so the first solution comes quickly.
+#   - Then it decreases the weight by 'weight_step' and repairs the previous search instead of starting over:
+#     the path costs, parents and heuristic values are kept, and only the states whose cost improved since they were
+#     expanded (the "inconsistent" states) are put back in the open list with the rest of the open list.
+#   - Every search with weight w stops once no open node has a key smaller than the cost of the best solution,
+#     so the solution is at most w times the optimal cost. The published bound is the tighter of w and
+#     cost / min(g + h) over the open and inconsistent states (which is a lower bound on the optimal cost).
+#     If the budget runs out in the middle of a search, w is not guaranteed, so the bound is only cost / min(g + h).
+#   - Once the weight reaches 1, the last solution is optimal (bound = 1).
+# The bounds are only guaranteed for a consistent heuristic.
+# The search stops early (after publishing what it has) once it uses more than 'time_limit' seconds or expands 'node_limit' nodes.
+def AnytimeRepairingAStar(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction,
+                          initial_weight: float = 3, weight_step: float = 0.5,
+                          time_limit: float = None, node_limit: int = None) -> Iterator[AnytimeSolution]:
+    if problem.is_goal(initial_state): # check if already at goal no actions needed
+        yield AnytimeSolution([], 0, 1)
+        return
+
+    deadline = None if time_limit is None else time.time() + time_limit
+    key = TranspositionTable.for_state(initial_state).key
+    root_key = key(initial_state)
+    g = {root_key: 0}                  # the best known path cost of every generated state
+    h = {root_key: heuristic(problem, initial_state)} # the heuristic of every generated state (computed once)
+    parents = {root_key: None}         # parents[key] = (parent key, action) on the best known path
+    states = {root_key: initial_state} # the states of the open and inconsistent keys
+    closed, inconsistent = set(), set()
+    weight = max(initial_weight, 1)
+    counter = count() # to keep order for equal keys
+    pq = [(weight * h[root_key], next(counter), root_key)]
+    goal_key, incumbent = None, math.inf # the goal and the cost of the best solution found so far
+    expanded = 0
+
+    def out_of_budget() -> bool:
+        return (node_limit is not None and expanded >= node_limit) or (deadline is not None and time.time() > deadline)
+
+    # 'stopped' is True if the search with the current weight did not finish (so the weight is not a valid bound)
+    def publish(stopped: bool) -> AnytimeSolution:
+        frontier = inconsistent.union(entry[2] for entry in pq if entry[2] not in closed)
+        lower_bound = min((g[state_key] + h[state_key] for state_key in frontier), default=math.inf)
+        if lower_bound >= incumbent:
+            bound = 1
+        else:
+            bound = incumbent / lower_bound if lower_bound > 0 else math.inf
+            if not stopped: bound = min(weight, bound)
+        path, state_key = [], goal_key
+        while parents[state_key] is not None:
+            state_key, action = parents[state_key]
+            path.append(action)
+        path.reverse()
+        return AnytimeSolution(path, incumbent, bound)
+
+    while True:
+        # Improve the path with the current weight until no open node can lead to a cheaper solution
+        stopped = False
+        while pq:
+            f, _, state_key = pq[0]
+            if state_key in closed or f != g[state_key] + weight * h[state_key]: # an outdated entry
+                heapq.heappop(pq)
+                continue
+            if incumbent <= f: break
+            if out_of_budget():
+                stopped = True
+                break
+            heapq.heappop(pq)
+            closed.add(state_key)
+            expanded += 1
+            state = states[state_key]
+            for action in problem.get_actions(state):
+                successor = problem.get_successor(state, action)
+                successor_key = key(successor)
+                cost = g[state_key] + problem.get_cost(state, action)
+                if cost >= g.get(successor_key, math.inf): continue
+                g[successor_key] = cost
+                parents[successor_key] = (state_key, action)
+                states[successor_key] = successor
+                if successor_key not in h:
+                    h[successor_key] = heuristic(problem, successor)
+                if math.isinf(h[successor_key]): continue # a dead end
+                if problem.is_goal(successor) and cost < incumbent:
+                    goal_key, incumbent = successor_key, cost
+                if successor_key in closed:
+                    inconsistent.add(successor_key) # it will be expanded again in the next search
+                else:
+                    heapq.heappush(pq, (cost + weight * h[successor_key], next(counter), successor_key))
+        if goal_key is not None:
+            result = publish(stopped)
+            yield result
+            if result.bound <= 1: return
+        elif not pq and not stopped:
+            return # the whole reachable state space was searched: no solution
+        if stopped or weight <= 1:
+            return
+        # Decrease the weight, move the inconsistent states to the open list and recompute every key
+        weight = max(weight - weight_step, 1)
+        open_keys = {entry[2] for entry in pq if entry[2] not in closed} | inconsistent
+        pq = [(g[state_key] + weight * h[state_key], next(counter), state_key) for state_key in open_keys]
+        heapq.heapify(pq)
+        closed, inconsistent = set(), set()
+
+# Run ARA* within the given budget and return the best solution it found (or None if it found none)
+def AnytimeAStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction,
+                       time_limit: float = None, node_limit: int = None,
+                       initial_weight: float = 3, weight_step: float = 0.5) -> Solution:
+    best = None
+    for result in AnytimeRepairingAStar(problem, initial_state, heuristic, initial_weight, weight_step, time_limit, node_limit):
+        best = result
+    return None if best is None else best.solution
+
+# D* Lite is an incremental version of A* for agents that replan while they move or while the edge costs change.
+# It searches backwards from the goal, so g(s) and rhs(s) estimate the cost from 's' to the goal where:
+#   rhs(s) = min over the successors s' of cost(s, s') + g(s')   (a one-step lookahead of g)
+# A state is consistent if g(s) == rhs(s) and only the inconsistent states are in the open list.
+# The values are kept between the calls to 'plan', so after the agent moves or some costs change,
+# only the states whose values are affected by the change are expanded again instead of the whole search.
+# The open list uses the keys [min(g, rhs) + h(start, s) + km, min(g, rhs)] where 'km' grows by h(old start, new start)
+# every time the agent moves, so the keys already in the open list stay lower bounds without recomputing them.
+# It needs a problem with a single goal state, the predecessors of the states (such as GraphRoutingProblem.get_predecessors)
+# and a heuristic that estimates the cost between two states (such as graphrouting_reverse_heuristic) which must be consistent.
+# If the problem has a 'cost_changes' log (like GraphRoutingProblem), 'plan' applies the changes it has not seen yet.
+class DStarLite:
+    def __init__(self, problem: Problem[S, A], start: S, heuristic, goal: S = None) -> None:
+        self.problem = problem
+        self.start = start
+        self.goal = goal if goal is not None else problem.goal
+        self.heuristic = heuristic # heuristic(problem, a, b) estimates the cost from 'a' to 'b'
+        self.counter = count()
+        self.changes_seen = len(getattr(problem, "cost_changes", ()))
+        self.expanded = 0          # the number of expansions since the search was created
+        self._reset()
+
+    # Forget every result and start the search again from the goal
+    def _reset(self) -> None:
+        self.km = 0
+        self.g = {}
+        self.rhs = {self.goal: 0}
+        self.open = {}             # the current key of every state in the open list
+        self.frontier = []         # a heap of (key, order, state) which may contain outdated entries
+        self._push(self.goal)
+
+    def _key(self, state: S):
+        value = min(self.g.get(state, math.inf), self.rhs.get(state, math.inf))
+        return (value + self.heuristic(self.problem, self.start, state) + self.km, value)
+
+    def _push(self, state: S) -> None:
+        key = self._key(state)
+        self.open[state] = key
+        heapq.heappush(self.frontier, (key, next(self.counter), state))
+
+    # Return the top entry of the open list (skipping the outdated ones) or None if it is empty
+    def _top(self):
+        while self.frontier:
+            key, _, state = self.frontier[0]
+            if self.open.get(state) == key: return key, state
+            heapq.heappop(self.frontier)
+        return None
+
+    # The one-step lookahead of a state over its successors.
+    # Self-loops are skipped: they are never on a shortest path and a zero-cost one would copy the old g of the state.
+    def _lookahead(self, state: S) -> float:
+        problem, g = self.problem, self.g
+        best = math.inf
+        for action in problem.get_actions(state):
+            successor = problem.get_successor(state, action)
+            if successor != state:
+                best = min(best, problem.get_cost(state, action) + g.get(successor, math.inf))
+        return best
+
+    # Put the state in the open list if it is inconsistent and remove it otherwise
+    def _update_state(self, state: S) -> None:
+        if self.g.get(state, math.inf) != self.rhs.get(state, math.inf):
+            self._push(state)
+        else:
+            self.open.pop(state, None)
+
+    def _compute_shortest_path(self) -> None:
+        problem, g, rhs, start = self.problem, self.g, self.rhs, self.start
+        while True:
+            top = self._top()
+            if top is None: break
+            key, state = top
+            # The states with the same key as the start are still expanded: with zero-cost edges they can be on its shortest path
+            if key > self._key(start) and rhs.get(start, math.inf) <= g.get(start, math.inf): break
+            new_key = self._key(state)
+            if key < new_key: # the key is outdated since the agent moved
+                self._push(state)
+                continue
+            heapq.heappop(self.frontier)
+            del self.open[state]
+            self.expanded += 1
+            if g.get(state, math.inf) > rhs[state]: # the state became cheaper, so it may improve its predecessors
+                g[state] = rhs[state]
+                for predecessor, action in problem.get_predecessors(state):
+                    if predecessor == self.goal: continue
+                    cost = problem.get_cost(predecessor, action) + g[state]
+                    if cost < rhs.get(predecessor, math.inf):
+                        rhs[predecessor] = cost
+                        self._update_state(predecessor)
+            else: # the state became more expensive, so the predecessors that went through it must look for another successor
+                old_g = g.get(state, math.inf)
+                g[state] = math.inf
+                for predecessor, action in list(problem.get_predecessors(state)) + [(state, None)]:
+                    if predecessor == self.goal: continue
+                    if action is None or rhs.get(predecessor, math.inf) == problem.get_cost(predecessor, action) + old_g:
+                        rhs[predecessor] = self._lookahead(predecessor)
+                    self._update_state(predecessor)
+
+    # Move the start of the search to the given state (the new position of the agent)
+    def move_to(self, state: S) -> None:
+        if state == self.start: return
+        self.km += self.heuristic(self.problem, self.start, state)
+        self.start = state
+
+    # Tell the search that the cost of the edge from 'state' to 'successor' changed from 'old_cost' to 'new_cost'
+    def update_cost(self, state: S, successor: S, old_cost: float, new_cost: float) -> None:
+        if state == self.goal or successor == state: return
+        rhs, g = self.rhs, self.g
+        if new_cost < old_cost:
+            rhs[state] = min(rhs.get(state, math.inf), new_cost + g.get(successor, math.inf))
+        elif rhs.get(state, math.inf) == old_cost + g.get(successor, math.inf):
+            rhs[state] = self._lookahead(state)
+        self._update_state(state)
+
+    # Repair the search and return the best action from the start (or None if the goal cannot be reached)
+    def next_action(self) -> A:
+        self._apply_cost_changes()
+        if self.start == self.goal: return None
+        path = self._extract_path()
+        return path[0] if path else None
+
+    # Repair the search and return the whole path from the start to the goal (or None if the goal cannot be reached)
+    def plan(self) -> Solution:
+        self._apply_cost_changes()
+        if self.start == self.goal: return []
+        return self._extract_path()
+
+    # Apply the cost changes recorded by the problem since the last call
+    def _apply_cost_changes(self) -> None:
+        changes = getattr(self.problem, "cost_changes", None)
+        if changes is not None and self.changes_seen < len(changes):
+            for state, successor, old_cost, new_cost in changes[self.changes_seen:]:
+                self.update_cost(state, successor, old_cost, new_cost)
+            self.changes_seen = len(changes)
+
+    # Return the actions from a state that lie on a shortest path according to g (the actions that reach the minimum of
+    # the one-step lookahead), with the successors that have a strictly smaller g first. Self-loops are skipped.
+    def _best_actions(self, state: S):
+        problem, g = self.problem, self.g
+        options = []
+        for action in problem.get_actions(state):
+            successor = problem.get_successor(state, action)
+            if successor == state: continue
+            options.append((problem.get_cost(state, action) + g.get(successor, math.inf), g.get(successor, math.inf), action, successor))
+        best = min((value for value, _, _, _ in options), default=math.inf)
+        if math.isinf(best): return []
+        return [(action, successor) for value, _, action, successor in sorted(options, key=lambda option: option[1]) if value == best]
+
+    # Find the path from the start to the goal that only uses the best actions of every state.
+    # Following the best action greedily is not enough: with zero-cost edges, several successors can have the same g
+    # and the greedy walk can go back and forth between them. So we run a breadth first search over the best actions
+    # (every shortest path only uses best actions, so it reaches the goal). Since the path has the fewest steps,
+    # the path from its second state is one step shorter, so an agent that always follows the first action never loops.
+    # The repair of a cost increase assumes that every cycle has a positive cost: the states of a zero-cost cycle can keep
+    # supporting each other's old g values. Then no path of best actions reaches the goal, so we search again from scratch
+    # (the first search only lowers the g values, which is correct with zero-cost edges).
+    def _extract_path(self) -> Solution:
+        self._compute_shortest_path()
+        path = self._best_path()
+        if path is None and not math.isinf(self.rhs.get(self.start, math.inf)):
+            self._reset()
+            self._compute_shortest_path()
+            path = self._best_path()
+        return path
+
+    # The breadth first search over the best actions (or None if it does not reach the goal)
+    def _best_path(self) -> Solution:
+        if math.isinf(self.rhs.get(self.start, math.inf)): return None
+        problem = self.problem
+        parents = {self.start: None}
+        queue = deque([self.start])
+        while queue:
+            state = queue.popleft()
+            if problem.is_goal(state):
+                path = []
+                while parents[state] is not None:
+                    state, action = parents[state]
+                    path.append(action)
+                path.reverse()
+                return path
+            for action, successor in self._best_actions(state):
+                if successor in parents: continue
+                parents[successor] = (state, action)
+                queue.append(successor)
+        return None
+
+# D* Lite with the signature of the other search functions (a single search from scratch)
+def DStarLiteSearch(problem: Problem[S, A], initial_state: S, heuristic) -> Solution:
+    if problem.is_goal(initial_state): # check if already at goal no actions needed
+        return []
+    return DStarLite(problem, initial_state, heuristic).plan()
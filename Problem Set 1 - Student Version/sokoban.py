@@ -1,5 +1,7 @@
 from dataclasses import dataclass
-from typing import FrozenSet, Iterable
+from typing import Dict, FrozenSet, Iterable, Tuple
+from collections import deque
+import math, random
 from enum import Enum
 
 from mathutils import Direction, Point
@@ -26,25 +28,142 @@ class SokobanTile(str, Enum):
 # we only need the default equality which compares objects by pointers.
 # The layout contains the problem details that are unchangeable across states such as:
 #   The walkable area (locations without walls) and the locations of the goals
+# It also gives every walkable cell a dense index (in row-major order) so that compact states
+# can store the player as an int and the crates as a bitmask where bit 'i' is set if cell 'i' has a crate.
+# Finally, it precomputes move tables once so that generating actions and successors becomes a few table lookups
+# and the dead squares (cells from which a crate can never reach any goal) so that they can be checked in O(1).
 @dataclass(eq=False, frozen=True)
 class SokobanLayout:
-    __slots__ = ("width", "height", "walkable", "goals")
+    __slots__ = ("width", "height", "walkable", "goals", "cells", "cell_index", "goal_mask", "neighbors", "beyond",
+                 "goal_cells", "push_distances", "dead_squares", "dead_mask", "zobrist_player", "zobrist_crate")
     width: int
     height: int
     walkable: FrozenSet[Point]
     goals: FrozenSet[Point]
+    # The following slots are derived from the fields above in __post_init__ (they are not dataclass fields):
+    #   cells: Tuple[Point, ...]     where cells[i] is the position of the walkable cell with index 'i'
+    #   cell_index: Dict[Point, int] which is the inverse of cells
+    #   goal_mask: int               which is a bitmask of the goal cells
+    #   neighbors: Tuple[Tuple[int, ...], ...] where neighbors[i][d] is the index of the cell next to cell 'i' in direction 'd'
+    #   beyond: Tuple[Tuple[int, ...], ...]    where beyond[i][d] is the index of the cell 2 steps away from cell 'i' in direction 'd'
+    #   (both tables contain -1 if the corresponding cell is a wall)
+    #   goal_cells: Tuple[int, ...]    which contains the indices of the goal cells (sorted)
+    #   push_distances: Tuple[Tuple[float, ...], ...] where push_distances[g][i] is the minimum number of pushes needed
+    #                                                   to move a crate from cell 'i' to the goal cell goal_cells[g]
+    #                                                   if there were no other crates (or inf if it is impossible)
+    #   dead_squares: FrozenSet[Point] which contains the cells from which a crate can never be pushed to any goal
+    #   dead_mask: int                 which is a bitmask of the dead squares
+    #   zobrist_player, zobrist_crate: Tuple[int, ...] which contain a random 64-bit key for every (cell, piece) pair.
+    #                                  The zobrist key of a state is the XOR of the keys of its player and crates cells
+    #                                  so it can be updated in O(1) after every move (see SokobanState.zobrist).
+
+    def __post_init__(self) -> None:
+        # The layout is frozen so we have to bypass the frozen __setattr__ to fill the derived slots
+        cells = tuple(sorted(self.walkable, key=lambda position: (position.y, position.x)))
+        cell_index = {position: index for index, position in enumerate(cells)}
+        object.__setattr__(self, "cells", cells)
+        object.__setattr__(self, "cell_index", cell_index)
+        object.__setattr__(self, "goal_mask", self.to_mask(self.goals))
+        vectors = [direction.to_vector() for direction in Direction]
+        neighbors = tuple(tuple(cell_index.get(position + vector, -1) for vector in vectors) for position in cells)
+        beyond = tuple(tuple(cell_index.get(position + vector + vector, -1) for vector in vectors) for position in cells)
+        object.__setattr__(self, "neighbors", neighbors)
+        object.__setattr__(self, "beyond", beyond)
+        goal_cells = tuple(sorted(cell_index[goal] for goal in self.goals))
+        push_distances = tuple(self._push_distances(goal) for goal in goal_cells)
+        object.__setattr__(self, "goal_cells", goal_cells)
+        object.__setattr__(self, "push_distances", push_distances)
+        dead_squares = frozenset(cells[cell] for cell in range(len(cells)) if all(math.isinf(distances[cell]) for distances in push_distances))
+        object.__setattr__(self, "dead_squares", dead_squares)
+        object.__setattr__(self, "dead_mask", self.to_mask(dead_squares))
+        generator = random.Random(0) # A fixed seed makes the keys reproducible across runs and processes
+        object.__setattr__(self, "zobrist_player", tuple(generator.getrandbits(64) for _ in cells))
+        object.__setattr__(self, "zobrist_crate", tuple(generator.getrandbits(64) for _ in cells))
+
+    # A layout is pickled as its fields only (the derived slots are recomputed) and unpickled through '_restore_layout'
+    # so that all the states unpickled in the same process share a single layout object (states compare their layouts by identity)
+    def __reduce__(self):
+        return (_restore_layout, (self.width, self.height, self.walkable, self.goals))
+
+    # Compute the number of pushes needed to move a crate from every cell to the given goal (ignoring the other crates).
+    # We run a breadth first search that "pulls" the crate backwards from the goal: a crate at 'cell' could have been
+    # pushed there in direction 'd' from the cell behind it, if the player had a cell to stand on behind that one.
+    # The cells that cannot reach any goal are the dead squares.
+    def _push_distances(self, goal: int) -> Tuple[float, ...]:
+        distances = [math.inf] * len(self.cells)
+        distances[goal] = 0
+        queue = deque([goal])
+        while queue:
+            cell = queue.popleft()
+            for direction in Direction:
+                backward = direction.rotate(2)
+                previous, player = self.neighbors[cell][backward], self.beyond[cell][backward]
+                if previous < 0 or player < 0 or not math.isinf(distances[previous]): continue
+                distances[previous] = distances[cell] + 1
+                queue.append(previous)
+        return tuple(distances)
+
+    # Convert a collection of positions to a bitmask of cell indices
+    def to_mask(self, positions: Iterable[Point]) -> int:
+        mask = 0
+        for position in positions:
+            mask |= 1 << self.cell_index[position]
+        return mask
+
+    # Compute the zobrist key of a state from scratch given the player cell and the crates bitmask
+    def zobrist_key(self, player: int, crates: int) -> int:
+        key = self.zobrist_player[player]
+        while crates:
+            lowest = crates & -crates
+            key ^= self.zobrist_crate[lowest.bit_length() - 1]
+            crates ^= lowest
+        return key
+
+    # Convert a bitmask of cell indices back to a set of positions
+    def from_mask(self, mask: int) -> FrozenSet[Point]:
+        positions = []
+        while mask:
+            lowest = mask & -mask
+            positions.append(self.cells[lowest.bit_length() - 1])
+            mask ^= lowest
+        return frozenset(positions)
+
+# The layouts restored by unpickling in this process (keyed by their fields)
+_restored_layouts: Dict[Tuple[int, int, FrozenSet[Point], FrozenSet[Point]], SokobanLayout] = {}
+
+def _restore_layout(width: int, height: int, walkable: FrozenSet[Point], goals: FrozenSet[Point]) -> SokobanLayout:
+    key = (width, height, walkable, goals)
+    layout = _restored_layouts.get(key)
+    if layout is None:
+        layout = SokobanLayout(width, height, walkable, goals)
+        _restored_layouts[key] = layout
+    return layout
 
 # For the sokoban state, we use dataclass with frozen=True to automatically implement:
-#   the constructor, the == operator, the hash function and to make the class immutable
-# Now it can be added to sets and used as keys in dictionaries
+#   the constructor and to make the class immutable
 # This will contain a reference to the sokoban layout and it will contain environment details that change across states such as:
 #   The player location and the locations of the crates 
-@dataclass(frozen=True)
+# It also stores its zobrist key which is updated incrementally by SokobanProblem.get_successor.
+# The hash function returns the key directly instead of hashing the player and the crates on every dictionary lookup,
+# and the == operator only compares the player and the crates when the keys match.
+@dataclass(frozen=True, eq=False)
 class SokobanState:
-    __slots__ = ("layout", "player", "crates")
+    __slots__ = ("layout", "player", "crates", "zobrist")
     layout: SokobanLayout
     player: Point
     crates: FrozenSet[Point]
+    zobrist: int
+
+    def __hash__(self) -> int:
+        return self.zobrist
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, SokobanState): return NotImplemented
+        return self.zobrist == other.zobrist and self.player == other.player and self.crates == other.crates and self.layout is other.layout
+
+    # The default pickling of a frozen dataclass with __slots__ fails, so we rebuild the state from its fields
+    def __reduce__(self):
+        return (SokobanState, (self.layout, self.player, self.crates, self.zobrist))
 
     # This operator will convert the state to a string containing the grid representation of the level at the current state
     def __str__(self) -> str:
@@ -60,6 +179,56 @@ class SokobanState:
             return SokobanTile.EMPTY
         return '\n'.join(''.join(position_to_str(Point(x, y)) for x in range(self.layout.width)) for y in range(self.layout.height))
 
+# This is a compact version of the sokoban state where:
+#   player is the index of the player cell and crates is a bitmask of the crate cells
+# Hashing and comparing two ints is much cheaper than hashing a Point and a frozenset of Points.
+# The properties 'player' and 'crates' convert the state back to points on demand
+# so any code written for SokobanState (such as the heuristics) still works with this state.
+# Like SokobanState, it stores its zobrist key (both states of the same position have the same key).
+@dataclass(frozen=True, eq=False)
+class CompactSokobanState:
+    __slots__ = ("layout", "player_cell", "crate_mask", "zobrist")
+    layout: SokobanLayout
+    player_cell: int
+    crate_mask: int
+    zobrist: int
+
+    def __hash__(self) -> int:
+        return self.zobrist
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CompactSokobanState): return NotImplemented
+        return self.player_cell == other.player_cell and self.crate_mask == other.crate_mask and self.layout is other.layout
+
+    def __reduce__(self):
+        return (CompactSokobanState, (self.layout, self.player_cell, self.crate_mask, self.zobrist))
+
+    # Create a compact state and compute its zobrist key from scratch
+    @staticmethod
+    def create(layout: SokobanLayout, player: int, crates: int) -> 'CompactSokobanState':
+        return CompactSokobanState(layout, player, crates, layout.zobrist_key(player, crates))
+
+    @property
+    def player(self) -> Point:
+        return self.layout.cells[self.player_cell]
+
+    @property
+    def crates(self) -> FrozenSet[Point]:
+        return self.layout.from_mask(self.crate_mask)
+
+    # Convert to the point-based state
+    def to_state(self) -> SokobanState:
+        return SokobanState(self.layout, self.player, self.crates, self.zobrist)
+
+    # Convert from the point-based state
+    @staticmethod
+    def from_state(state: SokobanState) -> 'CompactSokobanState':
+        layout = state.layout
+        return CompactSokobanState(layout, layout.cell_index[state.player], layout.to_mask(state.crates), state.zobrist)
+
+    def __str__(self) -> str:
+        return str(self.to_state())
+
 # This is a list of all the possible actions for the sokoban agent
 AllSokobanActions = [
     Direction.RIGHT,
@@ -73,6 +242,7 @@ class SokobanProblem(Problem[SokobanState, Direction]):
     # The problem will contain the sokoban layout and the inital state
     layout: SokobanLayout
     initial_state: SokobanState
+    checked: bool = True # Whether get_successor should validate the actions
 
     def get_initial_state(self) -> SokobanState:
         return self.initial_state
@@ -83,39 +253,63 @@ class SokobanProblem(Problem[SokobanState, Direction]):
     # We use @track_call_count to track the number of times this function was called to count the number of explored nodes
     @track_call_count
     def get_actions(self, state: SokobanState) -> Iterable[Direction]:
+        layout = self.layout
+        cell = layout.cell_index[state.player]
+        neighbors, beyond = layout.neighbors[cell], layout.beyond[cell]
         actions = []
         for direction in Direction:
-            position = state.player + direction.to_vector()
+            position = neighbors[direction]
             # Disallow walking into walls
-            if position not in self.layout.walkable: continue
+            if position < 0: continue
             # Check if walking into a crate
-            if position in state.crates:
+            if layout.cells[position] in state.crates:
                 # make sure that the crate is not pushed into a wall or another crate
-                crate_position = position + direction.to_vector()
-                if crate_position not in self.layout.walkable or crate_position in state.crates:
+                crate_position = beyond[direction]
+                if crate_position < 0 or layout.cells[crate_position] in state.crates:
                     continue
             actions.append(direction)
         return actions
 
+    # If 'checked' is True, the action is validated and an exception is raised if it is invalid (useful for human play).
+    # Search algorithms only apply actions returned by get_actions, so they can skip the validation by setting it to False.
+    # An invalid action would then silently use the cell index -1 (the last cell), so the unchecked path still asserts
+    # that the action is valid (the asserts are removed by running python with -O).
     def get_successor(self, state: SokobanState, action: Direction) -> SokobanState:
-        player = state.player + action.to_vector()
+        layout = self.layout
+        cell = layout.cell_index[state.player]
+        player = layout.neighbors[cell][action]
         crates = state.crates
-        if player not in self.layout.walkable:
+        if self.checked and player < 0:
             # If we try to walk into a wall, then this action is wrong
             raise Exception(f"Invalid action {action} in state:" + "\n" + str(state))
-        if player in crates:
-            crate_position = player + action.to_vector()
-            if crate_position not in self.layout.walkable or crate_position in crates:
+        assert player >= 0, f"Invalid action {action}"
+        position = layout.cells[player]
+        zobrist = state.zobrist ^ layout.zobrist_player[cell] ^ layout.zobrist_player[player]
+        if position in crates:
+            crate_position = layout.beyond[cell][action]
+            if self.checked and (crate_position < 0 or layout.cells[crate_position] in crates):
                 # If we try to push a crate into a wall or another crate, then this action is wrong
                 raise Exception(f"Invalid action {action} in state:" + "\n" + str(state))
+            assert crate_position >= 0 and layout.cells[crate_position] not in crates, f"Invalid action {action}"
             # If we walk to a crate, we push it
-            crates = crates.symmetric_difference({player,crate_position})
-        return SokobanState(state.layout, player, crates)
+            crates = crates.symmetric_difference({position, layout.cells[crate_position]})
+            zobrist ^= layout.zobrist_crate[player] ^ layout.zobrist_crate[crate_position]
+        return SokobanState(layout, position, crates, zobrist)
 
     def get_cost(self, state: SokobanState, action: Direction) -> float:
         # All actions have the same cost
         return 1
 
+    # A state is packed as the index of the player cell and the bitmask of the crate cells
+    def pack_state(self, state: SokobanState) -> Tuple[int, int]:
+        layout = self.layout
+        return layout.cell_index[state.player], layout.to_mask(state.crates)
+
+    def unpack_state(self, data: Tuple[int, int]) -> SokobanState:
+        layout = self.layout
+        player, crates = data
+        return SokobanState(layout, layout.cells[player], layout.from_mask(crates), layout.zobrist_key(player, crates))
+
     # Read a sokoban problem from text containing a grid of tiles
     @staticmethod
     def from_text(text: str) -> 'SokobanProblem':
@@ -141,11 +335,86 @@ class SokobanProblem(Problem[SokobanState, Direction]):
                         goals.add(Point(x, y))
         problem = SokobanProblem()
         problem.layout = SokobanLayout(width, height, frozenset(walkable), frozenset(goals))
-        problem.initial_state = SokobanState(problem.layout, player, frozenset(crates))
+        layout = problem.layout
+        problem.initial_state = SokobanState(layout, player, frozenset(crates), layout.zobrist_key(layout.cell_index[player], layout.to_mask(crates)))
         return problem
 
     # Read a sokoban problem from file containing a grid of tiles
     @staticmethod
     def from_file(path: str) -> 'SokobanProblem':
         with open(path, 'r') as f:
-            return SokobanProblem.from_text(f.read())
\ No newline at end of file
+            return SokobanProblem.from_text(f.read())
+
+# This is an alternative implementation of the sokoban problem that works on compact states
+# It has the same actions and transitions as SokobanProblem, but every move is computed using ints and bitmasks
+# If 'prune_dead_squares' is True, the actions that push a crate into a dead square are not generated
+# (such states can never reach the goal), but then the actions are no longer the same as SokobanProblem.
+class CompactSokobanProblem(SokobanProblem):
+    initial_state: CompactSokobanState
+    prune_dead_squares: bool = False
+
+    def is_goal(self, state: CompactSokobanState) -> bool:
+        return self.layout.goal_mask == state.crate_mask
+
+    @track_call_count
+    def get_actions(self, state: CompactSokobanState) -> Iterable[Direction]:
+        neighbors, beyond = self.layout.neighbors[state.player_cell], self.layout.beyond[state.player_cell]
+        # If pruning is enabled, pushing a crate into a dead square is treated like pushing it into a wall
+        blocked = state.crate_mask | self.layout.dead_mask if self.prune_dead_squares else state.crate_mask
+        crates = state.crate_mask
+        actions = []
+        for direction in Direction:
+            position = neighbors[direction]
+            # Disallow walking into walls
+            if position < 0: continue
+            # Check if walking into a crate
+            if crates >> position & 1:
+                # make sure that the crate is not pushed into a wall or another crate
+                crate_position = beyond[direction]
+                if crate_position < 0 or blocked >> crate_position & 1:
+                    continue
+            actions.append(direction)
+        return actions
+
+    def get_successor(self, state: CompactSokobanState, action: Direction) -> CompactSokobanState:
+        layout = self.layout
+        player = layout.neighbors[state.player_cell][action]
+        crates = state.crate_mask
+        if self.checked and player < 0:
+            # If we try to walk into a wall, then this action is wrong
+            raise Exception(f"Invalid action {action} in state:" + "\n" + str(state))
+        assert player >= 0, f"Invalid action {action}"
+        zobrist = state.zobrist ^ layout.zobrist_player[state.player_cell] ^ layout.zobrist_player[player]
+        if crates >> player & 1:
+            crate_position = layout.beyond[state.player_cell][action]
+            if self.checked and (crate_position < 0 or crates >> crate_position & 1):
+                # If we try to push a crate into a wall or another crate, then this action is wrong
+                raise Exception(f"Invalid action {action} in state:" + "\n" + str(state))
+            assert crate_position >= 0 and not crates >> crate_position & 1, f"Invalid action {action}"
+            # If we walk to a crate, we push it
+            crates ^= (1 << player) | (1 << crate_position)
+            zobrist ^= layout.zobrist_crate[player] ^ layout.zobrist_crate[crate_position]
+        return CompactSokobanState(layout, player, crates, zobrist)
+
+    def pack_state(self, state: CompactSokobanState) -> Tuple[int, int]:
+        return state.player_cell, state.crate_mask
+
+    def unpack_state(self, data: Tuple[int, int]) -> CompactSokobanState:
+        return CompactSokobanState.create(self.layout, *data)
+
+    # Create a compact version of a point-based sokoban problem
+    @staticmethod
+    def from_problem(problem: SokobanProblem) -> 'CompactSokobanProblem':
+        compact = CompactSokobanProblem()
+        compact.layout = problem.layout
+        compact.initial_state = CompactSokobanState.from_state(problem.initial_state)
+        compact.checked = problem.checked
+        return compact
+
+    @staticmethod
+    def from_text(text: str) -> 'CompactSokobanProblem':
+        return CompactSokobanProblem.from_problem(SokobanProblem.from_text(text))
+
+    @staticmethod
+    def from_file(path: str) -> 'CompactSokobanProblem':
+        return CompactSokobanProblem.from_problem(SokobanProblem.from_file(path))
@@ -0,0 +1,139 @@
+from collections import deque
+from typing import Dict, List, Set, Tuple
+
+from mathutils import Direction
+from sokoban import SokobanLayout
+
+# This file contains a dynamic deadlock detector for sokoban.
+# The dead squares of the layout only catch crates that can never reach a goal on their own,
+# but crates can also block each other. After a crate is pushed, the detector only checks the crates near it for:
+#   - 2x2 blocks: a 2x2 square filled with walls and crates where at least one crate is not on a goal.
+#   - Freeze deadlocks: a crate that can neither move horizontally nor vertically because it is blocked
+#     by walls, dead squares or other frozen crates, while it (or one of the crates freezing it) is not on a goal.
+#   - Simple corral deadlocks: if the push closes an area that the player cannot reach (a corral),
+#     we run a small search with only the crates around the corral (removing crates can only make the problem easier).
+#     If these crates can never be all placed on goals, the state is a deadlock.
+# All the checks work on cell indices and crate bitmasks (see SokobanLayout and CompactSokobanState).
+
+HORIZONTAL = (Direction.LEFT, Direction.RIGHT)
+VERTICAL   = (Direction.UP, Direction.DOWN)
+
+class DeadlockDetector:
+    def __init__(self, layout: SokobanLayout, corral_node_limit: int = 200) -> None:
+        self.layout = layout
+        self.corral_node_limit = corral_node_limit # the maximum number of nodes explored by the corral search
+        self.corral_cache: Dict[Tuple[int, int], bool] = {} # stores the results of the corral searches
+
+    # Check if the state (player, crates) is a deadlock after the crate at 'moved' was pushed.
+    # The corral check is more expensive so it can be disabled via 'corrals'.
+    def is_deadlocked(self, player: int, crates: int, moved: int, corrals: bool = True) -> bool:
+        if self.layout.dead_mask >> moved & 1: return True
+        if self.is_blocked_square(crates, moved): return True
+        if self.is_frozen(crates, moved): return True
+        return corrals and self.is_corral_deadlock(player, crates, moved)
+
+    # Check if the crate at 'cell' is part of a 2x2 square of walls and crates that contains a crate which is not on a goal
+    def is_blocked_square(self, crates: int, cell: int) -> bool:
+        neighbors, goals = self.layout.neighbors, self.layout.goal_mask
+        for horizontal in HORIZONTAL:
+            for vertical in VERTICAL:
+                side, top = neighbors[cell][horizontal], neighbors[cell][vertical]
+                # The diagonal cell can be reached from either side (if both sides are walls, the square is blocked anyway)
+                corner = neighbors[side][vertical] if side >= 0 else (neighbors[top][horizontal] if top >= 0 else -1)
+                square = (cell, side, top, corner)
+                if all(other < 0 or crates >> other & 1 for other in square) and \
+                        any(other >= 0 and not goals >> other & 1 for other in square):
+                    return True
+        return False
+
+    # Check if the crate at 'cell' is frozen while it (or one of the crates freezing it) is not on a goal
+    def is_frozen(self, crates: int, cell: int) -> bool:
+        frozen: List[int] = []
+        walls = {cell} # The crate we check is treated as a wall while checking its neighbors to avoid circular checks
+        if not (self._is_blocked(crates, cell, HORIZONTAL, walls, frozen) and self._is_blocked(crates, cell, VERTICAL, walls, frozen)):
+            return False
+        goals = self.layout.goal_mask
+        return any(not goals >> crate & 1 for crate in frozen + [cell])
+
+    # Check if the crate at 'cell' cannot move along the given axis
+    def _is_blocked(self, crates: int, cell: int, axis: Tuple[Direction, Direction], walls: Set[int], frozen: List[int]) -> bool:
+        first, second = (self.layout.neighbors[cell][direction] for direction in axis)
+        # A wall on either side means that the crate cannot be pushed along this axis
+        if first < 0 or second < 0 or first in walls or second in walls: return True
+        # A dead square on both sides means that pushing the crate along this axis is useless
+        dead = self.layout.dead_mask
+        if dead >> first & 1 and dead >> second & 1: return True
+        # A frozen crate on either side also blocks this crate
+        other_axis = VERTICAL if axis is HORIZONTAL else HORIZONTAL
+        for neighbor in (first, second):
+            if not crates >> neighbor & 1: continue
+            walls.add(neighbor)
+            if self._is_blocked(crates, neighbor, other_axis, walls, frozen):
+                frozen.append(neighbor)
+                return True
+            walls.discard(neighbor)
+        return False
+
+    # Find the cells that the player can reach without pushing any crate
+    def _reachable(self, player: int, crates: int) -> Set[int]:
+        neighbors = self.layout.neighbors
+        reachable = {player}
+        stack = [player]
+        while stack:
+            cell = stack.pop()
+            for neighbor in neighbors[cell]:
+                if neighbor < 0 or neighbor in reachable or crates >> neighbor & 1: continue
+                reachable.add(neighbor)
+                stack.append(neighbor)
+        return reachable
+
+    # Check if the push created a corral (an area next to the moved crate that the player cannot reach) that can never be solved
+    def is_corral_deadlock(self, player: int, crates: int, moved: int) -> bool:
+        neighbors = self.layout.neighbors
+        reachable = self._reachable(player, crates)
+        for start in neighbors[moved]:
+            if start < 0 or start in reachable or crates >> start & 1: continue
+            # Collect the corral area and the crates around it
+            corral, border = self._reachable(start, crates), 0
+            for cell in corral:
+                for neighbor in neighbors[cell]:
+                    if neighbor >= 0 and crates >> neighbor & 1:
+                        border |= 1 << neighbor
+            corral_goals = any(self.layout.goal_mask >> cell & 1 for cell in corral)
+            # If all the border crates are on goals and there are no empty goals inside the corral, it is already solved
+            if border & ~self.layout.goal_mask == 0 and not corral_goals: continue
+            if self._is_unsolvable(min(reachable), border):
+                return True
+        return False
+
+    # Run a small breadth first search over the pushes of the given crates only (all the other crates are removed)
+    # and return True if these crates can never be all placed on goals.
+    # If the search exceeds the node limit, we cannot decide, so we return False.
+    def _is_unsolvable(self, player: int, crates: int) -> bool:
+        key = (player, crates)
+        if key in self.corral_cache: return self.corral_cache[key]
+        neighbors, beyond, goals, dead = self.layout.neighbors, self.layout.beyond, self.layout.goal_mask, self.layout.dead_mask
+        # The player is normalized to the smallest cell of its reachable region since we only care about pushes here
+        start = (min(self._reachable(player, crates)), crates)
+        visited, queue = {start}, deque([start])
+        result = True
+        while queue:
+            if len(visited) > self.corral_node_limit:
+                result = False
+                break
+            player, crates = queue.popleft()
+            if crates & ~goals == 0:
+                result = False
+                break
+            for cell in self._reachable(player, crates):
+                for direction in Direction:
+                    crate, target = neighbors[cell][direction], beyond[cell][direction]
+                    if crate < 0 or target < 0 or not crates >> crate & 1 or (crates | dead) >> target & 1: continue
+                    next_crates = crates ^ ((1 << crate) | (1 << target))
+                    if self.is_blocked_square(next_crates, target) or self.is_frozen(next_crates, target): continue
+                    successor = (min(self._reachable(crate, next_crates)), next_crates)
+                    if successor not in visited:
+                        visited.add(successor)
+                        queue.append(successor)
+        self.corral_cache[key] = result
+        return result
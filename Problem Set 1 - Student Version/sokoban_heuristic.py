@@ -1,63 +1,93 @@
-from mathutils import Point, manhattan_distance
+from mathutils import Assignment, manhattan_distance, min_cost_assignment
 from sokoban import SokobanProblem, SokobanState 
-from itertools import permutations
+from sokoban_deadlocks import DeadlockDetector
 
 def weak_heuristic(problem: SokobanProblem, state: SokobanState): 
     return min(manhattan_distance(state.player, crate) for crate in state.crates) - 1
 
-
-def is_deadlocked(crate, state):
-    goals = state.layout.goals
-    walkable = state.layout.walkable
-    nearest_goal = min(goals, key=lambda g: manhattan_distance(crate, g)) # checking closest goal to crate
-
-    directions = {
-        "down":  (Point(0, 1), lambda: crate.y > nearest_goal.y),   # wall down and goal up 
-        "up":    (Point(0, -1), lambda: crate.y < nearest_goal.y),  # wall up and goal down
-        "right": (Point(1, 0), lambda: crate.x > nearest_goal.x),   # wall on the right and goal on the left 
-        "left":  (Point(-1, 0), lambda: crate.x < nearest_goal.x),  # wall on the left and goal on the right 
-    }
-
-    for _, (offset, goal_condition) in directions.items():
-        neighbor = crate + offset # checking crate neighbors in four directions 
-        if neighbor not in walkable and goal_condition(): # if that neighbor is a wall and goal is on the opposite direction return true 
-            return True
-
-    return False
-
-def min_matching_cost(crates, goals):
-    crates = list(crates)
-    goals = list(goals)
-
-    n = len(crates)
-    cost_matrix = [[manhattan_distance(c, g) for g in goals] for c in crates] # a matrix to keep track of distance between each caret and all goals 
-
-    min_cost = float('inf')
-    for perm in permutations(range(n)): # trying all permutations to get minimum sum of distances 
-        total = sum(cost_matrix[i][perm[i]] for i in range(n)) # sum of distances to this permutation
-        min_cost = min(min_cost, total) 
-    return min_cost
-
-
+# The deadlock detector only depends on the layout, so it is created once per problem and stored
+# in the "analysis" namespace of the problem cache (with this function as the key) so that
+# the heuristic values in the default namespace can never evict it.
+def deadlock_detector(problem):
+    cache = problem.cache("analysis")
+    detector = cache.get(deadlock_detector)
+    if detector is None:
+        detector = DeadlockDetector(problem.layout)
+        cache[deadlock_detector] = detector
+    return detector
+
+# Get the cell indices of the crates (compact states already store them as a bitmask)
+def crate_cells(problem, state):
+    layout = problem.layout
+    mask = getattr(state, "crate_mask", None)
+    if mask is None:
+        return [layout.cell_index[crate] for crate in state.crates]
+    return mask_cells(mask)
+
+# Get the indices of the set bits of a bitmask in increasing order
+def mask_cells(mask):
+    cells = []
+    while mask:
+        lowest = mask & -mask
+        cells.append(lowest.bit_length() - 1)
+        mask ^= lowest
+    return cells
+
+# The minimum sum of push distances (see SokobanLayout.push_distances) over all the crate-goal assignments.
+# A push distance is the number of pushes needed to move a crate to a goal while respecting the walls,
+# so it is never less than the manhattan distance and it is still a lower bound on the number of steps.
+def push_matching_cost(problem, cells):
+    cost_matrix = [[distances[cell] for distances in problem.layout.push_distances] for cell in cells]
+    return min_cost_assignment(cost_matrix)[0]
+
+# An admissible and consistent heuristic which only uses the push-distance matching
+# (a push moves a single crate by one cell, so the matching cost decreases by at most 1 per step)
+def matching_heuristic(problem, state):
+    return push_matching_cost(problem, crate_cells(problem, state))
+
+# Check if the crates are deadlocked: a crate on a dead square (an O(1) bit test per crate)
+# or a crate which is not on a goal and is blocked by the other crates (2x2 blocks and freeze deadlocks)
+def crates_deadlocked(problem, crate_mask, cells):
+    layout = problem.layout
+    if crate_mask & layout.dead_mask: return True
+    detector = deadlock_detector(problem)
+    goals = layout.goal_mask
+    return any(not goals >> cell & 1 and (detector.is_blocked_square(crate_mask, cell) or detector.is_frozen(crate_mask, cell))
+               for cell in cells)
+
+# The part of strong_heuristic that only depends on the crates: infinity if they are deadlocked,
+# otherwise the push-distance matching cost. Many states only differ by the player position,
+# so it is cached by crate bitmask in the "crates" namespace of the problem cache.
+def crate_cost(problem, crate_mask):
+    cache = problem.cache("crates")
+    cost = cache.get(crate_mask)
+    if cost is not None:
+        return cost
+    cells = mask_cells(crate_mask)
+    cost = float('inf')
+    if not crates_deadlocked(problem, crate_mask, cells):
+        # Crate-goal matching heuristic (finds min sum of crate-goal push distances)
+        # It is infinite if the crates cannot be pushed to distinct goals
+        cost = push_matching_cost(problem, cells)
+    cache[crate_mask] = cost
+    return cost
 
 def strong_heuristic(problem, state):
     crates = state.crates
-    goals = problem.layout.goals
     player = state.player
     cache = problem.cache()
-    if state in cache: 
-        return cache[state]
+    h = cache.get(state)
+    if h is not None:
+        return h
     if problem.is_goal(state): 
         cache[state] = 0.0 
         return 0.0
-    # Deadlock detection
-    for crate in crates:
-        if crate not in goals and is_deadlocked(crate, state):
-            cache[state] = float('inf')
-            return float('inf')
-
-    # Crate-goal matching heuristic (finds min sum of crate-goal distances)
-    h_crates = min_matching_cost(crates, goals)
+    crate_mask = getattr(state, "crate_mask", None)
+    if crate_mask is None: crate_mask = problem.layout.to_mask(crates)
+    h_crates = crate_cost(problem, crate_mask)
+    if h_crates == float('inf'):
+        cache[state] = h_crates
+        return h_crates
 
     # Player distance to the nearest crate (to tighten the heuristic more)
     h_player = min((manhattan_distance(player, c) for c in crates), default=0)
@@ -67,5 +97,61 @@ def strong_heuristic(problem, state):
     cache[state] = h
     return h
 
-
-
+# Find the crate that moved between a state and its successor (a step can push at most one crate)
+# It returns the old and new cell indices of the crate or None if no crate moved
+def moved_crate(problem, parent, state):
+    parent_mask, mask = getattr(parent, "crate_mask", None), getattr(state, "crate_mask", None)
+    if parent_mask is not None and mask is not None:
+        if parent_mask == mask: return None
+        return (parent_mask & ~mask).bit_length() - 1, (mask & ~parent_mask).bit_length() - 1
+    if parent.crates == state.crates: return None
+    index = problem.layout.cell_index
+    return index[next(iter(parent.crates - state.crates))], index[next(iter(state.crates - parent.crates))]
+
+# This is an incremental version of strong_heuristic. It can be called like any heuristic function,
+# but search algorithms can also evaluate a child from the cached evaluation of its parent:
+#   h, info = heuristic.evaluate(problem, state)
+#   h_child, child_info = heuristic.evaluate_child(problem, state, info, child)
+# Since a successor differs from its parent by at most one crate:
+#   - the deadlock checks only run when a crate moved. They check every crate like strong_heuristic
+#     since a push can also freeze the crates next to the moved one (and through them, crates further away),
+#   - the crate-goal assignment of the parent is repaired after replacing the row of the moved crate
+#     (one augmenting path in O(n^2) instead of building the cost matrix and solving it in O(n^3)).
+class IncrementalStrongHeuristic:
+    def __call__(self, problem, state):
+        return strong_heuristic(problem, state)
+
+    # Evaluate a state from scratch
+    # The info is a tuple (the crate cells in row order, the assignment) or None if the state is a deadlock
+    def evaluate(self, problem, state):
+        h = strong_heuristic(problem, state)
+        if h == float('inf'): return h, None
+        cells = crate_cells(problem, state)
+        assignment = Assignment([[distances[cell] for distances in problem.layout.push_distances] for cell in cells])
+        return h, (cells, assignment)
+
+    # Evaluate a child state given the info of its parent
+    def evaluate_child(self, problem, parent, parent_info, state):
+        if parent_info is None: return self.evaluate(problem, state)
+        moved = moved_crate(problem, parent, state)
+        cells, assignment = parent_info
+        if moved is not None:
+            old, new = moved
+            layout = problem.layout
+            # Repair the list of crates and check it for deadlocks
+            row = cells.index(old)
+            cells = cells[:row] + [new] + cells[row+1:]
+            mask = getattr(state, "crate_mask", None)
+            if mask is None: mask = layout.to_mask(state.crates)
+            # (the cost cached by crate_cost is infinite if the crates are deadlocked, so a cached cost skips the checks)
+            cost = problem.cache("crates").get(mask)
+            if cost == float('inf') or cost is None and crates_deadlocked(problem, mask, cells): return float('inf'), None
+            # Repair the assignment
+            assignment = assignment.copy()
+            assignment.update_row(row, [distances[new] for distances in layout.push_distances])
+        if problem.is_goal(state): return 0.0, (cells, assignment)
+        h_crates = assignment.total()
+        if h_crates == float('inf'): return h_crates, None
+        player = state.player
+        h_player = min((manhattan_distance(player, problem.layout.cells[cell]) for cell in cells), default=0)
+        return round(h_crates + 0.45 * h_player), (cells, assignment)
@@ -0,0 +1,158 @@
+from collections import deque
+from typing import Callable, Dict, List, Tuple
+
+from mathutils import Direction
+from problem import Solution
+from sokoban import CompactSokobanProblem, CompactSokobanState, SokobanProblem
+from sokoban_deadlocks import DeadlockDetector
+from helpers.utils import track_call_count
+
+# This file contains a push-level (macro-move) formulation of the sokoban problem.
+# In the step-level problem, most states only differ by where the player stands between two pushes,
+# so the search wastes most of its expansions walking around. Here, every action is a crate push
+# and the walk to the cell behind the crate is folded into the action:
+#   - An action is a tuple (crate cell, direction) where the crate at 'crate cell' is pushed in 'direction'.
+#   - The cost of an action is the walking distance to the cell behind the crate plus 1 (the push itself),
+#     so UniformCostSearch and AStarSearch still return solutions that are optimal in the number of steps.
+#   - After a push, the player stands where the crate was. Since the future cost depends on the exact
+#     player position, the states keep it. If 'normalize' is True, the player is replaced by the
+#     smallest cell index in its reachable region (found by a flood fill) which merges many more states,
+#     but then every push costs 1 so the solutions are only optimal in the number of pushes.
+#   - Pushes into dead squares are pruned by default since they can never lead to a goal.
+#     Pushes that create a 2x2 block, a freeze deadlock or a simple corral deadlock are pruned too (see DeadlockDetector).
+PushAction = Tuple[int, Direction]
+
+# Run a breadth first flood fill from the player cell over the cells that are not walls or crates.
+# It returns 2 dictionaries:
+#   distance[cell] is the walking distance from the player to the cell
+#   previous[cell] is the (cell, direction) from which we reached the cell (None for the player cell)
+def flood_fill(problem: CompactSokobanProblem, player: int, crates: int) -> Tuple[Dict[int, int], Dict[int, Tuple[int, Direction]]]:
+    neighbors = problem.layout.neighbors
+    distance, previous = {player: 0}, {player: None}
+    queue = deque([player])
+    while queue:
+        cell = queue.popleft()
+        for direction in Direction:
+            neighbor = neighbors[cell][direction]
+            if neighbor < 0 or neighbor in distance or crates >> neighbor & 1: continue
+            distance[neighbor] = distance[cell] + 1
+            previous[neighbor] = (cell, direction)
+            queue.append(neighbor)
+    return distance, previous
+
+class SokobanPushProblem(CompactSokobanProblem):
+    normalize: bool = False
+    prune_dead_squares: bool = True
+    prune_deadlocks: bool = True
+    prune_corrals: bool = False # the corral check runs a small search for every push so it is disabled by default
+    _detector: DeadlockDetector = None
+
+    # The flood fill of the last state is kept since get_actions and get_cost are called on the same state in a row
+    _reach_state: CompactSokobanState = None
+    _reach: Tuple[Dict[int, int], Dict[int, Tuple[int, Direction]]] = None
+
+    def _flood_fill(self, state: CompactSokobanState):
+        if self._reach_state is not state:
+            self._reach = flood_fill(self, state.player_cell, state.crate_mask)
+            self._reach_state = state
+        return self._reach
+
+    # The deadlock detector is created on the first use
+    def detector(self) -> DeadlockDetector:
+        if self._detector is None or self._detector.layout is not self.layout:
+            self._detector = DeadlockDetector(self.layout)
+        return self._detector
+
+    # Replace the player by the canonical cell of its reachable region (if normalization is enabled)
+    def _canonical(self, player: int, crates: int) -> int:
+        if not self.normalize: return player
+        return min(flood_fill(self, player, crates)[0])
+
+    def get_initial_state(self) -> CompactSokobanState:
+        state = self.initial_state
+        return CompactSokobanState.create(state.layout, self._canonical(state.player_cell, state.crate_mask), state.crate_mask)
+
+    @track_call_count
+    def get_actions(self, state: CompactSokobanState) -> List[PushAction]:
+        neighbors, beyond = self.layout.neighbors, self.layout.beyond
+        crates = state.crate_mask
+        blocked = crates | self.layout.dead_mask if self.prune_dead_squares else crates
+        actions = []
+        # A crate can be pushed from every reachable cell that has a crate next to it and a free cell beyond that crate
+        for cell in sorted(self._flood_fill(state)[0]):
+            for direction in Direction:
+                crate, target = neighbors[cell][direction], beyond[cell][direction]
+                if crate < 0 or target < 0 or not crates >> crate & 1 or blocked >> target & 1: continue
+                if self.prune_deadlocks and self.detector().is_deadlocked(crate, crates ^ ((1 << crate) | (1 << target)), target, self.prune_corrals): continue
+                actions.append((crate, direction))
+        return actions
+
+    def get_successor(self, state: CompactSokobanState, action: PushAction) -> CompactSokobanState:
+        crate, direction = action
+        target = self.layout.neighbors[crate][direction]
+        layout = self.layout
+        crates = state.crate_mask ^ ((1 << crate) | (1 << target))
+        player = self._canonical(crate, crates)
+        zobrist = state.zobrist ^ layout.zobrist_player[state.player_cell] ^ layout.zobrist_player[player] \
+            ^ layout.zobrist_crate[crate] ^ layout.zobrist_crate[target]
+        return CompactSokobanState(layout, player, crates, zobrist)
+
+    def get_cost(self, state: CompactSokobanState, action: PushAction) -> float:
+        if self.normalize: return 1
+        crate, direction = action
+        # The player has to walk to the cell behind the crate, then push it
+        behind = self.layout.neighbors[crate][direction.rotate(2)]
+        return self._flood_fill(state)[0][behind] + 1
+
+    # Convert a list of pushes applied from the given state to the list of steps that the player should do
+    # (the state must hold the real player position, not the canonical one)
+    def expand_solution(self, state: CompactSokobanState, pushes: List[PushAction]) -> List[Direction]:
+        steps = []
+        player, crates = state.player_cell, state.crate_mask
+        for crate, direction in pushes:
+            behind = self.layout.neighbors[crate][direction.rotate(2)]
+            # Walk back from the cell behind the crate to the player to find the walking path
+            _, previous = flood_fill(self, player, crates)
+            walk, cell = [], behind
+            while previous[cell] is not None:
+                cell, step = previous[cell]
+                walk.append(step)
+            steps.extend(reversed(walk))
+            steps.append(direction)
+            target = self.layout.neighbors[crate][direction]
+            player, crates = crate, crates ^ ((1 << crate) | (1 << target))
+        return steps
+
+    # Create a push-level version of the given sokoban problem (which can be point-based or compact)
+    @staticmethod
+    def from_problem(problem: SokobanProblem, normalize: bool = False) -> 'SokobanPushProblem':
+        pushes = SokobanPushProblem()
+        pushes.layout = problem.layout
+        pushes.initial_state = problem.initial_state
+        if not isinstance(pushes.initial_state, CompactSokobanState):
+            pushes.initial_state = CompactSokobanState.from_state(pushes.initial_state)
+        pushes.normalize = normalize
+        return pushes
+
+    @staticmethod
+    def from_text(text: str, normalize: bool = False) -> 'SokobanPushProblem':
+        return SokobanPushProblem.from_problem(SokobanProblem.from_text(text), normalize)
+
+    @staticmethod
+    def from_file(path: str, normalize: bool = False) -> 'SokobanPushProblem':
+        return SokobanPushProblem.from_problem(SokobanProblem.from_file(path), normalize)
+
+# Wrap a search function so that it searches the push-level problem and returns a list of steps (Directions).
+# The returned function has the same signature as the wrapped one (the heuristic is passed as is if given),
+# so it can be used by UninformedSearchAgent and InformedSearchAgent on a step-level SokobanProblem.
+def push_level_search(search_fn: Callable[..., Solution], normalize: bool = False) -> Callable[..., Solution]:
+    def search(problem: SokobanProblem, state, *args) -> Solution:
+        start = state if isinstance(state, CompactSokobanState) else CompactSokobanState.from_state(state)
+        pushes = SokobanPushProblem()
+        pushes.layout = problem.layout
+        pushes.initial_state = start
+        pushes.normalize = normalize
+        solution = search_fn(pushes, pushes.get_initial_state(), *args)
+        if solution is None: return None
+        return pushes.expand_solution(start, solution)
+    return search
@@ -0,0 +1,57 @@
+import os, unittest
+
+from graph import GraphNode, GraphRoutingProblem
+from mathutils import Point
+from search import AStarSearch, AnytimeRepairingAStar
+from sokoban import SokobanProblem
+from sokoban_heuristic import matching_heuristic
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load(level):
+    problem = SokobanProblem.from_file(os.path.join(ROOT, "levels", level))
+    return problem, problem.get_initial_state()
+
+# The bounds are only guaranteed for a consistent heuristic, so the tests use the push-distance matching
+def optimal_cost(problem, state):
+    return len(AStarSearch(problem, state, matching_heuristic))
+
+class TestAnytimeRepairingAStar(unittest.TestCase):
+    def test_bound_is_one_at_the_optimum(self):
+        for level in ("level1.txt", "level2.txt"):
+            problem, state = load(level)
+            results = list(AnytimeRepairingAStar(problem, state, matching_heuristic))
+            self.assertEqual(results[-1].bound, 1)
+            self.assertEqual(results[-1].cost, optimal_cost(problem, state))
+            self.assertEqual(len(results[-1].solution), results[-1].cost)
+
+    def test_costs_decrease_on_level3(self):
+        problem, state = load("level3.txt")
+        results = list(AnytimeRepairingAStar(problem, state, matching_heuristic))
+        costs = [result.cost for result in results]
+        self.assertEqual(costs, sorted(costs, reverse=True))
+        self.assertEqual(costs[-1], optimal_cost(problem, state))
+        for result in results:
+            self.assertEqual(len(result.solution), result.cost)
+
+    # Every published bound must hold, including the ones published when the node limit stops a weighted search
+    def test_bound_is_valid_after_node_limit(self):
+        problem, state = load("level3.txt")
+        optimal = optimal_cost(problem, state)
+        for node_limit in (100, 400, 1600, 3200):
+            for result in AnytimeRepairingAStar(problem, state, matching_heuristic, node_limit=node_limit):
+                self.assertLessEqual(result.cost, result.bound * optimal)
+
+    # The first expansion finds the direct edge (cost 100) while the optimal path costs 2:
+    # after a stop, the bound cannot be the weight (3), it must be 100 / 1 (the cost over the lowest open g + h)
+    def test_bound_after_stop_ignores_the_weight(self):
+        s, a, g = GraphNode("S", Point(0, 0)), GraphNode("A", Point(1, 0)), GraphNode("G", Point(2, 0))
+        problem = GraphRoutingProblem(s, g, {s: [g, a], a: [g], g: []})
+        problem.set_cost(s, g, 100)
+        results = list(AnytimeRepairingAStar(problem, s, lambda problem, state: 0, initial_weight=3, node_limit=1))
+        self.assertEqual([(result.cost, result.bound) for result in results], [(100, 100)])
+        results = list(AnytimeRepairingAStar(problem, s, lambda problem, state: 0, initial_weight=3))
+        self.assertEqual((results[-1].cost, results[-1].bound), (2, 1))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import math, random, unittest
+from itertools import permutations
+
+from mathutils import Assignment, min_cost_assignment
+
+# The minimum total cost over every way to assign a distinct column to every row (inf if there are more rows than columns)
+def brute_force(cost):
+    n, m = len(cost), len(cost[0]) if cost else 0
+    return min((sum(cost[row][column] for row, column in enumerate(columns)) for columns in permutations(range(m), n)), default=math.inf)
+
+def random_matrix(rng, n, m):
+    return [[math.inf if rng.random() < 0.2 else rng.randrange(10) for _ in range(m)] for _ in range(n)]
+
+class TestAssignment(unittest.TestCase):
+    def check(self, assignment, cost):
+        expected = brute_force(cost)
+        self.assertEqual(assignment.total(), expected)
+        if not math.isinf(expected):
+            columns = assignment.assignment()
+            self.assertEqual(len(set(columns)), len(columns))
+            self.assertEqual(sum(cost[row][column] for row, column in enumerate(columns)), expected)
+
+    # Square and rectangular matrices (including more rows than columns) with some infinite costs
+    def test_matches_brute_force(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            n, m = rng.randint(1, 5), rng.randint(1, 5)
+            cost = random_matrix(rng, n, m)
+            self.check(Assignment(cost), cost)
+            self.assertEqual(min_cost_assignment(cost)[0], brute_force(cost))
+
+    # Repairing the assignment after replacing a row gives the same cost as solving from scratch
+    def test_update_row_matches_brute_force(self):
+        rng = random.Random(1)
+        for _ in range(100):
+            n, m = rng.randint(1, 5), rng.randint(1, 5)
+            cost = random_matrix(rng, n, m)
+            assignment = Assignment(cost)
+            for _ in range(5):
+                row = rng.randrange(n)
+                cost[row] = random_matrix(rng, 1, m)[0]
+                copy = assignment.copy()
+                copy.update_row(row, cost[row])
+                self.check(copy, cost)
+                assignment = copy
+
+    def test_more_rows_than_columns(self):
+        assignment = Assignment([[1], [2]])
+        self.assertEqual(assignment.total(), math.inf)
+        self.assertEqual(sorted(assignment.assignment()), [-1, 0])
+
+if __name__ == "__main__":
+    unittest.main()
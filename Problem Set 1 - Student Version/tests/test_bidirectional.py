@@ -0,0 +1,79 @@
+import glob, os, random, unittest
+
+from graph import GraphNode, GraphRoutingProblem, graphrouting_heuristic, graphrouting_reverse_heuristic
+from helpers.utils import fetch_recorded_calls
+from mathutils import Point, euclidean_distance
+from search import BidirectionalAStarSearch, BidirectionalUniformCostSearch, UniformCostSearch
+
+GRAPHS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "graphs")
+
+# A random directed graph whose edge costs are at least the euclidean distance (so the heuristics stay admissible)
+def random_problem(seed: int, size: int = 30, degree: int = 3) -> GraphRoutingProblem:
+    rng = random.Random(seed)
+    nodes = [GraphNode(f"n{i}", Point(rng.randrange(50), rng.randrange(50))) for i in range(size)]
+    adjacency = {node: rng.sample([other for other in nodes if other is not node], rng.randrange(degree + 1)) for node in nodes}
+    problem = GraphRoutingProblem(nodes[0], nodes[-1], adjacency)
+    for node, neighbors in adjacency.items():
+        for neighbor in neighbors:
+            if rng.random() < 0.3:
+                problem.set_cost(node, neighbor, euclidean_distance(node.position, neighbor.position) * rng.uniform(1, 3))
+    return problem
+
+# Every (start, goal) pair of the graph files and of a few random graphs
+def problems():
+    for path in sorted(glob.glob(os.path.join(GRAPHS, "*.json"))):
+        problem = GraphRoutingProblem.from_file(path)
+        for start in problem.adjacency:
+            for goal in problem.adjacency:
+                yield GraphRoutingProblem(start, goal, problem.adjacency)
+    for seed in range(10):
+        problem = random_problem(seed)
+        for goal in list(problem.adjacency)[::3]:
+            copy = GraphRoutingProblem(problem.start, goal, problem.adjacency)
+            copy.cost_overrides = problem.cost_overrides
+            yield copy
+
+def path_cost(problem, solution):
+    state, cost = problem.start, 0
+    for action in solution:
+        cost += problem.get_cost(state, action)
+        state = problem.get_successor(state, action)
+    assert problem.is_goal(state)
+    return cost
+
+class TestBidirectionalSearch(unittest.TestCase):
+    # Both bidirectional searches find the same costs as UCS (and no solution when UCS finds none)
+    def test_matches_uniform_cost_search(self):
+        searches = [BidirectionalUniformCostSearch,
+                    lambda problem, state: BidirectionalAStarSearch(problem, state, graphrouting_heuristic),
+                    lambda problem, state: BidirectionalAStarSearch(problem, state, graphrouting_heuristic, graphrouting_reverse_heuristic)]
+        for problem in problems():
+            expected = UniformCostSearch(problem, problem.start)
+            for search in searches:
+                solution = search(problem, problem.start)
+                if expected is None:
+                    self.assertIsNone(solution)
+                else:
+                    self.assertAlmostEqual(path_cost(problem, solution), path_cost(problem, expected))
+
+    def test_start_is_goal(self):
+        problem = GraphRoutingProblem.from_file(os.path.join(GRAPHS, "graph1.json"))
+        problem.goal = problem.start
+        self.assertEqual(BidirectionalAStarSearch(problem, problem.start, graphrouting_heuristic), [])
+
+    # Every backward expansion is recorded once (like the forward ones) and fetching the records clears them
+    def test_records_the_expansions(self):
+        problem = GraphRoutingProblem.from_file(os.path.join(GRAPHS, "graph2.json"))
+        fetch_recorded_calls(GraphRoutingProblem.get_actions)
+        fetch_recorded_calls(GraphRoutingProblem.get_predecessors)
+        BidirectionalUniformCostSearch(problem, problem.start)
+        forward = [call["args"][1] for call in fetch_recorded_calls(GraphRoutingProblem.get_actions)]
+        backward = [call["args"][1] for call in fetch_recorded_calls(GraphRoutingProblem.get_predecessors)]
+        self.assertEqual(forward[0], problem.start)
+        self.assertEqual(backward[0], problem.goal)
+        self.assertEqual(len(forward), len(set(forward)))
+        self.assertEqual(len(backward), len(set(backward)))
+        self.assertEqual(len(fetch_recorded_calls(GraphRoutingProblem.get_predecessors)), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os, unittest
+
+from graph import GraphNode, GraphRoutingProblem
+from mathutils import Point
+from search import BeamSearch, BoundedBestFirstSearch, _BeamSearchOnce, _BoundedBestFirstSearchOnce
+from sokoban import SokobanProblem
+from sokoban_heuristic import strong_heuristic
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def zero_heuristic(problem, state):
+    return 0
+
+# A ring of nodes with a branch at every node, and a goal that cannot be reached
+def unsolvable_ring(size: int = 50):
+    ring = [GraphNode(f"r{i}", Point(i, 0)) for i in range(size)]
+    branches = [GraphNode(f"b{i}", Point(i, 1)) for i in range(size)]
+    goal = GraphNode("goal", Point(0, 5))
+    adjacency = {node: [ring[(i + 1) % size], branches[i]] for i, node in enumerate(ring)}
+    adjacency.update({branch: [ring[i]] for i, branch in enumerate(branches)})
+    adjacency[goal] = []
+    return GraphRoutingProblem(ring[0], goal, adjacency)
+
+class TestBoundedSearch(unittest.TestCase):
+    # The visited states are remembered exactly, so the searches end even when the frontier keeps dropping nodes
+    def test_unsolvable_problem_ends(self):
+        problem = unsolvable_ring()
+        self.assertIsNone(BeamSearch(problem, problem.start, zero_heuristic, width=1, restarts=2))
+        self.assertIsNone(BoundedBestFirstSearch(problem, problem.start, zero_heuristic, max_frontier=2, restarts=2))
+
+    # A run never remembers more than 'max_visited' states: it stops (and reports a truncated run) when the table is full,
+    # and the restarts double the budget
+    def test_visited_table_is_bounded(self):
+        problem = unsolvable_ring()
+        runs = [lambda max_visited: _BeamSearchOnce(problem, problem.start, zero_heuristic, 1000, max_visited),
+                lambda max_visited: _BoundedBestFirstSearchOnce(problem, problem.start, zero_heuristic, 1000, max_visited)]
+        for run in runs:
+            self.assertEqual(run(10), (None, True))
+            self.assertEqual(run(100), (None, False)) # the whole ring (100 states) fits
+        calls = []
+        def expand(state):
+            calls.append(state)
+            return GraphRoutingProblem.get_actions(problem, state)
+        problem.get_actions = expand
+        for search in (lambda: BeamSearch(problem, problem.start, zero_heuristic, width=1000, restarts=2, max_visited=10),
+                       lambda: BoundedBestFirstSearch(problem, problem.start, zero_heuristic, max_frontier=1000, restarts=2, max_visited=10)):
+            calls.clear()
+            self.assertIsNone(search())
+            self.assertLessEqual(len(calls), 10 + 20 + 40) # the budget of the three runs
+
+    # A level that does not fit in the initial budget is solved after the restarts
+    def test_restart_doubles_the_budget(self):
+        problem = SokobanProblem.from_file(os.path.join(ROOT, "levels", "level2.txt"))
+        state = problem.get_initial_state()
+        for search in (BeamSearch, BoundedBestFirstSearch):
+            self.assertIsNone(search(problem, state, strong_heuristic, restarts=0, max_visited=8))
+            self.assertIsNotNone(search(problem, state, strong_heuristic, restarts=10, max_visited=8))
+
+    def test_solvable_level(self):
+        problem = SokobanProblem.from_file(os.path.join(ROOT, "levels", "level2.txt"))
+        state = problem.get_initial_state()
+        for search in (BeamSearch, BoundedBestFirstSearch):
+            solution = search(problem, state, strong_heuristic)
+            self.assertIsNotNone(solution)
+            for action in solution:
+                state = problem.get_successor(state, action)
+            self.assertTrue(problem.is_goal(state))
+            state = problem.get_initial_state()
+
+if __name__ == "__main__":
+    unittest.main()
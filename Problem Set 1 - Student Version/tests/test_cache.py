@@ -0,0 +1,118 @@
+import os, unittest
+
+from helpers.cache import DEFAULT_CAPACITY, DEFAULT_SIZE_CAPACITY, ClockCache, LRUCache, SizeAwareCache, create_cache
+from helpers.utils import CacheContainer
+from play_sokoban import get_cached_heuristic
+from sokoban import SokobanProblem
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache["a"], cache["b"] = 1, 2
+        self.assertEqual(cache["a"], 1) # "b" is now the least recently used entry
+        cache["c"] = 3
+        self.assertNotIn("b", cache)
+        self.assertEqual((cache["a"], cache["c"]), (1, 3))
+        self.assertEqual((len(cache), cache.evictions), (2, 1))
+
+    def test_counts_hits_and_misses(self):
+        cache = LRUCache(2)
+        cache["a"] = 1
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (1, 1, 0.5))
+
+class TestClockCache(unittest.TestCase):
+    def test_referenced_entries_get_a_second_chance(self):
+        cache = ClockCache(3)
+        cache["a"], cache["b"], cache["c"] = 1, 2, 3
+        cache["a"] # only "a" was referenced, so the hand skips it and evicts "b"
+        cache["d"] = 4
+        self.assertNotIn("b", cache)
+        self.assertEqual((cache["a"], cache["c"], cache["d"]), (1, 3, 4))
+        self.assertEqual((len(cache), cache.evictions), (3, 1))
+
+    def test_full_pass_when_all_referenced(self):
+        cache = ClockCache(2)
+        cache["a"], cache["b"] = 1, 2
+        cache["a"], cache["b"] # every entry is referenced, so the hand clears all the bits and evicts the first one
+        cache["c"] = 3
+        self.assertNotIn("a", cache)
+        self.assertIn("b", cache)
+        self.assertIn("c", cache)
+
+    def test_update_does_not_evict(self):
+        cache = ClockCache(2)
+        cache["a"], cache["b"] = 1, 2
+        cache["a"] = 10
+        self.assertEqual((cache["a"], cache["b"], cache.evictions), (10, 2, 0))
+
+    # Like LRUCache, a cache without capacity stores nothing
+    def test_zero_capacity(self):
+        for cache in (ClockCache(0), LRUCache(0)):
+            cache["a"] = 1
+            self.assertNotIn("a", cache)
+            self.assertEqual((len(cache), cache.evictions), (0, 1))
+
+class TestSizeAwareCache(unittest.TestCase):
+    def test_evicts_until_the_size_fits(self):
+        cache = SizeAwareCache(10, sizeof=lambda item: item if isinstance(item, int) else 0)
+        cache["a"], cache["b"], cache["c"] = 3, 3, 3
+        self.assertEqual((len(cache), cache.total_size), (3, 9))
+        cache["d"] = 5 # "a" and "b" must go to make room
+        self.assertEqual(list(cache), ["c", "d"])
+        self.assertEqual((cache.total_size, cache.evictions), (8, 2))
+
+    def test_keeps_an_entry_larger_than_the_capacity(self):
+        cache = SizeAwareCache(10, sizeof=lambda item: item if isinstance(item, int) else 0)
+        cache["a"] = 3
+        cache["big"] = 50
+        self.assertEqual(list(cache), ["big"])
+        self.assertEqual(cache.stats()["total_size"], 50)
+
+    def test_replacing_an_entry_updates_the_size(self):
+        cache = SizeAwareCache(10, sizeof=lambda item: item if isinstance(item, int) else 0)
+        cache["a"] = 3
+        cache["a"] = 7
+        self.assertEqual((len(cache), cache.total_size, cache.evictions), (1, 7, 0))
+
+class TestCacheContainer(unittest.TestCase):
+    def test_configure_cache(self):
+        container = CacheContainer()
+        container.configure_cache(4, "clock")
+        self.assertIsInstance(container.cache("test"), ClockCache)
+        self.assertEqual(container.cache("test").capacity, 4)
+        self.assertIs(container.cache("test"), container.cache("test"))
+        self.assertIn("test", container.cache_stats())
+
+    # The capacity of the "size" policy is in bytes, so it has its own default
+    def test_default_capacity(self):
+        self.assertEqual(create_cache("lru").capacity, DEFAULT_CAPACITY)
+        self.assertEqual(create_cache("clock").capacity, DEFAULT_CAPACITY)
+        self.assertEqual(create_cache("size").capacity, DEFAULT_SIZE_CAPACITY)
+        container = CacheContainer()
+        container.configure_cache(None, "size")
+        self.assertEqual(container.cache().capacity, DEFAULT_SIZE_CAPACITY)
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            create_cache("random")
+
+    # The heuristics of play_sokoban are cached in the problem, so they follow its cache configuration
+    def test_cached_heuristic_uses_the_problem_cache(self):
+        problem = SokobanProblem.from_file(os.path.join(ROOT, "levels", "level1.txt"))
+        problem.configure_cache(2, "lru")
+        heuristic = get_cached_heuristic("weak")
+        state = problem.get_initial_state()
+        successors = [problem.get_successor(state, action) for action in problem.get_actions(state)]
+        for other in [state] + successors + [state]:
+            heuristic(problem, other)
+        stats = problem.cache_stats()["heuristic:weak"]
+        self.assertEqual((stats["size"], stats["capacity"]), (2, 2))
+        self.assertGreater(stats["evictions"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+
+from agents import IncrementalSearchAgent
+from graph import GraphNode, GraphRoutingProblem
+from helpers.utils import fetch_recorded_calls
+from mathutils import Point
+from search import DStarLite, UniformCostSearch
+
+def zero_heuristic(problem, a, b):
+    return 0
+
+def path_cost(problem, state, path):
+    cost = 0
+    for action in path:
+        cost += problem.get_cost(state, action)
+        state = problem.get_successor(state, action)
+    return cost
+
+# B and C are at the same position (so the edges between them cost 0), B has a self-loop and D is the goal
+def coincident_problem():
+    a, b = GraphNode("A", Point(0, 0)), GraphNode("B", Point(1, 0))
+    c, d = GraphNode("C", Point(1, 0)), GraphNode("D", Point(1, 3))
+    return GraphRoutingProblem(a, d, {a: [b], b: [b, c], c: [b, d], d: []}), (a, b, c, d)
+
+class TestDStarLite(unittest.TestCase):
+    def test_zero_cost_edges(self):
+        problem, (a, b, c, d) = coincident_problem()
+        plan = DStarLite(problem, a, zero_heuristic).plan()
+        self.assertEqual(plan, [b, c, d])
+        self.assertEqual(path_cost(problem, a, plan), path_cost(problem, a, UniformCostSearch(problem, a)))
+
+    def test_next_action_skips_self_loops(self):
+        problem, (a, b, c, d) = coincident_problem()
+        search = DStarLite(problem, a, zero_heuristic)
+        self.assertEqual(search.next_action(), b)
+        search.move_to(b)
+        self.assertEqual(search.next_action(), c)
+
+    # After the agent reaches X and the cost of X -> G increases, X and Y form a zero-cost cycle
+    # whose old g values support each other
+    def test_cost_increase_with_zero_cost_cycle(self):
+        s, x, y = GraphNode("S", Point(-1, 0)), GraphNode("X", Point(0, 0)), GraphNode("Y", Point(0, 0))
+        g, z = GraphNode("G", Point(1, 0)), GraphNode("Z", Point(0, 1))
+        problem = GraphRoutingProblem(s, g, {s: [x], x: [y, g], y: [x, z], z: [g], g: []})
+        search = DStarLite(problem, s, zero_heuristic)
+        self.assertEqual(search.plan(), [x, g])
+        search.move_to(x)
+        problem.set_cost(x, g, 10)
+        plan = search.plan()
+        self.assertEqual(plan, [y, z, g])
+        self.assertEqual(path_cost(problem, x, plan), path_cost(problem, x, UniformCostSearch(problem, x)))
+
+    def test_unreachable_goal(self):
+        problem, (a, b, c, d) = coincident_problem()
+        problem.set_cost(c, d, float('inf'))
+        self.assertIsNone(DStarLite(problem, a, zero_heuristic).plan())
+
+    # The agent drops the calls recorded by the previous steps, so the records do not grow with the number of steps
+    def test_agent_does_not_keep_the_recorded_calls(self):
+        nodes = [GraphNode(f"n{i}", Point(i, 0)) for i in range(40)]
+        adjacency = {node: nodes[max(i - 1, 0):i] + nodes[i + 1:i + 2] for i, node in enumerate(nodes)}
+        problem = GraphRoutingProblem(nodes[0], nodes[-1], adjacency)
+        agent = IncrementalSearchAgent(zero_heuristic)
+        state, sizes = problem.start, []
+        while not problem.is_goal(state):
+            state = problem.get_successor(state, agent.act(problem, state))
+            sizes.append(len(GraphRoutingProblem.get_actions.calls) + len(GraphRoutingProblem.get_predecessors.calls))
+        self.assertEqual(state, nodes[-1])
+        self.assertEqual(max(sizes), sizes[0]) # the first step (the whole search) records the most calls
+        fetch_recorded_calls(GraphRoutingProblem.get_actions)
+        fetch_recorded_calls(GraphRoutingProblem.get_predecessors)
+
+if __name__ == "__main__":
+    unittest.main()
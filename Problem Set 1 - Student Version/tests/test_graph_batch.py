@@ -0,0 +1,73 @@
+import glob, math, os, random, unittest
+
+from graph import GraphRoutingProblem
+from graph_batch import BatchRouter
+from search import UniformCostSearch
+
+GRAPHS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "graphs")
+
+def path_cost(problem, start, solution):
+    state, cost = start, 0
+    for action in solution:
+        cost += problem.get_cost(state, action)
+        state = problem.get_successor(state, action)
+    return cost, state
+
+# Every (start, goal) query of the graph in a shuffled order (so the queries of a start are not next to each other)
+def all_queries(problem, seed=0):
+    queries = [(start.name, goal.name) for start in problem.adjacency for goal in problem.adjacency]
+    random.Random(seed).shuffle(queries)
+    return queries
+
+class TestBatchRouter(unittest.TestCase):
+    # Check the results of a batch against the queries routed one at a time and against UCS
+    def check_batch(self, problem, router, queries):
+        nodes = {node.name: node for node in problem.adjacency}
+        results = list(router.route_batch(queries))
+        self.assertEqual(sorted(result.index for result in results), list(range(len(queries))))
+        single = BatchRouter(router.graph, workers=1)
+        for result in results:
+            start, goal = queries[result.index]
+            self.assertEqual((result.start, result.goal), (start, goal))
+            expected = single.route(start, goal)
+            copy = GraphRoutingProblem(nodes[start], nodes[goal], problem.adjacency)
+            copy.cost_overrides = problem.cost_overrides
+            solution = UniformCostSearch(copy, nodes[start])
+            if solution is None:
+                self.assertTrue(math.isinf(expected.cost))
+                self.assertTrue(math.isinf(result.cost))
+                self.assertIsNone(result.path)
+                continue
+            self.assertAlmostEqual(result.cost, expected.cost)
+            cost, state = path_cost(problem, nodes[start], result.path)
+            self.assertEqual(state, nodes[goal])
+            self.assertAlmostEqual(cost, result.cost)
+            self.assertAlmostEqual(result.cost, path_cost(problem, nodes[start], solution)[0])
+
+    # The serial and threaded batches (with a cache small enough to evict the trees) match one-at-a-time routing
+    def test_matches_single_queries(self):
+        for path in sorted(glob.glob(os.path.join(GRAPHS, "*.json"))):
+            problem = GraphRoutingProblem.from_file(path)
+            queries = all_queries(problem)
+            for workers, capacity in ((1, 64), (1, 2), (3, 2)):
+                with BatchRouter.from_problem(problem, capacity, workers) as router:
+                    self.check_batch(problem, router, queries)
+
+    def test_process_pool(self):
+        problem = GraphRoutingProblem.from_file(os.path.join(GRAPHS, "graph2.json"))
+        with BatchRouter.from_problem(problem, 4, 2, "process") as router:
+            self.check_batch(problem, router, all_queries(problem, 1))
+
+    # The batch follows the costs changed by set_cost
+    def test_cost_overrides(self):
+        problem = GraphRoutingProblem.from_file(os.path.join(GRAPHS, "graph3.json"))
+        rng = random.Random(2)
+        for node, neighbors in problem.adjacency.items():
+            for neighbor in neighbors:
+                if rng.random() < 0.5:
+                    problem.set_cost(node, neighbor, problem.get_cost(node, neighbor) * rng.uniform(1, 4))
+        with BatchRouter.from_problem(problem, 8, 2) as router:
+            self.check_batch(problem, router, all_queries(problem, 3))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import glob, math, os, random, shutil, tempfile, unittest
+
+from graph import GraphNode, GraphRoutingProblem
+from graph_csr import CSRGraph, CSRGraphRoutingProblem, csr_distances
+from graph_landmarks import LandmarkIndex, index_path
+from graph_loader import stream_graph
+from mathutils import Point
+from search import AStarSearch, UniformCostSearch
+
+GRAPHS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "graphs")
+
+# A random directed graph where some nodes cannot reach the others
+def random_problem(seed: int, size: int = 40, degree: int = 3) -> GraphRoutingProblem:
+    rng = random.Random(seed)
+    nodes = [GraphNode(f"n{i}", Point(rng.randrange(100), rng.randrange(100))) for i in range(size)]
+    adjacency = {node: rng.sample([other for other in nodes if other is not node], rng.randrange(degree + 1)) for node in nodes}
+    problem = GraphRoutingProblem(nodes[0], nodes[-1], adjacency)
+    for node, neighbors in adjacency.items():
+        for neighbor in neighbors:
+            problem.set_cost(node, neighbor, rng.randrange(1, 20))
+    return problem
+
+def graphs():
+    for path in sorted(glob.glob(os.path.join(GRAPHS, "*.json"))):
+        yield stream_graph(path)[0]
+    for seed in range(5):
+        yield CSRGraph.from_problem(random_problem(seed))
+
+def path_cost(problem, state, solution):
+    cost = 0
+    for action in solution:
+        cost += problem.get_cost(state, action)
+        state = problem.get_successor(state, action)
+    return cost
+
+class TestLandmarkIndex(unittest.TestCase):
+    # The bound never exceeds the distance computed by Dijkstra and is inf exactly when the target is unreachable
+    def test_admissible(self):
+        for graph in graphs():
+            for count in (1, 4, 8):
+                index = LandmarkIndex.build(graph, count)
+                for source in range(graph.node_count):
+                    distances = csr_distances(graph, source)
+                    for target in range(graph.node_count):
+                        bound = index.lower_bound(source, target)
+                        if math.isinf(bound):
+                            self.assertTrue(math.isinf(distances[target]))
+                        else:
+                            self.assertLessEqual(bound, distances[target] + 1e-9)
+
+    # h(v) <= w(v, u) + h(u) for every edge
+    def test_consistent(self):
+        for graph in graphs():
+            index = LandmarkIndex.build(graph)
+            for target in range(graph.node_count):
+                for node in range(graph.node_count):
+                    for edge in range(graph.indptr[node], graph.indptr[node + 1]):
+                        neighbor = graph.indices[edge]
+                        self.assertLessEqual(index.lower_bound(node, target),
+                                             graph.weights[edge] + index.lower_bound(neighbor, target) + 1e-9)
+
+    # A* with the index finds the same costs as Dijkstra (UCS)
+    def test_astar_matches_dijkstra(self):
+        for graph in graphs():
+            index = LandmarkIndex.build(graph)
+            for start in range(graph.node_count):
+                distances = csr_distances(graph, start)
+                for goal in range(graph.node_count):
+                    problem = CSRGraphRoutingProblem(graph, start, goal)
+                    solution = AStarSearch(problem, start, index.heuristic)
+                    if math.isinf(distances[goal]):
+                        self.assertIsNone(solution)
+                    else:
+                        self.assertAlmostEqual(path_cost(problem, start, solution), distances[goal])
+        for seed in range(5):
+            problem = random_problem(seed)
+            index = LandmarkIndex.for_problem(problem)
+            expected = UniformCostSearch(problem, problem.start)
+            solution = AStarSearch(problem, problem.start, index.heuristic)
+            if expected is None:
+                self.assertIsNone(solution)
+            else:
+                self.assertEqual(path_cost(problem, problem.start, solution), path_cost(problem, problem.start, expected))
+
+    # The saved index loads back the same distances and leaves no temporary file
+    def test_save_and_load(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "graph.json")
+            shutil.copy2(os.path.join(GRAPHS, "graph2.json"), path)
+            index = LandmarkIndex.for_graph_file(path, 4)
+            self.assertEqual(sorted(os.listdir(directory)), ["graph.json", "graph.landmarks"])
+            loaded = LandmarkIndex.load(index_path(path), index.graph)
+            self.assertEqual(list(loaded.landmarks), list(index.landmarks))
+            self.assertEqual(list(loaded.from_landmarks), list(index.from_landmarks))
+            self.assertEqual(list(loaded.to_landmarks), list(index.to_landmarks))
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    unittest.main()
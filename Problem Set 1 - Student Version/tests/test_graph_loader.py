@@ -0,0 +1,80 @@
+import glob, json, math, os, shutil, tempfile, unittest
+
+from graph import GraphRoutingProblem
+from graph_csr import CSRGraph, csr_distances
+from graph_loader import cache_path, load_cache, load_graph, stream_graph
+from search import UniformCostSearch
+
+GRAPHS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "graphs")
+
+class TestGraphCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "graph.json")
+        shutil.copy2(os.path.join(GRAPHS, "graph3.json"), self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # Saving the cache leaves no temporary file and the cache loads back the same graph
+    def test_save_and_load(self):
+        graph, start, goal = load_graph(self.path)
+        self.assertEqual(sorted(os.listdir(self.directory)), ["graph.csr", "graph.json"])
+        cached, cached_start, cached_goal = load_cache(cache_path(self.path), self.path)
+        self.assertEqual(list(cached.names), list(graph.names))
+        self.assertEqual((cached_start, cached_goal), (start, goal))
+
+    # A cache whose size does not match the counts of its header is ignored (and rebuilt by load_graph)
+    def test_truncated_cache_is_rejected(self):
+        load_graph(self.path)
+        with open(cache_path(self.path), "rb") as f:
+            data = f.read()
+        for size in (len(data) // 2, len(data) - 1):
+            with open(cache_path(self.path), "wb") as f:
+                f.write(data[:size])
+            self.assertIsNone(load_cache(cache_path(self.path), self.path))
+        graph, _, _ = load_graph(self.path)
+        self.assertIsNotNone(load_cache(cache_path(self.path), self.path))
+        self.assertEqual(graph.node_count, load_cache(cache_path(self.path), self.path)[0].node_count)
+
+class TestGraphLoaders(unittest.TestCase):
+    # The CSR graphs (built from the definition or streamed) give the same shortest path costs as the dictionary graph
+    def test_same_costs_as_dictionary_graph(self):
+        for path in sorted(glob.glob(os.path.join(GRAPHS, "*.json"))):
+            problem = GraphRoutingProblem.from_file(path)
+            with open(path) as f:
+                definition = json.load(f)["graph"]
+            for graph in (CSRGraph.from_definition(definition), stream_graph(path)[0]):
+                self.assertEqual(graph.node_count, len(problem.adjacency))
+                for start in problem.adjacency:
+                    distances = csr_distances(graph, graph.index[start.name])
+                    for goal in problem.adjacency:
+                        solution = UniformCostSearch(GraphRoutingProblem(start, goal, problem.adjacency), start)
+                        if solution is None:
+                            self.assertTrue(math.isinf(distances[graph.index[goal.name]]))
+                            continue
+                        cost, state = 0, start
+                        for action in solution:
+                            cost += problem.get_cost(state, action)
+                            state = problem.get_successor(state, action)
+                        self.assertAlmostEqual(distances[graph.index[goal.name]], cost)
+
+    # Every loader rejects an edge to a node that is not defined (instead of dropping it)
+    def test_undefined_adjacent_node(self):
+        definition = {"A": {"position": [0, 0], "adjacent": ["B", "C"]}, "B": {"position": [1, 0], "adjacent": []}}
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "graph.json")
+            with open(path, "w") as f:
+                json.dump({"graph": definition, "start": "A", "goal": "B"}, f)
+            with self.assertRaises(ValueError):
+                CSRGraph.from_definition(definition)
+            with self.assertRaises(ValueError):
+                stream_graph(path)
+            with self.assertRaises(ValueError):
+                GraphRoutingProblem.from_file(path)
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    unittest.main()
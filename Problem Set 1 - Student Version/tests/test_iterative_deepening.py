@@ -0,0 +1,37 @@
+import os, unittest
+
+from graph import GraphRoutingProblem
+from search import AStarSearch, IterativeDeepeningAStar, IterativeDeepeningDFS, BreadthFirstSearch
+from sokoban import SokobanProblem
+from sokoban_heuristic import strong_heuristic
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def path_cost(problem, state, path):
+    cost = 0
+    for action in path:
+        cost += problem.get_cost(state, action)
+        state = problem.get_successor(state, action)
+    return cost
+
+class TestIterativeDeepening(unittest.TestCase):
+    # The transposition table is kept across the iterations, so the solutions must stay optimal with or without it
+    def test_idastar_is_optimal(self):
+        # Without a table (or with a tiny one), level 2 takes minutes (which is why the table exists)
+        for level, table_sizes in (("level1.txt", (0, 16, 2**18)), ("level2.txt", (2**18,))):
+            problem = SokobanProblem.from_file(os.path.join(ROOT, "levels", level))
+            state = problem.get_initial_state()
+            expected = path_cost(problem, state, AStarSearch(problem, state, strong_heuristic))
+            for table_size in table_sizes:
+                solution = IterativeDeepeningAStar(problem, state, strong_heuristic, table_size)
+                self.assertEqual(path_cost(problem, state, solution), expected)
+
+    def test_iddfs_finds_shallowest_solution(self):
+        for name in ("graph1.json", "graph2.json", "graph3.json"):
+            problem = GraphRoutingProblem.from_file(os.path.join(ROOT, "graphs", name))
+            state = problem.get_initial_state()
+            for table_size in (0, 2**18):
+                self.assertEqual(len(IterativeDeepeningDFS(problem, state, table_size)), len(BreadthFirstSearch(problem, state)))
+
+if __name__ == "__main__":
+    unittest.main()
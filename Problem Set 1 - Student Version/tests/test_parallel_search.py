@@ -0,0 +1,80 @@
+import os, unittest
+
+from parallel_search import HashDistributedAStarSearch, hash_distributed_astar
+from parking import ParkingProblem
+from search import AStarSearch
+from sokoban import CompactSokobanProblem, SokobanProblem
+from sokoban_heuristic import matching_heuristic
+from test_bounded_search import unsolvable_ring, zero_heuristic
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load(level, kind=SokobanProblem):
+    problem = kind.from_file(os.path.join(ROOT, "levels", level))
+    return problem, problem.get_initial_state()
+
+def check_solution(test, problem, state, solution, cost):
+    total = 0
+    for action in solution:
+        total += problem.get_cost(state, action)
+        state = problem.get_successor(state, action)
+    test.assertTrue(problem.is_goal(state))
+    test.assertEqual(total, cost)
+
+class TestHashDistributedAStar(unittest.TestCase):
+    # The packed states are small tuples of ints that unpack to an equal state
+    def test_pack_round_trip(self):
+        for kind in (SokobanProblem, CompactSokobanProblem):
+            problem, state = load("level3.txt", kind)
+            for action in problem.get_actions(state):
+                successor = problem.get_successor(state, action)
+                packed = problem.pack_state(successor)
+                self.assertTrue(all(isinstance(value, int) for value in packed))
+                unpacked = problem.unpack_state(packed)
+                self.assertEqual(unpacked, successor)
+                self.assertEqual(unpacked.zobrist, successor.zobrist)
+        problem = ParkingProblem.from_file(os.path.join(ROOT, "parks", "park1.txt"))
+        state = problem.get_initial_state()
+        for action in problem.get_actions(state):
+            successor = problem.get_successor(state, action)
+            unpacked = problem.unpack_state(problem.pack_state(successor))
+            self.assertEqual(unpacked, successor)
+            self.assertEqual((unpacked.occupied, unpacked.zobrist), (successor.occupied, successor.zobrist))
+
+    # The cost is optimal (the same as A*) with several workers
+    def test_optimal_cost(self):
+        for level in ("level3.txt", "level4.txt"):
+            problem, state = load(level)
+            expected = len(AStarSearch(problem, state, matching_heuristic))
+            for workers in (2, 3):
+                result = hash_distributed_astar(problem, state, matching_heuristic, workers=workers)
+                self.assertEqual(result.cost, expected)
+                check_solution(self, problem, state, result.solution, expected)
+
+    def test_parking_optimal_cost(self):
+        problem = ParkingProblem.from_file(os.path.join(ROOT, "parks", "park1.txt"))
+        state = problem.get_initial_state()
+        expected = AStarSearch(problem, state, zero_heuristic)
+        cost = sum(problem.get_cost(None, action) for action in expected)
+        result = hash_distributed_astar(problem, state, zero_heuristic, workers=2)
+        self.assertEqual(result.cost, cost)
+        check_solution(self, problem, state, result.solution, cost)
+
+    # The search ends without a solution when the whole reachable space is explored
+    def test_unsolvable_problem_ends(self):
+        problem = SokobanProblem.from_text("#######\n#$ @ .#\n#######")
+        result = hash_distributed_astar(problem, problem.get_initial_state(), zero_heuristic, workers=2)
+        self.assertIsNone(result.solution)
+        self.assertGreater(result.expanded, 1)
+        problem = unsolvable_ring()
+        self.assertIsNone(hash_distributed_astar(problem, problem.start, zero_heuristic, workers=2).solution)
+
+    def test_start_is_goal(self):
+        problem = SokobanProblem.from_text("#####\n#@* #\n#####")
+        state = problem.get_initial_state()
+        self.assertEqual(HashDistributedAStarSearch(problem, state, matching_heuristic), [])
+        result = hash_distributed_astar(problem, state, matching_heuristic, workers=2)
+        self.assertEqual((result.solution, result.cost), ([], 0))
+
+if __name__ == "__main__":
+    unittest.main()
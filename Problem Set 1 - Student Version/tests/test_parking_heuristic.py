@@ -0,0 +1,61 @@
+import math, os, unittest
+
+from helpers.heuristic_checks import check_heuristic_consistency
+from parking import ParkingProblem
+from parking_heuristic import parking_heuristic
+from search import AStarSearch, UniformCostSearch
+from test_parking_state import reachable
+
+PARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "parks")
+
+# A lot where the cars block each other and a lot where car B has no slot
+EXTRA_LOTS = [
+    "#######\n#AB..##\n#.##.##\n#10...#\n#######",
+    "######\n#A.B.#\n#.##0#\n######",
+]
+
+def problems():
+    for name in sorted(os.listdir(PARKS)):
+        yield ParkingProblem.from_file(os.path.join(PARKS, name))
+    for text in EXTRA_LOTS:
+        yield ParkingProblem.from_text(text)
+
+def path_cost(problem, state, solution):
+    cost = 0
+    for action in solution:
+        cost += problem.get_cost(state, action)
+        state = problem.get_successor(state, action)
+    assert problem.is_goal(state)
+    return cost
+
+class TestParkingHeuristic(unittest.TestCase):
+    # From every reachable state, the heuristic is at most the optimal cost found by UCS
+    # (and it is inf only if UCS finds no solution)
+    def test_admissible(self):
+        for problem in problems():
+            for state in reachable(problem):
+                h = parking_heuristic(problem, state)
+                solution = UniformCostSearch(problem, state)
+                if solution is None: continue
+                self.assertFalse(math.isinf(h))
+                self.assertLessEqual(h, path_cost(problem, state, solution))
+                if problem.is_goal(state):
+                    self.assertEqual(h, 0)
+
+    def test_consistent(self):
+        for problem in problems():
+            self.assertGreater(check_heuristic_consistency(problem, parking_heuristic), 0)
+
+    # A* with the heuristic finds solutions as cheap as UCS (and no solution when UCS finds none)
+    def test_astar_is_optimal(self):
+        for problem in problems():
+            state = problem.get_initial_state()
+            expected = UniformCostSearch(problem, state)
+            solution = AStarSearch(problem, state, parking_heuristic)
+            if expected is None:
+                self.assertIsNone(solution)
+            else:
+                self.assertEqual(path_cost(problem, state, solution), path_cost(problem, state, expected))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os, pickle, unittest
+from collections import deque
+
+from mathutils import Direction
+from parking import ParkingProblem, ParkingState
+
+PARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "parks")
+
+# The states reachable from the initial state (up to 'limit' states)
+def reachable(problem, limit=3000):
+    initial = problem.get_initial_state()
+    seen, queue = {initial}, deque([initial])
+    while queue and len(seen) < limit:
+        state = queue.popleft()
+        for action in problem.get_actions(state):
+            successor = problem.get_successor(state, action)
+            if successor not in seen:
+                seen.add(successor)
+                queue.append(successor)
+    return seen
+
+def problems():
+    for name in sorted(os.listdir(PARKS)):
+        yield ParkingProblem.from_file(os.path.join(PARKS, name))
+
+class TestParkingState(unittest.TestCase):
+    # Packing a state and unpacking it (also after pickling) gives an equal state with the same mask and key,
+    # and the mask and key that get_successor updates incrementally match the ones computed from scratch
+    def test_round_trip(self):
+        for problem in problems():
+            for state in reachable(problem):
+                self.assertEqual(state.occupied, problem.occupancy(state.cells))
+                self.assertEqual(state.zobrist, problem.zobrist_key(state.cells))
+                self.assertEqual(state.cars, tuple(problem.points[cell] for cell in state.cells))
+                self.assertEqual([problem.cell_of(car) for car in state], list(state.cells))
+                data = pickle.loads(pickle.dumps(problem.pack_state(state)))
+                back = problem.unpack_state(data)
+                self.assertEqual(back, state)
+                self.assertEqual(hash(back), hash(state))
+                self.assertEqual((back.cells, back.occupied, back.zobrist), (state.cells, state.occupied, state.zobrist))
+                self.assertEqual(str(back), str(state))
+
+    # The actions and successors match a plain model where the state is the tuple of car positions
+    def test_same_transitions_as_positions(self):
+        for problem in problems():
+            for state in reachable(problem, 500):
+                positions = tuple(state)
+                expected = [(i, d) for i, car in enumerate(positions) for d in Direction
+                            if car + d.to_vector() in problem.passages and car + d.to_vector() not in positions]
+                self.assertEqual(sorted(problem.get_actions(state)), sorted(expected))
+                for i, d in expected:
+                    successor = problem.get_successor(state, (i, d))
+                    moved = positions[:i] + (positions[i] + d.to_vector(),) + positions[i + 1:]
+                    self.assertEqual(successor.cars, moved)
+                    self.assertEqual(problem.is_goal(successor), all(problem.slots.get(car) == j for j, car in enumerate(moved)))
+
+    # Two states are equal exactly when their cars are on the same cells
+    def test_equality(self):
+        problem = ParkingProblem.from_file(os.path.join(PARKS, "park2.txt"))
+        states = list(reachable(problem, 200))
+        for first in states[::7]:
+            for second in states[::7]:
+                self.assertEqual(first == second, first.cells == second.cells)
+        state = states[0]
+        self.assertEqual(state, ParkingState(state.cells, state.occupied, state.zobrist, state.points))
+        self.assertNotEqual(state, state.cells)
+
+    # A move into another car (only possible with an unchecked action) rebuilds the mask instead of corrupting it
+    def test_collision_keeps_the_mask(self):
+        problem = ParkingProblem.from_text("#####\n#AB.#\n#10.#\n#####")
+        state = problem.get_initial_state()
+        collided = problem.get_successor(state, (0, Direction.RIGHT))
+        self.assertEqual(collided.occupied, problem.occupancy(collided.cells))
+        separated = problem.get_successor(collided, (1, Direction.RIGHT))
+        self.assertEqual(separated.occupied, problem.occupancy(separated.cells))
+        self.assertEqual(separated.zobrist, problem.zobrist_key(separated.cells))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import os, shutil, tempfile, unittest
+from collections import deque
+
+from parking import ParkingProblem
+from pattern_database import (ParkingPatternDatabase, PatternDatabaseHeuristic, SokobanPatternDatabase,
+                              database_path, parking_heuristic_for_file, sokoban_heuristic_for_file)
+from search import AStarSearch, UniformCostSearch
+from sokoban import SokobanProblem
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def path_cost(problem, state, solution):
+    cost = 0
+    for action in solution:
+        cost += problem.get_cost(state, action)
+        state = problem.get_successor(state, action)
+    return cost
+
+# The states reachable from the initial state (up to 'limit' states)
+def reachable(problem, limit=5000):
+    initial = problem.get_initial_state()
+    seen, queue = {initial}, deque([initial])
+    while queue and len(seen) < limit:
+        state = queue.popleft()
+        for action in problem.get_actions(state):
+            successor = problem.get_successor(state, action)
+            if successor not in seen:
+                seen.add(successor)
+                queue.append(successor)
+    return seen
+
+class TestPatternDatabase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def copy(self, folder, name):
+        path = os.path.join(self.directory, name)
+        shutil.copy2(os.path.join(ROOT, folder, name), path)
+        return path
+
+    # A database of every car (or every crate) is the exact cost to the goal
+    def test_exact_cost(self):
+        path = self.copy("parks", "park1.txt")
+        problem = ParkingProblem.from_file(path)
+        heuristic = parking_heuristic_for_file(path, len(problem.cars), problem)
+        state = problem.get_initial_state()
+        self.assertEqual(heuristic(problem, state), path_cost(problem, state, UniformCostSearch(problem, state)))
+        path = self.copy("levels", "level1.txt")
+        problem = SokobanProblem.from_file(path)
+        heuristic = sokoban_heuristic_for_file(path, len(problem.layout.goals), problem)
+        state = problem.get_initial_state()
+        self.assertEqual(heuristic(problem, state), len(UniformCostSearch(problem, state)))
+
+    # A* with the databases finds the optimal cost
+    def test_astar_is_optimal(self):
+        for name in ("park1.txt", "park2.txt", "park4.txt"):
+            path = self.copy("parks", name)
+            problem = ParkingProblem.from_file(path)
+            heuristic = parking_heuristic_for_file(path, 1, problem)
+            state = problem.get_initial_state()
+            expected = path_cost(problem, state, UniformCostSearch(problem, state))
+            self.assertEqual(path_cost(problem, state, AStarSearch(problem, state, heuristic)), expected)
+        for name in ("level1.txt", "level2.txt"):
+            path = self.copy("levels", name)
+            problem = SokobanProblem.from_file(path)
+            heuristic = sokoban_heuristic_for_file(path, 2, problem)
+            state = problem.get_initial_state()
+            self.assertEqual(len(AStarSearch(problem, state, heuristic)), len(UniformCostSearch(problem, state)))
+
+    # h(state) <= cost(action) + h(successor) for every reachable state
+    def test_consistency(self):
+        cases = [(ParkingProblem, "parks", "park2.txt", lambda path, problem: parking_heuristic_for_file(path, 1, problem)),
+                 (SokobanProblem, "levels", "level2.txt", lambda path, problem: sokoban_heuristic_for_file(path, 2, problem))]
+        for kind, folder, name, create in cases:
+            path = self.copy(folder, name)
+            problem = kind.from_file(path)
+            heuristic = create(path, problem)
+            for state in reachable(problem):
+                h = heuristic(problem, state)
+                for action in problem.get_actions(state):
+                    successor = problem.get_successor(state, action)
+                    self.assertLessEqual(h, problem.get_cost(state, action) + heuristic(problem, successor))
+
+    # A database saved for another map (the checksum does not match) is not loaded and is rebuilt
+    def test_stale_checksum_is_rebuilt(self):
+        path = self.copy("levels", "level1.txt")
+        problem = SokobanProblem.from_file(path)
+        sokoban_heuristic_for_file(path, 1, problem)
+        database_file = database_path(path, "crates-1")
+        self.assertIsNotNone(SokobanPatternDatabase.load(database_file, problem.layout))
+        with open(path) as f:
+            text = f.read()
+        moved = SokobanProblem.from_text(text.replace(".", " ").replace("#   #  #\n", "#   # .#\n", 1))
+        self.assertNotEqual(moved.layout.goals, problem.layout.goals)
+        self.assertIsNone(SokobanPatternDatabase.load(database_file, moved.layout))
+        heuristic = sokoban_heuristic_for_file(path, 1, moved)
+        self.assertIsNotNone(SokobanPatternDatabase.load(database_file, moved.layout))
+        state = moved.get_initial_state()
+        self.assertEqual(heuristic(moved, state), len(UniformCostSearch(moved, state)))
+
+    def test_add_rejects_overlapping_patterns(self):
+        problem = ParkingProblem.from_file(os.path.join(ROOT, "parks", "park2.txt"))
+        first, second = ParkingPatternDatabase.build(problem, (0,)), ParkingPatternDatabase.build(problem, (0, 1))
+        with self.assertRaises(ValueError):
+            PatternDatabaseHeuristic([first, second], "add")
+        PatternDatabaseHeuristic([first, second], "max")
+        sokoban = SokobanPatternDatabase.build(SokobanProblem.from_file(os.path.join(ROOT, "levels", "level1.txt")).layout, 1)
+        with self.assertRaises(ValueError):
+            PatternDatabaseHeuristic([sokoban], "add")
+
+if __name__ == "__main__":
+    unittest.main()
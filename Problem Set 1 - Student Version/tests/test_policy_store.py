@@ -0,0 +1,67 @@
+import os, shutil, tempfile, unittest
+
+from agents import InformedSearchAgent, UninformedSearchAgent
+from policy_store import MISSING, PolicyStore
+from search import AStarSearch, BreadthFirstSearch
+from sokoban import SokobanProblem
+from sokoban_heuristic import strong_heuristic
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestPolicyStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "policies.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # Only the last 'max_entries' insertions are kept
+    def test_eviction(self):
+        with PolicyStore(self.path, max_entries=10) as store:
+            policy = store.policy("test")
+            for index in range(25):
+                policy.put_many([((index,), index)])
+            self.assertEqual(len(store), 10)
+            self.assertIs(policy.get((14,)), MISSING)
+            self.assertEqual(policy.get((15,)), 15)
+            self.assertEqual(policy.get((24,)), 24)
+
+    # A second agent (as in a later run) follows the stored policy without searching
+    def test_agents_reuse_the_stored_policy(self):
+        problem = SokobanProblem.from_file(os.path.join(ROOT, "levels", "level1.txt"))
+        searches = []
+        def counted(search):
+            def run(*args):
+                searches.append(search.__name__)
+                return search(*args)
+            return run
+        agents = [lambda store: UninformedSearchAgent(counted(BreadthFirstSearch), store),
+                  lambda store: InformedSearchAgent(counted(AStarSearch), strong_heuristic, store)]
+        for index, create in enumerate(agents):
+            with PolicyStore(self.path) as store:
+                for run in range(2):
+                    agent = create(store.policy(f"agent{index}"))
+                    state = problem.get_initial_state()
+                    while not problem.is_goal(state):
+                        state = problem.get_successor(state, agent.act(problem, state))
+        self.assertEqual(searches, ["BreadthFirstSearch", "AStarSearch"])
+
+    # A search that gives up (such as a search with a node budget) is tried again instead of being remembered as unsolvable
+    def test_failed_search_is_not_remembered(self):
+        problem = SokobanProblem.from_file(os.path.join(ROOT, "levels", "level1.txt"))
+        state = problem.get_initial_state()
+        results = [None, BreadthFirstSearch(problem, state)]
+        def search(problem, state):
+            return results.pop(0)
+        with PolicyStore(self.path) as store:
+            policy = store.policy("budget")
+            policy.put_many([(state, None)]) # stored by an older run
+            agent = UninformedSearchAgent(search, policy)
+            self.assertIsNone(agent.act(problem, state))
+            self.assertIsNotNone(agent.act(problem, state))
+            self.assertIsNotNone(policy.get(state))
+            self.assertEqual(results, [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import math, multiprocessing, os, time, unittest
+
+import portfolio
+from portfolio import PortfolioConfig, SearchCancelled, load_problem, run_config, solve
+from search import UniformCostSearch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def path_cost(problem, solution):
+    state, cost = problem.get_initial_state(), 0
+    for action in solution:
+        cost += problem.get_cost(state, action)
+        state = problem.get_successor(state, action)
+    assert problem.is_goal(state)
+    return cost
+
+class TestPortfolio(unittest.TestCase):
+    # Every configuration proves that park3 has no solution, so the portfolio returns a result without a solution
+    def test_unsolvable_park(self):
+        path = os.path.join(ROOT, "parks", "park3.txt")
+        for config in portfolio.DEFAULT_PORTFOLIOS["parking"]:
+            self.assertIsNone(run_config("parking", path, config).solution)
+        result = solve("parking", path, max_suboptimality=math.inf, workers=2)
+        self.assertIsNotNone(result)
+        self.assertIsNone(result.solution)
+
+    # Only the optimal configurations are started when the bound is 1
+    def test_optimal_bound(self):
+        path = os.path.join(ROOT, "parks", "park2.txt")
+        problem = load_problem("parking", path)
+        result = solve("parking", path, workers=2)
+        self.assertEqual(result.config.bound, 1)
+        self.assertEqual(path_cost(problem, result.solution), path_cost(problem, UniformCostSearch(problem, problem.get_initial_state())))
+        with self.assertRaises(ValueError):
+            solve("parking", path, [PortfolioConfig("gbfs", "distance")])
+
+    # A search stops with SearchCancelled once the stop event is set
+    def test_cancelled_search(self):
+        stop_event = multiprocessing.get_context().Event()
+        path = os.path.join(ROOT, "parks", "park2.txt")
+        portfolio._init_worker(stop_event)
+        try:
+            self.assertIsNotNone(run_config("parking", path, PortfolioConfig("ucs")).solution)
+            stop_event.set()
+            with self.assertRaises(SearchCancelled):
+                run_config("parking", path, PortfolioConfig("ucs"))
+        finally:
+            portfolio._init_worker(None)
+
+    # The portfolio returns as soon as the fast configuration finishes and stops the slow one
+    # (UCS alone takes several seconds on level4)
+    def test_stops_the_slow_configurations(self):
+        path = os.path.join(ROOT, "levels", "level4.txt")
+        start = time.time()
+        result = solve("sokoban", path, [PortfolioConfig("gbfs", "strong"), PortfolioConfig("ucs")], math.inf, workers=2)
+        self.assertEqual(result.config, PortfolioConfig("gbfs", "strong"))
+        self.assertIsNotNone(result.solution)
+        self.assertLess(time.time() - start, 4)
+
+if __name__ == "__main__":
+    unittest.main()
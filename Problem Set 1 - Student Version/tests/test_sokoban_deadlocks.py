@@ -0,0 +1,107 @@
+import unittest
+
+from mathutils import Point
+from sokoban import SokobanProblem
+from sokoban_deadlocks import DeadlockDetector
+
+# Parse a crafted level and return the detector with the player cell, the crates bitmask and a function
+# that converts an (x, y) position to its cell index
+def load(level: str):
+    problem = SokobanProblem.from_text(level)
+    layout, state = problem.layout, problem.initial_state
+    cell = lambda x, y: layout.cell_index[Point(x, y)]
+    return DeadlockDetector(layout), layout.cell_index[state.player], layout.to_mask(state.crates), cell
+
+class TestDeadlockDetector(unittest.TestCase):
+    # Two crates against the top wall fill a 2x2 square with the wall cells.
+    # The top row has a goal, so the crates are not on dead squares and only the 2x2 rule can catch them.
+    def test_blocked_square(self):
+        detector, player, crates, cell = load("""
+            ########
+            #. $$  #
+            #      #
+            #  @  .#
+            ########
+        """)
+        moved = cell(3, 1)
+        self.assertFalse(detector.layout.dead_mask >> moved & 1)
+        self.assertTrue(detector.is_blocked_square(crates, moved))
+        self.assertTrue(detector.is_deadlocked(player, crates, moved, corrals=False))
+
+    # A single crate against the top wall leaves the 2x2 squares open
+    def test_single_crate_against_wall_is_not_a_blocked_square(self):
+        detector, player, crates, cell = load("""
+            ########
+            #.  $  #
+            #      #
+            #  @  .#
+            ########
+        """)
+        self.assertFalse(detector.is_blocked_square(crates, cell(4, 1)))
+
+    # The upper crate is held by the wall on its left and by the lower crate, which is held by the wall on its right.
+    # No 2x2 square is filled and none of the crates is on a dead square, but both crates are frozen off their goals.
+    def test_frozen_crates_against_walls(self):
+        detector, player, crates, cell = load("""
+            #######
+            #     #
+            ##$   #
+            # $#  #
+            #   . #
+            #@  . #
+            #######
+        """)
+        for x, y in ((2, 2), (2, 3)):
+            self.assertFalse(detector.layout.dead_mask >> cell(x, y) & 1)
+            self.assertFalse(detector.is_blocked_square(crates, cell(x, y)))
+            self.assertTrue(detector.is_frozen(crates, cell(x, y)))
+        self.assertTrue(detector.is_deadlocked(player, crates, cell(2, 3), corrals=False))
+
+    # The same frozen pair is not a deadlock when both crates are on goals
+    def test_frozen_crates_on_goals(self):
+        detector, player, crates, cell = load("""
+            #######
+            #     #
+            ##*   #
+            # *#  #
+            #     #
+            #@    #
+            #######
+        """)
+        self.assertFalse(detector.is_frozen(crates, cell(2, 3)))
+        self.assertFalse(detector.is_deadlocked(player, crates, cell(2, 3)))
+
+    # The two crates close the right pocket. Each one can only be pushed into the pocket (onto a dead corner)
+    # so the player can never get them out, although no 2x2 square or frozen crate is involved.
+    def test_closed_corral(self):
+        detector, player, crates, cell = load("""
+            #######
+            #.  $ #
+            #.  $ #
+            #@  ###
+            #######
+        """)
+        moved = cell(4, 1)
+        self.assertFalse(detector.layout.dead_mask >> moved & 1)
+        self.assertFalse(detector.is_blocked_square(crates, moved))
+        self.assertFalse(detector.is_frozen(crates, moved))
+        self.assertTrue(detector.is_corral_deadlock(player, crates, moved))
+        self.assertTrue(detector.is_deadlocked(player, crates, moved))
+
+    # A crate in the open with a reachable goal must not be flagged by any check
+    def test_free_crate(self):
+        detector, player, crates, cell = load("""
+            #######
+            #     #
+            #  $  #
+            #@   .#
+            #######
+        """)
+        moved = cell(3, 2)
+        self.assertFalse(detector.is_blocked_square(crates, moved))
+        self.assertFalse(detector.is_frozen(crates, moved))
+        self.assertFalse(detector.is_corral_deadlock(player, crates, moved))
+        self.assertFalse(detector.is_deadlocked(player, crates, moved))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import os, random, unittest
+
+from mathutils import Direction
+from search import AStarSearch, BreadthFirstSearch
+from sokoban import CompactSokobanProblem, SokobanProblem
+from sokoban_heuristic import IncrementalStrongHeuristic, crate_cost, strong_heuristic
+
+LEVELS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "levels")
+
+class TestStrongHeuristic(unittest.TestCase):
+    # Level 1 has crates against walls that can still be pushed along them to a goal,
+    # so the heuristic must not treat them as deadlocked
+    def test_solvable_level_is_not_deadlocked(self):
+        problem = SokobanProblem.from_file(os.path.join(LEVELS, "level1.txt"))
+        state = problem.get_initial_state()
+        self.assertLess(strong_heuristic(problem, state), float('inf'))
+        solution = AStarSearch(problem, state, strong_heuristic)
+        self.assertIsNotNone(solution)
+        self.assertEqual(len(solution), len(BreadthFirstSearch(problem, state)))
+
+    # A crate in a corner without a goal can never be moved again
+    def test_corner_crate_is_deadlocked(self):
+        problem = SokobanProblem.from_text("""
+            ######
+            #$  .#
+            #  @ #
+            ######
+        """)
+        state = problem.get_initial_state()
+        self.assertEqual(strong_heuristic(problem, state), float('inf'))
+
+    # The crate part of the heuristic is shared by the states that only differ by the player position
+    def test_crate_cost_is_cached_by_crates(self):
+        problem = SokobanProblem.from_text("""
+            #######
+            #@ $ .#
+            #######
+        """)
+        state = problem.get_initial_state()
+        mask = problem.layout.to_mask(state.crates)
+        self.assertEqual(crate_cost(problem, mask), 2)
+        self.assertIn(mask, problem.cache("crates"))
+
+class TestIncrementalStrongHeuristic(unittest.TestCase):
+    # Pushing the lower crate up onto its goal freezes the other crate (between two dead squares and the pushed crate)
+    # while the pushed crate itself is not frozen since it is on a goal
+    def test_push_freezes_a_neighbor(self):
+        problem = SokobanProblem.from_text("""
+            #######
+            ### ###
+            #. $.##
+            ### $##
+            ####@ #
+            #######
+        """)
+        heuristic = IncrementalStrongHeuristic()
+        state = problem.get_initial_state()
+        _, info = heuristic.evaluate(problem, state)
+        child = problem.get_successor(state, Direction.UP)
+        self.assertEqual(strong_heuristic(problem, child), float('inf'))
+        self.assertEqual(heuristic.evaluate_child(problem, state, info, child)[0], float('inf'))
+
+    # Along random walks, the incremental values are the same as the values computed from scratch
+    def test_random_walks_match_strong_heuristic(self):
+        for level in ("level1.txt", "level2.txt", "level3.txt", "level4.txt"):
+            for kind in (SokobanProblem, CompactSokobanProblem):
+                for seed in range(5):
+                    rng = random.Random(seed)
+                    problem = kind.from_file(os.path.join(LEVELS, level))
+                    heuristic = IncrementalStrongHeuristic()
+                    state = problem.get_initial_state()
+                    _, info = heuristic.evaluate(problem, state)
+                    for _ in range(200):
+                        child = problem.get_successor(state, rng.choice(list(problem.get_actions(state))))
+                        value, info = heuristic.evaluate_child(problem, state, info, child)
+                        self.assertEqual(value, strong_heuristic(problem, child))
+                        state = child
+
+if __name__ == "__main__":
+    unittest.main()
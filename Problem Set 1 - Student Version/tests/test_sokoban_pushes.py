@@ -0,0 +1,69 @@
+import argparse, os, unittest
+
+from helpers.heuristic_checks import InconsistentHeuristicException
+from play_sokoban import add_consistency_checks
+from search import AStarSearch, UniformCostSearch
+from sokoban import SokobanProblem
+from sokoban_heuristic import strong_heuristic
+from sokoban_pushes import SokobanPushProblem, push_level_search
+
+LEVELS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "levels")
+
+SMALL_LEVELS = [
+    "#######\n#@ $ .#\n#######",
+    "######\n#    #\n# $$ #\n#.@ .#\n######",
+    "#######\n#.   .#\n# $#$ #\n#  @  #\n#######",
+]
+
+def problems():
+    for name in ("level1.txt", "level2.txt"):
+        yield SokobanProblem.from_file(os.path.join(LEVELS, name))
+    for text in SMALL_LEVELS:
+        yield SokobanProblem.from_text(text)
+
+# Play the steps from the initial state and return the final state
+def play(problem, steps):
+    state = problem.get_initial_state()
+    for step in steps:
+        assert step in problem.get_actions(state)
+        state = problem.get_successor(state, step)
+    return state
+
+class TestPushLevelSearch(unittest.TestCase):
+    # The push-level UCS finds solutions with the same number of steps as the step-level UCS,
+    # the cost of the pushes is the number of expanded steps and the steps solve the level
+    def test_matches_step_level_search(self):
+        for problem in problems():
+            state = problem.get_initial_state()
+            expected = UniformCostSearch(problem, state)
+            pushes = SokobanPushProblem.from_problem(problem)
+            start = pushes.get_initial_state()
+            push_solution = UniformCostSearch(pushes, start)
+            cost, push_state = 0, start
+            for action in push_solution:
+                cost += pushes.get_cost(push_state, action)
+                push_state = pushes.get_successor(push_state, action)
+            self.assertTrue(pushes.is_goal(push_state))
+            self.assertEqual(cost, len(expected))
+            for search in (push_level_search(UniformCostSearch), lambda p, s: push_level_search(AStarSearch)(p, s, strong_heuristic)):
+                steps = search(problem, state)
+                self.assertEqual(len(steps), len(expected))
+                self.assertTrue(problem.is_goal(play(problem, steps)))
+
+    # With --pushes, the consistency checks wrap the problem that the search actually expands
+    def test_checks_wrap_the_push_problem(self):
+        args = argparse.Namespace(pushes=True, compact=False)
+        original = SokobanPushProblem.get_successor
+        problem = SokobanProblem.from_text(SMALL_LEVELS[1])
+        # Twice the number of crates off the goals overestimates the cost of the last push
+        heuristic = lambda problem, state: 2 * sum(1 for crate in state.crates if crate not in problem.layout.goals)
+        try:
+            add_consistency_checks(args, heuristic)
+            with self.assertRaises(InconsistentHeuristicException):
+                push_level_search(AStarSearch)(problem, problem.get_initial_state(), heuristic)
+        finally:
+            SokobanPushProblem.get_successor = original
+        self.assertIsNotNone(push_level_search(AStarSearch)(problem, problem.get_initial_state(), heuristic))
+
+if __name__ == "__main__":
+    unittest.main()
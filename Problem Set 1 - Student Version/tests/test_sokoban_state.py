@@ -0,0 +1,74 @@
+import os, unittest
+from collections import deque
+
+from mathutils import Direction
+from sokoban import CompactSokobanProblem, CompactSokobanState, SokobanProblem
+
+LEVELS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "levels")
+
+# The states reachable from the initial state (up to 'limit' states)
+def reachable(problem, limit=3000):
+    initial = problem.get_initial_state()
+    seen, queue = {initial}, deque([initial])
+    while queue and len(seen) < limit:
+        state = queue.popleft()
+        for action in problem.get_actions(state):
+            successor = problem.get_successor(state, action)
+            if successor not in seen:
+                seen.add(successor)
+                queue.append(successor)
+    return seen
+
+class TestCompactSokobanState(unittest.TestCase):
+    # Converting a state to the compact state and back gives the same state (with the same zobrist key)
+    def test_round_trip(self):
+        for level in ("level1.txt", "level2.txt", "level3.txt"):
+            problem = SokobanProblem.from_file(os.path.join(LEVELS, level))
+            for state in reachable(problem):
+                compact = CompactSokobanState.from_state(state)
+                self.assertEqual(compact.player, state.player)
+                self.assertEqual(compact.crates, state.crates)
+                self.assertEqual(compact.zobrist, state.zobrist)
+                self.assertEqual(compact, CompactSokobanState.create(state.layout, compact.player_cell, compact.crate_mask))
+                back = compact.to_state()
+                self.assertEqual(back, state)
+                self.assertEqual(hash(back), hash(state))
+                self.assertEqual(str(compact), str(state))
+
+    # Both problems have the same actions and transitions, and the compact states are equal exactly when the states are
+    def test_same_transitions(self):
+        for level in ("level1.txt", "level2.txt", "level3.txt"):
+            problem = SokobanProblem.from_file(os.path.join(LEVELS, level))
+            compact_problem = CompactSokobanProblem.from_problem(problem)
+            states = list(reachable(problem, 500))
+            compact_states = [CompactSokobanState.from_state(state) for state in states]
+            for state, compact in zip(states, compact_states):
+                self.assertEqual(list(compact_problem.get_actions(compact)), list(problem.get_actions(state)))
+                self.assertEqual(compact_problem.is_goal(compact), problem.is_goal(state))
+                for action in problem.get_actions(state):
+                    successor = compact_problem.get_successor(compact, action)
+                    self.assertEqual(successor, CompactSokobanState.from_state(problem.get_successor(state, action)))
+                    self.assertEqual(successor.zobrist, problem.get_successor(state, action).zobrist)
+            for i in range(0, len(states), 25):
+                for j in range(0, len(states), 25):
+                    self.assertEqual(compact_states[i] == compact_states[j], states[i] == states[j])
+
+    # An invalid action raises an exception when checked and fails an assertion when unchecked
+    # (instead of silently moving the player to the last cell)
+    def test_invalid_actions(self):
+        text = "#####\n#@$ #\n#  .#\n#####"
+        for kind in (SokobanProblem, CompactSokobanProblem):
+            problem = kind.from_text(text)
+            state = problem.get_initial_state()
+            problem.checked = True
+            with self.assertRaises(Exception):
+                problem.get_successor(state, Direction.UP)
+            problem.checked = False
+            with self.assertRaises(AssertionError):
+                problem.get_successor(state, Direction.UP) # into a wall
+            pushed = problem.get_successor(state, Direction.RIGHT)
+            with self.assertRaises(AssertionError):
+                problem.get_successor(pushed, Direction.RIGHT) # pushes the crate into a wall
+
+if __name__ == "__main__":
+    unittest.main()
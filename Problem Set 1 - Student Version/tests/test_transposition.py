@@ -0,0 +1,41 @@
+import unittest
+
+from transposition import TranspositionTable
+
+# A state with a zobrist key where different states can be given the same key (a collision)
+class KeyedState:
+    def __init__(self, name, zobrist):
+        self.name = name
+        self.zobrist = zobrist
+
+    def __eq__(self, other):
+        return isinstance(other, KeyedState) and self.name == other.name
+
+    def __hash__(self):
+        return self.zobrist
+
+class TestTranspositionTable(unittest.TestCase):
+    # By default, a zobrist collision is resolved by comparing the states
+    def test_for_state_verifies_by_default(self):
+        first, second = KeyedState("first", 42), KeyedState("second", 42)
+        table = TranspositionTable.for_state(first)
+        self.assertTrue(table.verify)
+        table.add(first)
+        self.assertTrue(table.seen(first))
+        self.assertFalse(table.seen(second))
+
+    # Keying by the zobrist key only must be requested explicitly, and then colliding states are merged
+    def test_unverified_is_opt_in(self):
+        first, second = KeyedState("first", 42), KeyedState("second", 42)
+        table = TranspositionTable.for_state(first, verify=False)
+        self.assertFalse(table.verify)
+        table.add(first)
+        self.assertTrue(table.seen(second))
+
+    # States without a zobrist key are always verified
+    def test_states_without_zobrist_are_verified(self):
+        table = TranspositionTable.for_state((1, 2), verify=False)
+        self.assertTrue(table.verify)
+
+if __name__ == "__main__":
+    unittest.main()
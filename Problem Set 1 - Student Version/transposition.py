@@ -0,0 +1,38 @@
+from typing import Any, Callable, Dict
+from operator import attrgetter
+
+# A transposition table stores information (such as the best known path cost) about the states that the search has seen.
+# It is a dictionary whose keys are computed from the states by 'key':
+#   - If the states carry a zobrist key (such as SokobanState, CompactSokobanState and ParkingState) and 'verify' is False,
+#     the table is keyed by the 64-bit zobrist key only. A lookup hashes and compares a single int,
+#     but two different states with the same key would be merged (which is very unlikely with 64-bit keys).
+#   - Otherwise (or if 'verify' is True), the table is keyed by the states themselves so every hit is verified
+#     with a full state comparison. For states with a zobrist key, the hash is still the stored key.
+# The search algorithms should compute the key once per state and use the plain dictionary operations on it:
+#   key = table.key(state)
+#   if key in table: ...
+#   table[key] = cost
+class TranspositionTable(Dict[Any, Any]):
+    def __init__(self, verify: bool = True) -> None:
+        super().__init__()
+        self.verify = verify
+        self.key: Callable[[Any], Any] = _identity if verify else _zobrist
+
+    # Create a table for the given state. By default every hit is verified with a full state comparison.
+    # Keying by the zobrist key only (verify=False) is opt-in and only used if the state has a zobrist key.
+    @staticmethod
+    def for_state(state: Any, verify: bool = True) -> 'TranspositionTable':
+        return TranspositionTable(verify=verify or not hasattr(state, "zobrist"))
+
+    # Mark the given state as seen
+    def add(self, state: Any, value: Any = True) -> None:
+        self[self.key(state)] = value
+
+    # Check if the given state was seen
+    def seen(self, state: Any) -> bool:
+        return self.key(state) in self
+
+def _identity(state: Any) -> Any:
+    return state
+
+_zobrist = attrgetter("zobrist")